@@ -0,0 +1,365 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Default number of bootstrap resamples and permutations.
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_CONFIDENCE = 0.95
+# Resamples drawn per batch, which bounds the memory of one batch.
+RESAMPLE_BATCH_SIZE = 10_000
+
+
+def interpret_correlation(coefficient):
+    """
+    Provide an interpretation of the correlation coefficient.
+
+    Parameters:
+    coefficient (float): The Pearson correlation coefficient.
+
+    Returns:
+    str: Interpretation of the correlation strength and direction.
+    """
+    if coefficient > 0.7:
+        return "strong positive"
+    elif 0.3 < coefficient <= 0.7:
+        return "moderate positive"
+    elif 0 < coefficient <= 0.3:
+        return "weak positive"
+    elif -0.3 <= coefficient < 0:
+        return "weak negative"
+    elif -0.7 <= coefficient < -0.3:
+        return "moderate negative"
+    else:
+        return "strong negative"
+
+
+def pearson_rows(x, y):
+    """
+    Compute the Pearson correlation coefficient of each row pair.
+
+    Parameters:
+    x (numpy.ndarray): Samples, one resample per row.
+    y (numpy.ndarray): Samples of the same shape as x.
+
+    Returns:
+    numpy.ndarray: One coefficient per row, NaN where a row is constant.
+    """
+    x_deviation = x - x.mean(axis=-1, keepdims=True)
+    y_deviation = y - y.mean(axis=-1, keepdims=True)
+    covariance = (x_deviation * y_deviation).sum(axis=-1)
+    scale = np.sqrt((x_deviation ** 2).sum(axis=-1)
+                    * (y_deviation ** 2).sum(axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariance / scale
+
+
+def _bootstrap_batch(x, y, size, seed):
+    """
+    Return the coefficients of 'size' bootstrap resamples of the pairs.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(x), size=(size, len(x)))
+    return pearson_rows(x[rows], y[rows])
+
+
+def _permutation_batch(x, y, size, seed):
+    """
+    Return the coefficients of 'size' random permutations of y against x.
+    """
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permuted(np.tile(y, (size, 1)), axis=1)
+    return pearson_rows(np.broadcast_to(x, shuffled.shape), shuffled)
+
+
+def _run_batches(batch_function, x, y, total, seed=None, workers=1):
+    """
+    Run 'total' resamples in batches, over 'workers' processes if more
+    than one. Every batch gets its own seed from 'seed', an int or a
+    SeedSequence, so the result does not depend on the number of
+    workers.
+    """
+    sizes = [min(RESAMPLE_BATCH_SIZE, total - start)
+             for start in range(0, total, RESAMPLE_BATCH_SIZE)]
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(sizes))
+    arguments = ([x] * len(sizes), [y] * len(sizes), sizes, seeds)
+    if workers is not None and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(
+                max_workers=min(workers, len(sizes))) as executor:
+            batches = list(executor.map(batch_function, *arguments))
+    else:
+        batches = list(map(batch_function, *arguments))
+    return np.concatenate(batches) if batches else np.array([])
+
+
+def bootstrap_correlation_interval(x, y, resamples=DEFAULT_RESAMPLES,
+                                   confidence=DEFAULT_CONFIDENCE, seed=None,
+                                   workers=1):
+    """
+    Estimate a percentile bootstrap confidence interval of the Pearson
+    correlation coefficient, resampling (x, y) pairs with replacement.
+
+    Parameters:
+    x (array-like): The first variable.
+    y (array-like): The second variable, paired with x.
+    resamples (int): Number of bootstrap resamples.
+    confidence (float): Confidence level of the interval.
+    seed (int or SeedSequence): Seed of the random generator.
+    workers (int): Number of processes to spread the batches over.
+
+    Returns:
+    tuple: The (lower, upper) bounds of the interval.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    coefficients = _run_batches(_bootstrap_batch, x, y, resamples, seed,
+                                workers)
+    # resamples that drew a single distinct pair have no coefficient
+    coefficients = coefficients[~np.isnan(coefficients)]
+    if len(coefficients) == 0:
+        return (np.nan, np.nan)
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(coefficients, [tail, 100 - tail])
+    return (float(lower), float(upper))
+
+
+def permutation_p_value(x, y, permutations=DEFAULT_RESAMPLES, seed=None,
+                        workers=1):
+    """
+    Estimate the two-sided p-value of the Pearson correlation
+    coefficient under the hypothesis that x and y are unrelated, by
+    shuffling y against x.
+
+    Parameters:
+    x (array-like): The first variable.
+    y (array-like): The second variable, paired with x.
+    permutations (int): Number of random permutations.
+    seed (int or SeedSequence): Seed of the random generator.
+    workers (int): Number of processes to spread the batches over.
+
+    Returns:
+    float: The p-value, counting the observed pairing as one permutation,
+    or NaN if the coefficient is undefined, as for a constant variable.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    observed = abs(pearson_rows(x, y))
+    if not np.isfinite(observed):
+        return np.nan
+    coefficients = _run_batches(_permutation_batch, x, y, permutations,
+                                seed, workers)
+    extreme = np.count_nonzero(np.abs(coefficients) >= observed - 1e-12)
+    return (extreme + 1) / (permutations + 1)
+
+
+def analyze_correlation(bird_observation, snowy_owl_trend, resamples=0,
+                        confidence=DEFAULT_CONFIDENCE, seed=None, workers=1):
+    """
+    Analyzes the correlation between bird observations and snowy
+    owl population trend.
+
+    With 'resamples' above zero, a bootstrap confidence interval and a
+    permutation p-value of the coefficient are added, computed from that
+    many resamples over 'workers' processes.
+    """
+    try:
+        observations_per_year = bird_observation.aggregate_observations_by_year()
+        trend_data = snowy_owl_trend.data.copy()
+        if ('Year' not in trend_data.columns or 'Index' not in
+                trend_data.columns):
+            return {}
+
+
+        merged_data = pd.merge(observations_per_year, trend_data,
+                               on='Year', how='inner')
+        if merged_data.empty:
+            print("No data of mutual years for analysis.")
+            return {}
+
+        correlation_coefficient = merged_data[('OBSERVATION '
+                                               'COUNT')].corr(
+                merged_data['Index'], method='pearson')
+        print(f"Pearson correlation coefficient: {correlation_coefficient}")
+
+        interpretation = interpret_correlation(correlation_coefficient)
+
+        correlation_results = {
+                'Correlation Coefficient': correlation_coefficient,
+                'Interpretation': interpretation
+                }
+
+        if resamples:
+            # independent random streams for the two estimates
+            bootstrap_seed, permutation_seed = np.random.SeedSequence(
+                seed).spawn(2)
+            observations = merged_data['OBSERVATION COUNT'].to_numpy()
+            index = merged_data['Index'].to_numpy()
+            correlation_results['Confidence Interval'] = (
+                bootstrap_correlation_interval(observations, index,
+                                               resamples, confidence,
+                                               bootstrap_seed, workers))
+            correlation_results['P-Value'] = permutation_p_value(
+                observations, index, resamples, permutation_seed, workers)
+
+        return correlation_results
+
+    except KeyError as ke:
+        print(f"Key error while analyzing correlation: {ke}")
+        return {}
+    except ValueError as ve:
+        print(f"Value error while analyzing correlation: {ve}")
+        return {}
+    except Exception as e:
+        print(f"Unexpected error while analyzing correlation: {e}")
+        return {}
+
+
+# Default range of lags, in years, and rolling window length.
+DEFAULT_MAX_LAG = 5
+DEFAULT_WINDOW = 10
+# Fewest year pairs a lag or window needs to get a coefficient.
+MIN_PAIRS = 3
+
+
+def yearly_series(bird_observation, snowy_owl_trend):
+    """
+    Align the yearly observation totals and the population Index on
+    every year from the first to the last year of either, so a shift by
+    one position is a shift by one year.
+
+    Returns:
+    tuple: Arrays of the years, the totals and the Index, with NaN for
+    years missing from a source.
+    """
+    observations = bird_observation.aggregate_observations_by_year()
+    observations = observations.set_index('Year')['OBSERVATION COUNT']
+    trend = snowy_owl_trend.data.groupby('Year')['Index'].mean()
+    years = np.union1d(observations.index.to_numpy(dtype=np.int64),
+                       trend.index.to_numpy(dtype=np.int64))
+    if len(years) == 0:
+        return years, np.array([]), np.array([])
+    years = np.arange(years[0], years[-1] + 1)
+    totals = observations.reindex(years).to_numpy(dtype=np.float64)
+    index = trend.reindex(years).to_numpy(dtype=np.float64)
+    return years, totals, index
+
+
+def masked_pearson_rows(x, y, min_pairs=MIN_PAIRS):
+    """
+    Compute the Pearson correlation coefficient of each row pair,
+    leaving out the positions where either value is NaN.
+
+    Parameters:
+    x (numpy.ndarray): Samples, one series per row.
+    y (numpy.ndarray): Samples of the same shape as x.
+    min_pairs (int): Fewest complete pairs a row needs.
+
+    Returns:
+    tuple: The coefficients, NaN for rows with too few pairs, and the
+    number of complete pairs of each row.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    pairs = valid.sum(axis=-1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = x.sum(axis=-1, keepdims=True) / pairs[..., None]
+        y_mean = y.sum(axis=-1, keepdims=True) / pairs[..., None]
+        x_deviation = np.where(valid, x - x_mean, 0.0)
+        y_deviation = np.where(valid, y - y_mean, 0.0)
+        coefficients = (x_deviation * y_deviation).sum(axis=-1) / np.sqrt(
+            (x_deviation ** 2).sum(axis=-1) * (y_deviation ** 2).sum(axis=-1))
+    coefficients = np.where(pairs >= min_pairs, coefficients, np.nan)
+    return coefficients, pairs
+
+
+def lagged_correlations(totals, index, max_lag=DEFAULT_MAX_LAG):
+    """
+    Correlate yearly totals with the Index shifted by every lag from
+    -max_lag to max_lag years. A positive lag compares each year's
+    totals with the Index 'lag' years earlier.
+
+    Parameters:
+    totals (numpy.ndarray): Yearly observation totals.
+    index (numpy.ndarray): The Index of the same years.
+    max_lag (int): The largest shift, in years.
+
+    Returns:
+    pandas.DataFrame: 'Lag', 'Correlation' and 'Pairs' columns.
+    """
+    lags = np.arange(-max_lag, max_lag + 1)
+    # row k holds the Index shifted by lags[k], padded with NaN
+    positions = np.arange(len(index))[None, :] - lags[:, None]
+    inside = (positions >= 0) & (positions < len(index))
+    padded = np.append(np.asarray(index, dtype=np.float64), np.nan)
+    shifted = padded[np.where(inside, positions, len(index))]
+    coefficients, pairs = masked_pearson_rows(
+        np.broadcast_to(totals, shifted.shape), shifted)
+    return pd.DataFrame({'Lag': lags, 'Correlation': coefficients,
+                         'Pairs': pairs})
+
+
+def rolling_correlations(years, totals, index, window=DEFAULT_WINDOW):
+    """
+    Correlate yearly totals with the Index within every run of 'window'
+    consecutive years.
+
+    Parameters:
+    years (numpy.ndarray): Consecutive years.
+    totals (numpy.ndarray): Yearly observation totals.
+    index (numpy.ndarray): The Index of the same years.
+    window (int): Length of the window, in years.
+
+    Returns:
+    pandas.DataFrame: 'Start Year', 'End Year', 'Correlation' and
+    'Pairs' columns, one row per window.
+    """
+    if len(years) < window:
+        return pd.DataFrame({'Start Year': [], 'End Year': [],
+                             'Correlation': [], 'Pairs': []})
+    windows = np.lib.stride_tricks.sliding_window_view
+    coefficients, pairs = masked_pearson_rows(
+        windows(np.asarray(totals, dtype=np.float64), window),
+        windows(np.asarray(index, dtype=np.float64), window))
+    return pd.DataFrame({'Start Year': years[:len(years) - window + 1],
+                         'End Year': years[window - 1:],
+                         'Correlation': coefficients, 'Pairs': pairs})
+
+
+def analyze_cross_correlation(bird_observation, snowy_owl_trend,
+                              max_lag=DEFAULT_MAX_LAG, window=DEFAULT_WINDOW):
+    """
+    Compute the lag spectrum and the rolling-window correlations between
+    yearly observation totals and the population Index.
+
+    Returns a dictionary with 'Lags' and 'Rolling' DataFrames, as made
+    by lagged_correlations and rolling_correlations, and the 'Best Lag'
+    with the strongest correlation, or an empty dictionary on error.
+    """
+    try:
+        years, totals, index = yearly_series(bird_observation,
+                                             snowy_owl_trend)
+        if len(years) == 0:
+            print("No data of mutual years for analysis.")
+            return {}
+
+        lags = lagged_correlations(totals, index, max_lag)
+        strength = lags['Correlation'].abs()
+        best_lag = (int(lags.loc[strength.idxmax(), 'Lag'])
+                    if strength.notna().any() else None)
+        return {
+            'Lags': lags,
+            'Rolling': rolling_correlations(years, totals, index, window),
+            'Best Lag': best_lag
+            }
+
+    except KeyError as ke:
+        print(f"Key error while analyzing cross-correlation: {ke}")
+        return {}
+    except ValueError as ve:
+        print(f"Value error while analyzing cross-correlation: {ve}")
+        return {}
+    except Exception as e:
+        print(f"Unexpected error while analyzing cross-correlation: {e}")
+        return {}
@@ -0,0 +1,205 @@
+import bz2
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from contextlib import contextmanager, ExitStack
+
+# Bytes looked at to recognise a compression format or a delimiter.
+PEEK_BYTES = 4096
+COPY_CHUNK_SIZE = 1 << 20
+# Archives nested deeper than this are not opened, e.g. a .txt.gz in a
+# .tar is two levels.
+MAX_NESTING = 3
+
+GZIP_MAGIC = b'\x1f\x8b'
+BZIP2_MAGIC = b'BZh'
+ZIP_MAGIC = b'PK\x03\x04'
+TAR_MAGIC = b'ustar'
+TAR_MAGIC_OFFSET = 257
+
+# Archive members that can hold the records, and the documentation and
+# code tables (bird conservation regions, important bird areas, US Fish
+# and Wildlife Service regions) eBird ships next to them, which are
+# never read.
+DATA_SUFFIXES = ('.csv', '.tsv', '.txt')
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.zip')
+METADATA_PREFIXES = ('readme', 'terms', 'recommended_citation', 'license',
+                     'bcrcodes', 'ibacodes', 'usfwscodes')
+
+
+def detect_compression(head):
+    """
+    Return the compression of a stream from its first bytes: 'gzip',
+    'bzip2', 'zip', 'tar' or None for uncompressed data.
+    """
+    if head.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if head.startswith(BZIP2_MAGIC):
+        return 'bzip2'
+    if head.startswith(ZIP_MAGIC):
+        return 'zip'
+    if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+        return 'tar'
+    return None
+
+
+def detect_delimiter(head):
+    """
+    Return the delimiter of delimited text from its first bytes: a tab
+    if the header line has more tabs than commas, otherwise a comma.
+    """
+    header = head.split(b'\n', 1)[0]
+    return '\t' if header.count(b'\t') > header.count(b',') else ','
+
+
+def is_data_member(name):
+    """
+    Return True if an archive member name looks like a file of records
+    rather than documentation.
+    """
+    base_name = os.path.basename(name).lower()
+    if base_name.startswith(METADATA_PREFIXES):
+        return False
+    for suffix in COMPRESSED_SUFFIXES:
+        if base_name.endswith(suffix):
+            base_name = base_name[:-len(suffix)]
+            break
+    return base_name.endswith(DATA_SUFFIXES)
+
+
+class _PrefixedStream(io.RawIOBase):
+    """
+    Represent a stream whose first bytes were already read: they are
+    returned again before the rest of the stream.
+    """
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def peek(stream, size=PEEK_BYTES, rewind=False):
+    """
+    Read the first bytes of a binary stream without consuming them.
+
+    Returns a tuple of the bytes and a stream to read from instead. With
+    'rewind', a stream that can seek is rewound and returned itself;
+    this is not done for decompressed streams, which seek backwards by
+    decompressing again from the start, or not at all.
+    """
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    head = b''.join(chunks)
+    if rewind and _seekable(stream):
+        stream.seek(-len(head), io.SEEK_CUR)
+        return head, stream
+    return head, io.BufferedReader(_PrefixedStream(head, stream))
+
+
+def _seekable(stream):
+    """
+    Return True if a stream can seek.
+    """
+    try:
+        return stream.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+@contextmanager
+def open_decompressed(stream, member=None):
+    """
+    Open the uncompressed records of a binary stream as a binary stream.
+
+    Gzip, bzip2, zip and tar data are recognised by their first bytes
+    and decompressed as the stream is read, also when nested, such as
+    the .txt.gz in a .tar of eBird. Nothing is extracted to disk, except
+    that a zip that cannot seek is copied, still compressed, to a
+    temporary file, since its member list is at its end.
+
+    Parameters:
+    stream (file): An open binary stream.
+    member (str): Name of the archive member to read. By default the
+        largest data member of a zip and the first one of a tar is read.
+
+    Returns:
+    file: A binary stream of the uncompressed data, open until the
+        context ends.
+    """
+    with ExitStack() as stack:
+        yield _decompress(stream, stack, member, MAX_NESTING, True)
+
+
+def _decompress(stream, stack, member, levels, rewind=False):
+    """
+    Unwrap one level of compression of a stream, then the next ones.
+    """
+    head, stream = peek(stream, rewind=rewind)
+    compression = detect_compression(head)
+    if compression is None or levels == 0:
+        return stream
+
+    if compression == 'gzip':
+        inner = stack.enter_context(gzip.GzipFile(fileobj=stream))
+    elif compression == 'bzip2':
+        inner = stack.enter_context(bz2.BZ2File(stream))
+    elif compression == 'zip':
+        inner = _open_zip_member(stream, stack, member)
+    else:
+        inner = _open_tar_member(stream, stack, member)
+    return _decompress(inner, stack, None, levels - 1)
+
+
+def _open_zip_member(stream, stack, member):
+    """
+    Open a member of a zip archive.
+    """
+    if not _seekable(stream):
+        spool = stack.enter_context(tempfile.TemporaryFile())
+        shutil.copyfileobj(stream, spool, COPY_CHUNK_SIZE)
+        spool.seek(0)
+        stream = spool
+    archive = stack.enter_context(zipfile.ZipFile(stream))
+    if member is None:
+        files = [info for info in archive.infolist() if not info.is_dir()]
+        data_files = [info for info in files
+                      if is_data_member(info.filename)] or files
+        if not data_files:
+            raise ValueError("The zip archive is empty.")
+        member = max(data_files, key=lambda info: info.file_size).filename
+    return stack.enter_context(archive.open(member))
+
+
+def _open_tar_member(stream, stack, member):
+    """
+    Open a member of a tar archive, read as a stream in member order.
+    """
+    archive = stack.enter_context(tarfile.open(fileobj=stream, mode='r|'))
+    for info in archive:
+        if not info.isfile():
+            continue
+        if info.name == member if member else is_data_member(info.name):
+            return archive.extractfile(info)
+    raise ValueError("The tar archive has no data file.")
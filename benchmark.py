@@ -0,0 +1,395 @@
+"""
+Benchmark the data pipeline on synthetic eBird records.
+
+Usage:
+    python benchmark.py [--rows N ...] [--seed SEED] [--data-dir DIR]
+                        [--baseline FILE] [--save-baseline]
+                        [--time-threshold FRACTION]
+                        [--memory-threshold FRACTION] [--repeats N]
+                        [--import-budget RATIO]
+
+Every stage is timed (fastest of --repeats runs) and memory-profiled
+(peak of the Python and NumPy allocations, traced with tracemalloc).
+Results are compared with the saved baseline and the run fails if a
+stage got slower or bigger by more than the thresholds.
+
+The import of every entry point is timed in a fresh interpreter too,
+and the run fails if one takes longer than --import-budget times a bare
+import of pandas.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    analyze_correlation,
+    bootstrap_correlation_interval,
+    permutation_p_value,
+    yearly_series,
+    DEFAULT_RESAMPLES
+    )
+from classes.bird_observation import BirdObservation
+from classes.snowy_owl_trend import SnowyOwlTrend
+from data_dashboard import (
+    parse_csv,
+    load_csv_into_dataframe,
+    clean_data_for_observation,
+    load_observations_streaming,
+    load_population_trend
+    )
+from synthetic_ebd import write_ebd_csv
+import visualizations
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TREND_PATH = os.path.join(ROOT, 'snowy_owl_trend.csv')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_ROWS = (10_000, 100_000)
+# Allowed growth before a regression. Timings are noisier than memory.
+DEFAULT_TIME_THRESHOLD = 0.5
+DEFAULT_MEMORY_THRESHOLD = 0.25
+DEFAULT_REPEATS = 3
+
+# Resamples of the significance stages, which should take well under a
+# second however many records there are.
+SIGNIFICANCE_RESAMPLES = 50_000
+
+# Differences smaller than these are noise, whatever the threshold.
+MIN_SECONDS_CHANGE = 0.05
+MIN_BYTES_CHANGE = 1 << 20
+
+# Entry points that load and analyze the data without a display, and
+# the time their import may take as a multiple of a bare import of
+# pandas, which every layer needs. Importing matplotlib or the GUI
+# eagerly takes well over the budget.
+IMPORT_ENTRY_POINTS = (
+    'data_dashboard',
+    'analysis',
+    'ingestion',
+    'classes.bird_observation'
+    )
+IMPORT_BUDGET = 1.5
+
+# The text stages hold the whole csv as a string and as dictionaries, so
+# they are only run up to this many rows.
+TEXT_STAGE_MAX_ROWS = 1_000_000
+
+AGGREGATIONS = (
+    'aggregate_observations_by_year',
+    'aggregate_observations_by_month',
+    'aggregate_observations_by_location',
+    'aggregate_observations_by_state',
+    'get_aggregate_cube'
+    )
+PLOTS = (
+    'plot_observations_by_year',
+    'plot_monthly_observations',
+    'plot_population_trend',
+    'plot_correlation',
+    'plot_cross_correlation',
+    'plot_hotspot_map'
+    )
+
+
+def measure(function, make_arguments=tuple, repeats=DEFAULT_REPEATS):
+    """
+    Time a function and trace its peak memory.
+
+    make_arguments() is called before every run, outside the
+    measurement, so runs that change their input get a fresh one.
+
+    Returns a tuple of the result of the last run, the fastest time in
+    seconds and the peak of the bytes allocated in a traced run.
+    """
+    seconds = []
+    for _ in range(repeats):
+        arguments = make_arguments()
+        start = time.perf_counter()
+        result = function(*arguments)
+        seconds.append(time.perf_counter() - start)
+
+    # tracing slows the code down, so memory is measured separately
+    arguments = make_arguments()
+    tracemalloc.start()
+    try:
+        result = function(*arguments)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, min(seconds), peak_bytes
+
+
+def render_figure(plot_function, *arguments):
+    """
+    Generate a figure and draw it, since matplotlib only renders on
+    demand, then close it.
+    """
+    fig = plot_function(*arguments)
+    if fig is not None:
+        fig.canvas.draw()
+        plt.close(fig)
+    return fig
+
+
+def import_seconds(module, repeats=DEFAULT_REPEATS):
+    """
+    Return the time a fresh interpreter takes to import a module, the
+    fastest of 'repeats' runs.
+    """
+    code = ("import time; start = time.perf_counter(); "
+            f"import {module}; print(time.perf_counter() - start)")
+    seconds = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        seconds.append(float(result.stdout.split()[-1]))
+    return min(seconds)
+
+
+def check_import_budget(repeats=DEFAULT_REPEATS, budget=IMPORT_BUDGET):
+    """
+    Time the import of every entry point against a bare import of
+    pandas.
+
+    Returns a list of messages, one per entry point whose import took
+    longer than 'budget' times that of pandas.
+    """
+    pandas_seconds = import_seconds('pandas', repeats)
+    print(f"{'import pandas':<49} {pandas_seconds:>9.4f} s")
+    over_budget = []
+    for module in IMPORT_ENTRY_POINTS:
+        seconds = import_seconds(module, repeats)
+        ratio = seconds / pandas_seconds
+        print(f"{'import ' + module:<49} {seconds:>9.4f} s "
+              f"{ratio:>9.2f} x")
+        if ratio > budget:
+            over_budget.append(
+                f"import {module} took {ratio:.2f} times as long as "
+                f"import pandas, over the budget of {budget:.2f}")
+    return over_budget
+
+
+def run_benchmark(csv_path, rows, repeats=DEFAULT_REPEATS):
+    """
+    Run every stage on the synthetic csv and return a dictionary of
+    {'seconds': ..., 'peak_bytes': ...} per stage name.
+    """
+    results = {}
+
+    def record(name, function, make_arguments=tuple):
+        result, seconds, peak_bytes = measure(function, make_arguments,
+                                              repeats)
+        results[name] = {'seconds': seconds, 'peak_bytes': peak_bytes}
+        print(f"{rows:>12,} {name:<36} {seconds:>9.4f} s "
+              f"{peak_bytes / 2 ** 20:>9.1f} MiB")
+        return result
+
+    if rows <= TEXT_STAGE_MAX_ROWS:
+        with open(csv_path, encoding='utf-8') as file:
+            csv_content = file.read()
+        data_list = record('parse_csv', parse_csv, lambda: (csv_content,))
+        del csv_content
+        raw_df = record('load_csv_into_dataframe', load_csv_into_dataframe,
+                        lambda: (data_list,))
+        del data_list
+        record('clean_data_for_observation', clean_data_for_observation,
+               lambda: (raw_df.copy(),))
+        del raw_df
+
+    observations_df = record('load_observations_streaming',
+                             load_observations_streaming,
+                             lambda: (csv_path,))
+    snowy_owl_trend = SnowyOwlTrend(load_population_trend(TREND_PATH))
+
+    # a new BirdObservation for every run, so nothing is memoized
+    def fresh():
+        return (BirdObservation(observations_df),)
+
+    for name in AGGREGATIONS:
+        record(name, getattr(BirdObservation, name), fresh)
+
+    record('analyze_correlation',
+           lambda bird_observation: analyze_correlation(
+               bird_observation, snowy_owl_trend,
+               resamples=DEFAULT_RESAMPLES, seed=0),
+           fresh)
+
+    # the yearly series that analyze_correlation tests
+    _, totals, index = yearly_series(fresh()[0], snowy_owl_trend)
+    paired = ~np.isnan(totals) & ~np.isnan(index)
+    totals, index = totals[paired], index[paired]
+    record('bootstrap_correlation_interval',
+           lambda: bootstrap_correlation_interval(
+               totals, index, resamples=SIGNIFICANCE_RESAMPLES, seed=0))
+    record('permutation_p_value',
+           lambda: permutation_p_value(
+               totals, index, permutations=SIGNIFICANCE_RESAMPLES, seed=0))
+
+    for name in PLOTS:
+        plot_function = getattr(visualizations, name)
+        if name == 'plot_population_trend':
+            record(name, render_figure,
+                   lambda: (plot_function, snowy_owl_trend))
+        elif name in ('plot_correlation', 'plot_cross_correlation'):
+            record(name, render_figure,
+                   lambda: (plot_function, fresh()[0], snowy_owl_trend))
+        else:
+            record(name, render_figure,
+                   lambda: (plot_function, fresh()[0]))
+    return results
+
+
+def environment():
+    """
+    Describe the machine and library versions the results come from.
+    """
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count()
+        }
+
+
+def read_baseline(path):
+    """
+    Return the saved baseline, or None if there is none.
+    """
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(path, all_results):
+    """
+    Save results as the baseline, keeping the saved results of scales
+    that were not run.
+    """
+    baseline = read_baseline(path) or {'results': {}}
+    baseline['environment'] = environment()
+    for rows, results in all_results.items():
+        baseline['results'][str(rows)] = results
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def find_regressions(all_results, baseline,
+                     time_threshold=DEFAULT_TIME_THRESHOLD,
+                     memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    Compare results with a baseline.
+
+    Returns a list of messages, one per stage and measure that grew by
+    more than its threshold (a fraction) and by more than the noise
+    floor.
+    """
+    regressions = []
+    for rows, results in all_results.items():
+        saved = baseline.get('results', {}).get(str(rows), {})
+        for stage, measures in results.items():
+            if stage not in saved:
+                continue
+            for key, threshold, floor in (
+                    ('seconds', time_threshold, MIN_SECONDS_CHANGE),
+                    ('peak_bytes', memory_threshold, MIN_BYTES_CHANGE)):
+                old, new = saved[stage][key], measures[key]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append(
+                        f"{stage} at {rows:,} rows: {key} went from "
+                        f"{old:.4g} to {new:.4g} "
+                        f"(+{(new / old - 1) * 100 if old else 100:.0f}%)")
+    return regressions
+
+
+def parse_arguments(argv):
+    """
+    Parse the command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline on synthetic eBird records.")
+    parser.add_argument('--rows', nargs='+', type=float,
+                        default=list(DEFAULT_ROWS),
+                        help="scales to run, e.g. 1e4 1e6 1e8")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the synthetic records")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory to keep generated csv files in")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="baseline file to compare with or save to")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="save the results as the new baseline")
+    parser.add_argument('--time-threshold', type=float,
+                        default=DEFAULT_TIME_THRESHOLD,
+                        help="allowed growth of a timing, e.g. 0.5")
+    parser.add_argument('--memory-threshold', type=float,
+                        default=DEFAULT_MEMORY_THRESHOLD,
+                        help="allowed growth of a memory peak, e.g. 0.25")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS,
+                        help="timed runs per stage")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET,
+                        help="allowed import time of an entry point, as a "
+                             "multiple of that of pandas")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the benchmarks, then save or check the baseline.
+    """
+    arguments = parse_arguments(sys.argv[1:] if argv is None else argv)
+    data_dir = arguments.data_dir or tempfile.mkdtemp()
+    os.makedirs(data_dir, exist_ok=True)
+
+    over_budget = check_import_budget(arguments.repeats,
+                                      arguments.import_budget)
+    all_results = {}
+    for rows in (int(rows) for rows in arguments.rows):
+        csv_path = os.path.join(data_dir,
+                                f"ebd-{rows}-seed{arguments.seed}.csv")
+        if not os.path.exists(csv_path):
+            print(f"Generating {rows:,} synthetic records...")
+            write_ebd_csv(csv_path, rows, arguments.seed)
+        all_results[rows] = run_benchmark(csv_path, rows, arguments.repeats)
+        if arguments.data_dir is None:
+            os.remove(csv_path)
+
+    regressions = list(over_budget)
+    baseline = read_baseline(arguments.baseline)
+    if arguments.save_baseline:
+        save_baseline(arguments.baseline, all_results)
+        print(f"Saved the baseline to {arguments.baseline}.")
+    elif baseline is None:
+        print(f"No baseline at {arguments.baseline}; run with "
+              f"--save-baseline to create one.")
+    else:
+        regressions += find_regressions(all_results, baseline,
+                                        arguments.time_threshold,
+                                        arguments.memory_threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+from ingestion import is_url
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'snowy_owl_dashboard')
+MANIFEST_NAME = 'manifest.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(path):
+    """
+    Return the sha256 hex digest of a local file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(source, previous=None, timeout=10):
+    """
+    Identify the current content of a source.
+
+    Local files are identified by a content hash. The hash from the
+    previous manifest is reused while the file size and modification
+    time are unchanged, so a warm start does not re-read the file.
+    Urls are identified by the ETag, or Last-Modified and
+    Content-Length, headers of a HEAD request.
+
+    Returns a dictionary, or None if the source cannot be reached.
+    """
+    try:
+        if is_url(source):
+            import requests
+            response = requests.head(source, timeout=timeout,
+                                     allow_redirects=True)
+            response.raise_for_status()
+            headers = response.headers
+            return {
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'content_length': headers.get('Content-Length')
+                }
+
+        stat = os.stat(source)
+        fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if previous and all(previous.get(key) == value
+                            for key, value in fingerprint.items()):
+            fingerprint['sha256'] = previous.get('sha256')
+        else:
+            fingerprint['sha256'] = hash_file(source)
+        return fingerprint
+    except OSError as e:
+        print(f"Could not fingerprint {source}: {e}")
+        return None
+
+
+def _content_key(fingerprint):
+    """
+    Reduce a fingerprint to the part that identifies the content.
+    """
+    if fingerprint is None:
+        return None
+    if 'sha256' in fingerprint:
+        return fingerprint['sha256']
+    if not any(fingerprint.values()):
+        # the server sent no validators, so the content is unknown
+        return None
+    return fingerprint
+
+
+def cache_entry_dir(source, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Return the cache directory that holds the frame for a source.
+    """
+    name = hashlib.sha256(str(source).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, name)
+
+
+def read_manifest(entry_dir):
+    """
+    Return the manifest of a cache entry, or None if there is none.
+    """
+    try:
+        with open(os.path.join(entry_dir, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_frame(df, entry_dir, metadata=None):
+    """
+    Save a DataFrame as one .npy file per column plus a json manifest.
+
+    Numeric, boolean and datetime columns are stored as raw arrays so
+    they can be memory-mapped on load. Text and categorical columns are
+    stored as integer codes plus an array of categories.
+    """
+    parent = os.path.dirname(entry_dir) or '.'
+    os.makedirs(parent, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(dir=parent)
+    columns = []
+    try:
+        for position, name in enumerate(df.columns):
+            series = df[name]
+            file_name = f"{position}.npy"
+            column = {'name': name, 'file': file_name}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column['kind'] = 'category'
+                codes = series.cat.codes.to_numpy()
+                categories = series.cat.categories.to_numpy()
+            elif (pd.api.types.is_numeric_dtype(series.dtype)
+                  or pd.api.types.is_datetime64_dtype(series.dtype)):
+                column['kind'] = 'array'
+                np.save(os.path.join(staging_dir, file_name),
+                        series.to_numpy())
+                columns.append(column)
+                continue
+            else:
+                column['kind'] = 'text'
+                codes, categories = pd.factorize(series)
+                categories = np.asarray(categories)
+            categories = np.asarray(categories.astype(str), dtype=str)
+            np.save(os.path.join(staging_dir, file_name),
+                    codes.astype(np.int32))
+            column['categories'] = f"{position}.categories.npy"
+            np.save(os.path.join(staging_dir, column['categories']),
+                    categories)
+            columns.append(column)
+
+        manifest = dict(metadata or {})
+        manifest['rows'] = len(df)
+        manifest['columns'] = columns
+        with open(os.path.join(staging_dir, MANIFEST_NAME), 'w') as file:
+            json.dump(manifest, file)
+
+        # swap the finished entry into place
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(staging_dir, entry_dir)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+
+def load_frame(entry_dir, manifest=None, mmap=True):
+    """
+    Load a DataFrame saved with save_frame.
+
+    With mmap, the array columns are memory-mapped rather than read:
+    their pages are only read when used. The mapping is copy-on-write,
+    so the frame can be modified without changing the cache.
+    """
+    manifest = manifest or read_manifest(entry_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No cache manifest in {entry_dir}")
+    mmap_mode = 'c' if mmap else None
+    rows = manifest['rows']
+    data = {}
+    for column in manifest['columns']:
+        path = os.path.join(entry_dir, column['file'])
+        # an interrupted append can leave rows the manifest does not count
+        if column['kind'] == 'array':
+            values = np.load(path, mmap_mode=mmap_mode)[:rows]
+            data[column['name']] = values.view(np.ndarray)
+            continue
+        codes = np.load(path)[:rows]
+        categories = np.load(os.path.join(entry_dir, column['categories']))
+        values = pd.Categorical.from_codes(codes, categories=categories)
+        if column['kind'] == 'text':
+            values = np.asarray(values, dtype=object)
+        data[column['name']] = values
+    # copy=False keeps the memory-mapped arrays as the columns
+    return pd.DataFrame(data, index=pd.RangeIndex(rows), copy=False)
+
+
+def write_manifest(entry_dir, manifest):
+    """
+    Replace the manifest of a cache entry in one step.
+    """
+    path = os.path.join(entry_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file)
+    os.replace(path + '.tmp', path)
+
+
+def _append_array(path, values, rows):
+    """
+    Append values to the first 'rows' rows of a one-dimensional .npy
+    file. The data is written at the end of the file and only the header
+    is rewritten, which numpy pads so that the length can grow in place.
+    """
+    with open(path, 'r+b') as file:
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = \
+                np.lib.format.read_array_header_2_0(file)
+        if len(shape) != 1 or dtype.hasobject or shape[0] < rows:
+            raise ValueError(f"Cannot append to {path}.")
+        if not np.can_cast(values.dtype, dtype, casting='same_kind'):
+            raise ValueError(
+                f"Cannot append {values.dtype} values to {dtype} in {path}.")
+        data_start = file.tell()
+        values = np.ascontiguousarray(values, dtype=dtype)
+
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (rows + len(values),)
+            })
+        if len(header.getvalue()) != data_start:
+            raise ValueError(f"The header of {path} cannot grow in place.")
+
+        file.seek(data_start + rows * dtype.itemsize)
+        file.write(values.tobytes())
+        file.truncate()
+        file.seek(0)
+        file.write(header.getvalue())
+
+
+def _append_codes(series, entry_dir, column, rows):
+    """
+    Append a text or categorical column as codes of the stored
+    categories, adding the values that were not seen before to the end
+    of the categories, so the existing codes stay valid.
+    """
+    categories_path = os.path.join(entry_dir, column['categories'])
+    categories = np.load(categories_path)
+    present = series.notna().to_numpy()
+    values = series[present].astype(str).to_numpy()
+    codes = np.full(len(series), -1, dtype=np.int32)
+    codes[present] = pd.Index(categories).get_indexer(values)
+
+    unseen = pd.unique(values[codes[present] < 0])
+    if len(unseen):
+        categories = np.concatenate([categories,
+                                     np.asarray(unseen, dtype=str)])
+        codes[present] = pd.Index(categories).get_indexer(values)
+        np.save(categories_path, categories)
+    _append_array(os.path.join(entry_dir, column['file']), codes, rows)
+
+
+def append_frame(df, entry_dir, metadata=None):
+    """
+    Append the rows of a DataFrame to an entry saved with save_frame,
+    and merge 'metadata' into its manifest.
+
+    Only the new rows are written. The manifest is replaced last, so an
+    interrupted append leaves the entry as it was.
+    """
+    manifest = read_manifest(entry_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No cache manifest in {entry_dir}")
+    rows = manifest['rows']
+    if len(df):
+        names = [column['name'] for column in manifest['columns']]
+        if sorted(names) != sorted(df.columns):
+            raise ValueError(f"The columns {list(df.columns)} do not match "
+                             f"the cached columns {names}.")
+        for column in manifest['columns']:
+            series = df[column['name']]
+            if column['kind'] == 'array':
+                _append_array(os.path.join(entry_dir, column['file']),
+                              series.to_numpy(), rows)
+            else:
+                _append_codes(series, entry_dir, column, rows)
+
+    manifest.update(metadata or {})
+    manifest['rows'] = rows + len(df)
+    write_manifest(entry_dir, manifest)
+
+
+def load_cached_frame(source, build, version, cache_dir=DEFAULT_CACHE_DIR,
+                      describe=None):
+    """
+    Return the cleaned DataFrame for a source, from the cache if it is
+    still valid, otherwise by calling build(source) and caching the
+    result.
+
+    An entry is valid when it was built with the same cleaning 'version'
+    and the source content has not changed. If the source cannot be
+    reached, an existing entry is used as it is. describe(df), if given,
+    returns extra fields to store in the manifest of a new entry.
+    """
+    entry_dir = cache_entry_dir(source, cache_dir)
+    manifest = read_manifest(entry_dir)
+    previous = manifest.get('fingerprint') if manifest else None
+    fingerprint = source_fingerprint(source, previous)
+
+    if manifest and manifest.get('version') == version:
+        content_key = _content_key(fingerprint)
+        if fingerprint is None or (
+                content_key is not None
+                and content_key == _content_key(previous)):
+            try:
+                df = load_frame(entry_dir, manifest)
+                print(f"Loaded cached data for {source}.")
+                return df
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error while reading cached data for {source}: {e}")
+
+    df = build(source)
+    if df is None:
+        return None
+
+    metadata = describe(df) if describe else {}
+    metadata.update({
+        'source': str(source),
+        'version': version,
+        'fingerprint': fingerprint
+        })
+    try:
+        save_frame(df, entry_dir, metadata)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Error while caching data for {source}: {e}")
+    return df
+
+
+def update_cached_frame(source, load_new_rows, version,
+                        cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Bring the cached frame of a source up to date by appending only the
+    rows added to the source since it was cached.
+
+    load_new_rows(source, manifest) returns a DataFrame of the new,
+    cleaned rows and a dictionary of fields to update in the manifest,
+    or None if it cannot tell which rows are new.
+
+    Returns a tuple of the whole frame and the new rows, or None if
+    there is no entry of this 'version' to append to, in which case the
+    frame must be built in full with load_cached_frame.
+    """
+    entry_dir = cache_entry_dir(source, cache_dir)
+    manifest = read_manifest(entry_dir)
+    if manifest is None or manifest.get('version') != version:
+        return None
+
+    previous = manifest.get('fingerprint')
+    fingerprint = source_fingerprint(source, previous)
+    content_key = _content_key(fingerprint)
+    try:
+        if fingerprint is None or (
+                content_key is not None
+                and content_key == _content_key(previous)):
+            print(f"Cached data for {source} is up to date.")
+            return load_frame(entry_dir, manifest), pd.DataFrame()
+
+        result = load_new_rows(source, manifest)
+        if result is None:
+            return None
+        new_rows, updates = result
+        updates['fingerprint'] = fingerprint
+        append_frame(new_rows, entry_dir, updates)
+        print(f"Appended {len(new_rows)} new rows to the cached data "
+              f"for {source}.")
+        return load_frame(entry_dir), new_rows
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error while updating cached data for {source}: {e}")
+        return None
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+ALL_REGIONS = 'All'
+MONTHS = np.arange(1, 13)
+
+
+class AggregateCube:
+    """
+    Represent the observation counts summed into a dense
+    year x month x region array, so that any year, month range and
+    region selection is answered by slicing instead of scanning the
+    records.
+    """
+    def __init__(self, years, regions, counts, records):
+        """
+        Initialize the cube from its axis labels and arrays of shape
+        (years, 12, regions).
+        """
+        self._set_axes(years, regions, counts, records)
+
+    def _set_axes(self, years, regions, counts, records):
+        """
+        Store the axis labels and arrays, and index the labels.
+        """
+        self.years = np.asarray(years)
+        self.regions = list(regions)
+        self.counts = counts
+        self.records = records
+        self._year_positions = {int(year): position
+                                for position, year in enumerate(self.years)}
+        self._region_positions = {str(region).lower(): position
+                                  for position, region
+                                  in enumerate(self.regions)}
+
+    @classmethod
+    def from_dataframe(cls, df, region_column='STATE'):
+        """
+        Build the cube from cleaned observation records with 'Year',
+        'Month' and 'OBSERVATION COUNT' columns. Records without a year
+        or month are left out; missing counts add nothing.
+        """
+        valid = df['Year'].notna() & df['Month'].notna()
+        df = df[valid]
+        year_values = df['Year'].to_numpy().astype(np.int64)
+        month_index = df['Month'].to_numpy().astype(np.int64) - 1
+        years, year_index = np.unique(year_values, return_inverse=True)
+
+        if region_column in df.columns:
+            region_codes, regions = pd.factorize(df[region_column],
+                                                 sort=True)
+            regions = [str(region) for region in regions]
+            # records without a region are only counted in the totals
+            missing_region = region_codes < 0
+            region_codes = np.where(missing_region, len(regions),
+                                    region_codes)
+            regions_with_missing = len(regions) + int(missing_region.any())
+        else:
+            region_codes = np.zeros(len(df), dtype=np.int64)
+            regions = [ALL_REGIONS]
+            regions_with_missing = 1
+
+        shape = (len(years), 12, regions_with_missing)
+        flat_index = ((year_index * 12 + month_index) * shape[2]
+                      + region_codes)
+        weights = pd.to_numeric(df['OBSERVATION COUNT'],
+                                errors='coerce').fillna(0).to_numpy()
+        size = int(np.prod(shape))
+        counts = np.bincount(flat_index, weights=weights,
+                             minlength=size).reshape(shape)
+        records = np.bincount(flat_index, minlength=size).reshape(shape)
+        return cls(years, regions, counts, records)
+
+    def add(self, other):
+        """
+        Add the counts of another cube, such as one built from newly
+        appended records, to this cube. The year and region axes are
+        widened when the other cube has years or regions this one lacks.
+        """
+        years = np.union1d(self.years, other.years)
+        regions = sorted(set(self.regions) | set(other.regions))
+        has_missing = (self.counts.shape[2] > len(self.regions)
+                       or other.counts.shape[2] > len(other.regions))
+        shape = (len(years), 12, len(regions) + int(has_missing))
+
+        if shape != self.counts.shape or regions != self.regions:
+            counts = np.zeros(shape, dtype=self.counts.dtype)
+            records = np.zeros(shape, dtype=self.records.dtype)
+            self._add_into(counts, records, years, regions, self)
+        else:
+            counts, records = self.counts, self.records
+        self._add_into(counts, records, years, regions, other)
+
+        self._set_axes(years, regions, counts, records)
+
+    @staticmethod
+    def _add_into(counts, records, years, regions, cube):
+        """
+        Add the arrays of a cube into arrays with the given year and
+        region axes, which hold all of its years and regions.
+        """
+        positions = {region: position
+                     for position, region in enumerate(regions)}
+        region_index = [positions[region] for region in cube.regions]
+        # the records without a region are kept in the last column
+        if cube.counts.shape[2] > len(cube.regions):
+            region_index.append(len(regions))
+        index = np.ix_(np.searchsorted(years, cube.years), np.arange(12),
+                       region_index)
+        counts[index] += cube.counts
+        records[index] += cube.records
+
+    def _year_slice(self, year):
+        """
+        Return the index selecting one year, or every year if None.
+        """
+        if year is None:
+            return slice(None)
+        position = self._year_positions.get(int(year))
+        if position is None:
+            return slice(0, 0)
+        return position
+
+    def _month_slice(self, months):
+        """
+        Return the index selecting an inclusive (first, last) month
+        range, or every month if None.
+        """
+        if months is None:
+            return slice(None)
+        first, last = months
+        return slice(first - 1, last)
+
+    def _region_index(self, regions):
+        """
+        Return the index selecting the given region names
+        (case-insensitive), or every region if None.
+        """
+        if regions is None:
+            return slice(None)
+        if isinstance(regions, str):
+            regions = [regions]
+        return [self._region_positions[region.lower()]
+                for region in regions
+                if region.lower() in self._region_positions]
+
+    def _select(self, array, year=None, months=None, regions=None):
+        """
+        Slice an array of the cube down to the selection, keeping the
+        year, month and region axes.
+        """
+        selection = array[:, self._month_slice(months)]
+        selection = selection[..., self._region_index(regions)]
+        year_index = self._year_slice(year)
+        if isinstance(year_index, slice):
+            return selection[year_index]
+        return selection[year_index:year_index + 1]
+
+    def monthly_totals(self, year=None, months=None, regions=None):
+        """
+        Return a DataFrame with the total count for each month of the
+        selection that has any records.
+        """
+        first_month = 1 if months is None else months[0]
+        counts = self._select(self.counts, year, months, regions)
+        records = self._select(self.records, year, months, regions)
+        totals = counts.sum(axis=(0, 2))
+        present = records.sum(axis=(0, 2)) > 0
+        month_numbers = np.arange(first_month, first_month + len(totals))
+        return pd.DataFrame({
+            'Month': month_numbers[present],
+            'OBSERVATION COUNT': totals[present]
+            })
+
+    def peak_monthly_total(self, regions=None):
+        """
+        Return the highest total count of a single month of any year in
+        the selection, or 0 if it is empty.
+        """
+        totals = self._select(self.counts, regions=regions).sum(axis=2)
+        return float(totals.max()) if totals.size else 0.0
+
+    def yearly_totals(self, months=None, regions=None):
+        """
+        Return a DataFrame with the total count for each year of the
+        selection that has any records.
+        """
+        counts = self._select(self.counts, None, months, regions)
+        records = self._select(self.records, None, months, regions)
+        present = records.sum(axis=(1, 2)) > 0
+        return pd.DataFrame({
+            'Year': self.years[present],
+            'OBSERVATION COUNT': counts.sum(axis=(1, 2))[present]
+            })
+
+    def total(self, year=None, months=None, regions=None):
+        """
+        Return the total count of the selection.
+        """
+        return float(self._select(self.counts, year, months, regions).sum())
@@ -1,5 +1,24 @@
+import numpy as np
 import pandas as pd
 
+from classes.aggregate_cube import AggregateCube
+from classes.date_range_index import DateRangeIndex
+from classes.observation_query import ObservationQuery
+from classes.spatial_pyramid import SpatialPyramid
+from ingestion import concat_batches
+from instrumentation import span
+
+PANDAS_MAJOR = int(pd.__version__.split('.')[0])
+
+
+def _copy_on_write():
+    """
+    Return True if pandas copies shared data when it is written to,
+    which is always the case from pandas 3.0 and an option in pandas 2.
+    """
+    return PANDAS_MAJOR >= 3 or pd.get_option('mode.copy_on_write') is True
+
+
 class BirdObservation:
     """
     Represent the observation records of Snowy Owls from ebird.
@@ -14,12 +33,182 @@ class BirdObservation:
 
         self.data = dataframe
 
+    @classmethod
+    def from_store(cls, store):
+        """
+        Create an instance whose records stay in an ObservationStore.
+        The aggregates and the lookups by state and county are computed
+        by the store, so the records need not fit in memory; the other
+        methods read all records into memory the first time they are
+        used.
+        """
+        bird_observation = cls(pd.DataFrame())
+        bird_observation.store = store
+        bird_observation._data = None
+        return bird_observation
+
+    @property
+    def data(self):
+        """
+        The observation records. Records kept in a store are read into
+        memory on first access.
+        """
+        if self._data is None:
+            self._data = concat_batches(list(self.store.iter_batches()))
+        return self._data
+
+    def __len__(self):
+        if self._data is None:
+            return len(self.store)
+        return len(self._data)
+
+    @property
+    def columns(self):
+        """
+        The names of the record columns, without reading records kept in
+        a store.
+        """
+        if self._data is None:
+            return self.store.columns
+        return list(self._data.columns)
+
+    @data.setter
+    def data(self, dataframe):
+        """
+        Replace the observation records, which are then kept in memory,
+        and forget the aggregates that were computed from the old ones.
+        """
+        self.store = None
+        self._data = dataframe
+        self.invalidate_aggregates()
+
+    def invalidate_aggregates(self):
+        """
+        Forget all memoized aggregates. Call this after changing
+        self.data in place; assigning a new DataFrame does it
+        automatically.
+        """
+        self._aggregates = {}
+
+    def preload_aggregates(self, aggregates):
+        """
+        Store aggregates computed elsewhere, such as the merged
+        aggregates of a parallel load (see partitioned.py), keyed like
+        the memoized ones, so they are not computed again.
+        """
+        self._aggregates.update(aggregates)
+
+    def append_data(self, new_records):
+        """
+        Append newly ingested records and update the memoized
+        aggregates with only the new records. The year, month, state and
+        location sums, the aggregate cube and the region indexes are
+        updated in place; the date range index and the spatial pyramid
+        are rebuilt the next time they are used.
+        """
+        if new_records is None or new_records.empty:
+            return
+        offset = len(self)
+        new_observation = BirdObservation(new_records)
+        date_parts = [part for part in ('Year', 'Month')
+                      if part in self.columns]
+        new_observation._ensure_date_parts(*date_parts)
+        if self.store is not None:
+            self.store.append(new_observation.data)
+            if self._data is not None:
+                self._data = concat_batches([self._data,
+                                             new_observation.data])
+        else:
+            self._data = concat_batches([self._data, new_observation.data])
+
+        group_columns = {
+            'year': 'Year',
+            'month': 'Month',
+            'state': 'STATE',
+            'location': ['STATE', 'COUNTY']
+            }
+        aggregates = {}
+        for key, aggregate in self._aggregates.items():
+            if key in group_columns:
+                columns = group_columns[key]
+                aggregates[key] = pd.concat(
+                    [aggregate, new_observation._sum_counts_by(columns)],
+                    ignore_index=True).groupby(
+                        columns, observed=True, as_index=False)[
+                        'OBSERVATION COUNT'].sum()
+            elif key == 'cube':
+                aggregate.add(new_observation.get_aggregate_cube())
+                aggregates[key] = aggregate
+            elif isinstance(key, tuple) and key[0] == 'region index':
+                aggregates[key] = self._extend_region_index(
+                    aggregate, new_observation._build_region_index(key[1]),
+                    offset)
+        self._aggregates = aggregates
+
+    @staticmethod
+    def _extend_region_index(index, new_index, offset):
+        """
+        Add the row positions of appended records, which start at
+        'offset', to a region index.
+        """
+        index = dict(index)
+        for key, positions in new_index.items():
+            positions = positions + offset
+            if key in index:
+                positions = np.concatenate([index[key], positions])
+            index[key] = positions
+        return index
+
+    def _memoized(self, key, compute, copy=True):
+        """
+        Return a copy of the aggregate stored under 'key', computing it
+        the first time. With Copy-on-Write the copy is shallow: it shares
+        memory with the stored result until the caller writes to it.
+        Without it, on pandas 2, the copy is deep.
+        """
+        if key not in self._aggregates:
+            with span('aggregate', key=str(key), rows=len(self)):
+                self._aggregates[key] = compute()
+        if copy:
+            return self._aggregates[key].copy(deep=not _copy_on_write())
+        return self._aggregates[key]
+
+    def _ensure_date_parts(self, *parts):
+        """
+        Derive date part columns such as 'Year' and 'Month' from the
+        observation date if the cleaning step has not already done so.
+        Records in a store are cleaned, so they have them.
+        """
+        if self.store is not None:
+            return
+        missing = [part for part in parts
+                   if part not in self._data.columns]
+        if not missing:
+            return
+        dates = self._data['OBSERVATION DATE']
+        if not pd.api.types.is_datetime64_dtype(dates):
+            dates = pd.to_datetime(dates, errors='coerce')
+        for part in missing:
+            self._data[part] = getattr(dates.dt, part.lower())
+
+    def _sum_counts_by(self, columns):
+        """
+        Sum the observation counts for each group of 'columns'.
+        """
+        if self.store is not None:
+            return self.store.sum_counts_by(columns)
+        return self._data.groupby(columns, observed=True)[
+            'OBSERVATION COUNT'].sum().reset_index()
+
     def peek_the_data(self, n=10):
         """
         Display the top 'n' entries of the records.
         """
         try:
-            peek_data = self.data.head(n)
+            if self._data is None:
+                peek_data = self.store.select(limit=n)
+            else:
+                peek_data = self.data.head(n)
             print(f"Displaying the top {n} entries of the records...")
             print(peek_data)
             return peek_data
@@ -29,8 +218,11 @@ class BirdObservation:
 
     def get_descriptive_summary(self):
         """
-        Return a descriptive summary of the data.
+        Return a descriptive summary of the data. The summary of records
+        kept in a store is computed by the store.
         """
+        if self._data is None:
+            return self.store.describe()
         return self.data.describe()
 
     def aggregate_observations_by_year(self):
@@ -38,14 +230,9 @@ class BirdObservation:
         Aggregate the observation records by year.
         """
         try:
-            # convert the observation date to a datetime format and
-            # get the year.
-            self.data['Year'] = pd.to_datetime(self.data[
-                                                   'OBSERVATION '
-                                                   'DATE'],
-                                               errors='coerce').dt.year
-            observations_per_year = self.data.groupby('Year')[
-                'OBSERVATION COUNT'].sum().reset_index()
+            self._ensure_date_parts('Year')
+            observations_per_year = self._memoized(
+                'year', lambda: self._sum_counts_by('Year'))
             return observations_per_year
         except Exception as e:
             print(f"Error while aggregating observations: {e}")
@@ -57,21 +244,181 @@ class BirdObservation:
         states and counties.
         """
         try:
-            aggregation = self.data.groupby(['STATE', 'COUNTY'])[
-                'OBSERVATION COUNT'].sum().reset_index()
+            aggregation = self._memoized(
+                'location', lambda: self._sum_counts_by(['STATE', 'COUNTY']))
+            return aggregation
+        except Exception as e:
+            print(f"Error while aggregating observations: {e}")
+            return pd.DataFrame()
+
+    def aggregate_observations_by_month(self):
+        """
+        Aggregate the observation records by month, over all years.
+        """
+        try:
+            self._ensure_date_parts('Month')
+            observations_per_month = self._memoized(
+                'month', lambda: self._sum_counts_by('Month'))
+            return observations_per_month
+        except Exception as e:
+            print(f"Error while aggregating observations: {e}")
+            return pd.DataFrame()
+
+    def aggregate_observations_by_state(self):
+        """
+        Aggregate the observation records by state.
+        """
+        try:
+            aggregation = self._memoized(
+                'state', lambda: self._sum_counts_by('STATE'))
             return aggregation
         except Exception as e:
             print(f"Error while aggregating observations: {e}")
             return pd.DataFrame()
 
+    def get_aggregate_cube(self):
+        """
+        Return the year x month x state AggregateCube of the records,
+        building it the first time. The cube is shared, not copied, and
+        must be treated as read-only.
+        """
+        self._ensure_date_parts('Year', 'Month')
+        if self.store is not None:
+            # the cube of the sums per group has the counts of the
+            # records; its record counts, which only mark the cells
+            # with records, are counts of groups
+            return self._memoized(
+                'cube', lambda: AggregateCube.from_dataframe(
+                    self.store.sum_counts_by(['Year', 'Month', 'STATE'],
+                                             dropna=False)),
+                copy=False)
+        return self._memoized(
+            'cube', lambda: AggregateCube.from_dataframe(self._data),
+            copy=False)
+
+    def get_date_range_index(self):
+        """
+        Return the DateRangeIndex of cumulative daily counts per state,
+        building it the first time. The index is shared, not copied,
+        and must be treated as read-only.
+        """
+        if self.store is not None:
+            return self._memoized(
+                'date range', lambda: DateRangeIndex.from_dataframe(
+                    self.store.sum_counts_by(['OBSERVATION DATE', 'STATE'],
+                                             dropna=False)),
+                copy=False)
+        return self._memoized(
+            'date range', lambda: DateRangeIndex.from_dataframe(self._data),
+            copy=False)
+
+    def get_spatial_pyramid(self):
+        """
+        Return the SpatialPyramid of counts per map cell, year and month,
+        building it the first time. The pyramid is shared, not copied,
+        and must be treated as read-only.
+        """
+        self._ensure_date_parts('Year', 'Month')
+        return self._memoized(
+            'spatial pyramid',
+            lambda: SpatialPyramid.from_dataframe(self.data), copy=False)
+
+    def get_total_in_date_range(self, start=None, end=None, states=None):
+        """
+        Return the total observation count from 'start' to 'end'
+        (inclusive dates), optionally only in the given state or states.
+        """
+        try:
+            return self.get_date_range_index().total(start, end, states)
+        except Exception as e:
+            print(f"Error while totalling observations: {e}")
+            return None
+
+    def _build_region_index(self, column):
+        """
+        Map each lower-cased value of a column to the sorted positions
+        of the rows that hold it.
+        """
+        codes, uniques = pd.factorize(self._data[column])
+        order = np.argsort(codes, kind='stable')
+        sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # rows without a value have code -1 and are sorted first
+        start = int((codes < 0).sum())
+        index = {}
+        for value, size in zip(uniques, sizes):
+            key = str(value).lower()
+            positions = order[start:start + size]
+            start += size
+            if key in index:
+                positions = np.sort(np.concatenate([index[key], positions]))
+            index[key] = positions
+        return index
+
+    def _get_region_index(self, column):
+        """
+        Return the lower-cased value index of a region column, building
+        it the first time.
+        """
+        return self._memoized(
+            ('region index', column),
+            lambda: self._build_region_index(column), copy=False)
+
+    def _rows_at(self, positions):
+        """
+        Return the records at the given sorted row positions. A
+        contiguous run of rows is returned as a slice of the records
+        rather than a copy. Either way writing to the result does not
+        change the records.
+        """
+        if len(positions) and positions[-1] - positions[0] + 1 == len(
+                positions):
+            return self._data.iloc[positions[0]:positions[-1] + 1]
+        return self._data.iloc[positions]
+
+    def _lookup_rows(self, column, values):
+        """
+        Return the sorted row positions whose column matches any of the
+        values, ignoring case.
+        """
+        if isinstance(values, str):
+            values = [values]
+        index = self._get_region_index(column)
+        matches = [index[value.lower()] for value in values
+                   if value.lower() in index]
+        if not matches:
+            return np.array([], dtype=np.int64)
+        if len(matches) == 1:
+            return matches[0]
+        return np.sort(np.concatenate(matches))
+
+    def _select(self, filters):
+        """
+        Return the records whose columns match any of the given values,
+        ignoring case; 'filters' maps a region column to a value or a
+        list of values. A store looks them up with its indexes.
+        """
+        if self.store is not None:
+            return self.store.select(filters)
+        positions = None
+        for column, values in filters.items():
+            rows = self._lookup_rows(column, values)
+            positions = rows if positions is None else np.intersect1d(
+                positions, rows, assume_unique=True)
+        return self._rows_at(positions)
+
+    def query(self):
+        """
+        Start a lazy query of the records, narrowed by chaining filters
+        on the returned ObservationQuery.
+        """
+        return ObservationQuery(self)
 
     def get_data_by_state(self, state):
         """
         Retrieve records for a certain state.
         """
         try:
-            state_data = self.data[
-                self.data['STATE'].str.lower() == state.lower()]
+            state_data = self._select({'STATE': state})
             if state_data.empty:
                 print(f"State '{state}' not found.")
             else:
@@ -80,3 +427,29 @@ class BirdObservation:
         except Exception as e:
             print(f"Error while retrieving data: {e}")
 
+    def get_data_by_states(self, states):
+        """
+        Retrieve records for several states at once.
+        """
+        try:
+            return self._select({'STATE': states})
+        except Exception as e:
+            print(f"Error while retrieving data: {e}")
+            return pd.DataFrame()
+
+    def get_data_by_county(self, county, state=None):
+        """
+        Retrieve records for a certain county, optionally only within
+        one state.
+        """
+        try:
+            filters = {'COUNTY': county}
+            if state is not None:
+                filters['STATE'] = state
+            county_data = self._select(filters)
+            if county_data.empty:
+                print(f"County '{county}' not found.")
+            return county_data
+        except Exception as e:
+            print(f"Error while retrieving data: {e}")
+            return pd.DataFrame()
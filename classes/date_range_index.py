@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+
+class DateRangeIndex:
+    """
+    Represent cumulative daily observation counts per region, so the
+    total of any date range, in any region, is the difference of two
+    prefix sums.
+    """
+    def __init__(self, first_day, regions, prefix, total_prefix):
+        """
+        Initialize the index from the first day it covers, the region
+        names, the per-region prefix sums of shape (days + 1, regions)
+        and the prefix sums over all records of shape (days + 1,).
+        """
+        self.first_day = np.datetime64(first_day, 'D')
+        self.regions = list(regions)
+        self.prefix = prefix
+        self.total_prefix = total_prefix
+        self._region_positions = {str(region).lower(): position
+                                  for position, region
+                                  in enumerate(self.regions)}
+
+    @classmethod
+    def from_dataframe(cls, df, region_column='STATE'):
+        """
+        Build the index from cleaned observation records with
+        'OBSERVATION DATE' and 'OBSERVATION COUNT' columns. Records
+        without a date are left out; missing counts add nothing.
+        """
+        dates = pd.to_datetime(df['OBSERVATION DATE'], errors='coerce')
+        valid = dates.notna().to_numpy()
+        days = dates.to_numpy()[valid].astype('datetime64[D]')
+        weights = pd.to_numeric(df['OBSERVATION COUNT'],
+                                errors='coerce').fillna(0).to_numpy()[valid]
+        if len(days) == 0:
+            return cls(np.datetime64('1970-01-01'), [],
+                       np.zeros((1, 0)), np.zeros(1))
+
+        first_day = days.min()
+        day_index = (days - first_day).astype(np.int64)
+        day_count = int(day_index.max()) + 1
+
+        total_prefix = np.zeros(day_count + 1)
+        total_prefix[1:] = np.cumsum(
+            np.bincount(day_index, weights=weights, minlength=day_count))
+
+        if region_column in df.columns:
+            region_codes, regions = pd.factorize(
+                df[region_column].to_numpy()[valid], sort=True)
+            regions = [str(region) for region in regions]
+        else:
+            region_codes = np.full(len(days), -1)
+            regions = []
+
+        # records without a region are only counted in the totals
+        has_region = region_codes >= 0
+        daily = np.bincount(
+            day_index[has_region] * len(regions) + region_codes[has_region],
+            weights=weights[has_region],
+            minlength=day_count * len(regions)
+            ).reshape(day_count, len(regions))
+        prefix = np.zeros((day_count + 1, len(regions)))
+        prefix[1:] = np.cumsum(daily, axis=0)
+        return cls(first_day, regions, prefix, total_prefix)
+
+    def _position(self, date, default):
+        """
+        Return the row of the prefix sums before the given day, clamped
+        to the days the index covers.
+        """
+        if date is None:
+            return default
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        position = int((day - self.first_day).astype(np.int64))
+        return min(max(position, 0), len(self.total_prefix) - 1)
+
+    def _bounds(self, start, end):
+        """
+        Return the prefix sum rows for an inclusive date range.
+        """
+        first = self._position(start, 0)
+        last = len(self.total_prefix) - 1
+        if end is not None:
+            last = self._position(pd.Timestamp(end) + pd.Timedelta(days=1),
+                                  last)
+        return first, max(first, last)
+
+    def total(self, start=None, end=None, regions=None):
+        """
+        Return the total count from 'start' to 'end' (inclusive dates,
+        open-ended if None), optionally in the given regions
+        (case-insensitive).
+        """
+        first, last = self._bounds(start, end)
+        if regions is None:
+            return float(self.total_prefix[last] - self.total_prefix[first])
+        return float(sum(self.totals_by_region(start, end, regions).values()))
+
+    def totals_by_region(self, start=None, end=None, regions=None):
+        """
+        Return a dictionary of the total count from 'start' to 'end'
+        for each region, or for the given regions only.
+        """
+        first, last = self._bounds(start, end)
+        if regions is None:
+            regions = self.regions
+        elif isinstance(regions, str):
+            regions = [regions]
+        totals = {}
+        for region in regions:
+            position = self._region_positions.get(region.lower())
+            if position is None:
+                totals[region] = 0.0
+            else:
+                totals[region] = float(self.prefix[last, position]
+                                       - self.prefix[first, position])
+        return totals
@@ -0,0 +1,358 @@
+import numpy as np
+import pandas as pd
+
+COUNT_COLUMN = 'OBSERVATION COUNT'
+
+# Filters on a range of values, with the column they filter.
+RANGE_FILTERS = {
+    'dates': 'OBSERVATION DATE',
+    'latitudes': 'LATITUDE',
+    'longitudes': 'LONGITUDE',
+    'counts': COUNT_COLUMN
+    }
+# Filters on a set of values, with the column they filter. Names are
+# compared ignoring case, identifiers exactly.
+SET_FILTERS = {
+    'states': 'STATE',
+    'counties': 'COUNTY',
+    'species': 'COMMON NAME',
+    'observers': 'OBSERVER ID'
+    }
+CASELESS_FILTERS = ('states', 'counties', 'species')
+# Filters answered by the row positions of BirdObservation's region
+# index instead of a mask.
+REGION_INDEX_FILTERS = ('states', 'counties')
+# Filters the aggregate cube and the date range index can answer.
+PRECOMPUTED_FILTERS = {'dates', 'states'}
+
+# Execution paths of a query, from the cheapest.
+PLANS = ('date range index', 'aggregate cube', 'store', 'region index',
+         'mask')
+
+
+def _as_set(values, caseless):
+    """
+    Return one value or a list of values as a frozenset, lower-cased if
+    they are compared ignoring case.
+    """
+    if isinstance(values, str):
+        values = [values]
+    return frozenset(str(value).lower() if caseless else value
+                     for value in values)
+
+
+def _narrow_range(previous, value):
+    """
+    Return the intersection of two (low, high) ranges, where None is
+    unbounded.
+    """
+    lows = [low for low in (previous[0], value[0]) if low is not None]
+    highs = [high for high in (previous[1], value[1]) if high is not None]
+    return (max(lows) if lows else None, min(highs) if highs else None)
+
+
+def _caseless_isin(series, values):
+    """
+    Return a boolean mask of the values of a series that are in a set of
+    lower-cased values, ignoring case. A categorical series is compared
+    through its categories, which are far fewer than its values.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        keep = series.cat.categories.astype(str).str.lower().isin(values)
+        # missing values have code -1, which picks the appended False
+        return np.append(keep, False)[series.cat.codes.to_numpy()]
+    return (series.notna() & series.astype(str).str.lower().isin(values)
+            ).to_numpy()
+
+
+class ObservationQuery:
+    """
+    Represent a lazy selection of the observation records of a
+    BirdObservation, built by chaining filters such as
+    bird_observation.query().between('2010-01-01', '2015-12-31')
+    .in_states(['Ontario', 'Quebec']).with_count(minimum=2).
+
+    Filters are combined with AND, and giving the same filter twice
+    narrows it. Nothing is read until a result is asked for; each result
+    is then computed on the cheapest path that can answer the filters
+    (see explain): the date range index or the aggregate cube, the
+    indexes of an ObservationStore, the region index, or a mask over
+    only the columns the query uses.
+    """
+    def __init__(self, bird_observation, filters=None, columns=None):
+        """
+        Initialize a query of the records of 'bird_observation'.
+        """
+        self.bird_observation = bird_observation
+        self.filters = dict(filters or {})
+        self.columns = columns
+
+    def __repr__(self):
+        return (f"ObservationQuery(filters={self.filters!r}, "
+                f"columns={self.columns!r})")
+
+    def _narrow(self, name, value):
+        """
+        Return a new query with a filter added or narrowed.
+        """
+        filters = dict(self.filters)
+        if name in filters:
+            if name in SET_FILTERS:
+                value = filters[name] & value
+            else:
+                value = _narrow_range(filters[name], value)
+        filters[name] = value
+        return ObservationQuery(self.bird_observation, filters,
+                                self.columns)
+
+    # Filters
+
+    def between(self, start=None, end=None):
+        """
+        Keep the records observed from 'start' to 'end', inclusive
+        dates. Either end can be None.
+        """
+        return self._narrow('dates', (
+            None if start is None else pd.Timestamp(start).normalize(),
+            None if end is None else pd.Timestamp(end).normalize()))
+
+    def within(self, south, west, north, east):
+        """
+        Keep the records inside a latitude and longitude bounding box,
+        edges included.
+        """
+        return self._narrow('latitudes', (south, north))._narrow(
+            'longitudes', (west, east))
+
+    def in_states(self, states):
+        """
+        Keep the records of a state or list of states, ignoring case.
+        """
+        return self._narrow('states', _as_set(states, True))
+
+    def in_counties(self, counties):
+        """
+        Keep the records of a county or list of counties, ignoring case.
+        """
+        return self._narrow('counties', _as_set(counties, True))
+
+    def with_count(self, minimum=None, maximum=None):
+        """
+        Keep the records whose observation count is from 'minimum' to
+        'maximum', inclusive. Either bound can be None.
+        """
+        return self._narrow('counts', (minimum, maximum))
+
+    def by_observers(self, observers):
+        """
+        Keep the records of an observer ID or list of observer IDs.
+        """
+        return self._narrow('observers', _as_set(observers, False))
+
+    def of_species(self, species):
+        """
+        Keep the records of a species or list of species by common name,
+        ignoring case.
+        """
+        return self._narrow('species', _as_set(species, True))
+
+    def select(self, columns):
+        """
+        Only read and return the given columns of the records.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        return ObservationQuery(self.bird_observation, self.filters,
+                                list(columns))
+
+    # Planning
+
+    def _whole_years(self):
+        """
+        Return the first and last year of the date filter if it covers
+        whole years, (None, None) without a date filter, or None.
+        """
+        start, end = self.filters.get('dates', (None, None))
+        if start is not None and (start.month, start.day) != (1, 1):
+            return None
+        if end is not None and (end.month, end.day) != (12, 31):
+            return None
+        return (None if start is None else start.year,
+                None if end is None else end.year)
+
+    def explain(self, operation='records'):
+        """
+        Return the name of the path (one of PLANS) that would compute
+        'operation': 'records', 'total', 'yearly', 'monthly' or 'sum'.
+        """
+        names = set(self.filters)
+        if names <= PRECOMPUTED_FILTERS:
+            if operation == 'total':
+                return ('date range index' if 'dates' in names
+                        else 'aggregate cube')
+            years = self._whole_years()
+            if operation == 'yearly' and years is not None:
+                return 'aggregate cube'
+            if (operation == 'monthly' and years is not None
+                    and years[0] == years[1]):
+                return 'aggregate cube'
+        if self.bird_observation.store is not None:
+            return 'store'
+        if names & set(REGION_INDEX_FILTERS):
+            return 'region index'
+        return 'mask'
+
+    def _store_arguments(self):
+        """
+        Return the filters and ranges of the query for an
+        ObservationStore.
+        """
+        filters = {SET_FILTERS[name]: sorted(values)
+                   for name, values in self.filters.items()
+                   if name in SET_FILTERS}
+        ranges = [(RANGE_FILTERS[name], *value)
+                  for name, value in self.filters.items()
+                  if name in RANGE_FILTERS]
+        return {'filters': filters, 'ranges': ranges}
+
+    def _mask(self, frame, name, value):
+        """
+        Return the boolean mask of the rows of a frame kept by a filter.
+        """
+        if name in SET_FILTERS:
+            column = frame[SET_FILTERS[name]]
+            if name in CASELESS_FILTERS:
+                return _caseless_isin(column, value)
+            return column.isin(list(value)).to_numpy()
+
+        column = frame[RANGE_FILTERS[name]]
+        low, high = value
+        mask = np.ones(len(frame), dtype=bool)
+        if low is not None:
+            mask &= (column >= low).to_numpy()
+        if high is not None:
+            if name == 'dates':
+                # the whole last day, whatever the time of day
+                mask &= (column < high + pd.Timedelta(days=1)).to_numpy()
+            else:
+                mask &= (column <= high).to_numpy()
+        return mask
+
+    def _frame(self, columns):
+        """
+        Return the given columns of the records kept by the filters,
+        from the records in memory. The region filters select rows with
+        the region index, the others are masks over only the filtered
+        columns, so columns memory-mapped from the cache that the query
+        does not use are never read.
+        """
+        bird_observation = self.bird_observation
+        data = bird_observation.data
+        positions = None
+        for name in REGION_INDEX_FILTERS:
+            if name in self.filters:
+                rows = bird_observation._lookup_rows(
+                    SET_FILTERS[name], list(self.filters[name]))
+                positions = rows if positions is None else np.intersect1d(
+                    positions, rows, assume_unique=True)
+
+        mask_filters = {name: value for name, value in self.filters.items()
+                        if name not in REGION_INDEX_FILTERS}
+        needed = list(dict.fromkeys(
+            list(columns) + [SET_FILTERS.get(name) or RANGE_FILTERS[name]
+                             for name in mask_filters]))
+        frame = data[needed]
+        if positions is not None:
+            frame = frame.iloc[positions]
+        if mask_filters:
+            mask = np.ones(len(frame), dtype=bool)
+            for name, value in mask_filters.items():
+                mask &= self._mask(frame, name, value)
+            frame = frame[mask]
+        return frame[list(columns)]
+
+    # Results
+
+    def records(self):
+        """
+        Return the records kept by the filters, with the selected
+        columns, as a DataFrame.
+        """
+        store = self.bird_observation.store
+        if self.explain('records') == 'store':
+            return store.select(columns=self.columns,
+                                **self._store_arguments())
+        columns = self.columns or self.bird_observation.columns
+        return self._frame(columns)
+
+    def total(self):
+        """
+        Return the total observation count of the records kept by the
+        filters.
+        """
+        plan = self.explain('total')
+        states = self.filters.get('states')
+        regions = None if states is None else sorted(states)
+        if plan == 'date range index':
+            start, end = self.filters['dates']
+            return self.bird_observation.get_date_range_index().total(
+                start, end, regions)
+        if plan == 'aggregate cube':
+            return self.bird_observation.get_aggregate_cube().total(
+                regions=regions)
+        if plan == 'store':
+            return self.bird_observation.store.total(
+                **self._store_arguments())
+        return float(self._frame([COUNT_COLUMN])[COUNT_COLUMN].sum())
+
+    def sum_by(self, columns):
+        """
+        Return the total observation count of the records kept by the
+        filters for each group of 'columns', sorted by the groups.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        if self.explain('sum') == 'store':
+            return self.bird_observation.store.sum_counts_by(
+                columns, **self._store_arguments())
+        self.bird_observation._ensure_date_parts(
+            *[column for column in columns if column in ('Year', 'Month')])
+        frame = self._frame(list(columns) + [COUNT_COLUMN])
+        return frame.groupby(columns, observed=True)[
+            COUNT_COLUMN].sum().reset_index()
+
+    def yearly_totals(self):
+        """
+        Return the total observation count of each year of the records
+        kept by the filters.
+        """
+        if self.explain('yearly') != 'aggregate cube':
+            return self.sum_by('Year')
+        states = self.filters.get('states')
+        totals = self.bird_observation.get_aggregate_cube().yearly_totals(
+            regions=None if states is None else sorted(states))
+        first, last = self._whole_years()
+        if first is not None:
+            totals = totals[totals['Year'] >= first]
+        if last is not None:
+            totals = totals[totals['Year'] <= last]
+        return totals.reset_index(drop=True)
+
+    def monthly_totals(self):
+        """
+        Return the total observation count of each month, over all
+        years, of the records kept by the filters.
+        """
+        if self.explain('monthly') != 'aggregate cube':
+            return self.sum_by('Month')
+        states = self.filters.get('states')
+        return self.bird_observation.get_aggregate_cube().monthly_totals(
+            year=self._whole_years()[0],
+            regions=None if states is None else sorted(states))
+
+    def to_observation(self):
+        """
+        Return the records kept by the filters as a BirdObservation, for
+        the plotting functions. This reads the records.
+        """
+        return type(self.bird_observation)(self.records())
@@ -0,0 +1,432 @@
+import json
+import math
+import sqlite3
+import threading
+
+import pandas as pd
+
+# Rows inserted per statement batch when records are appended.
+INSERT_BATCH_ROWS = 50_000
+
+# Indexes of the observation table: (name, columns). An index is only
+# made if its columns are stored.
+INDEXES = (
+    ('date', ['OBSERVATION DATE']),
+    ('region', ['STATE', 'COUNTY']),
+    ('county', ['COUNTY']),
+    ('species', ['COMMON NAME'])
+    )
+# Columns that are looked up ignoring case, like the in-memory region
+# index of BirdObservation. SQLite's NOCASE only folds ASCII letters, so
+# each is stored with a hidden copy lower-cased by Python, named with
+# KEY_PREFIX, which is looked up and indexed instead.
+CASELESS_COLUMNS = ('STATE', 'COUNTY', 'COMMON NAME')
+KEY_PREFIX = '_lower_'
+
+# Declared SQL types of pandas dtypes that are not numbers. The declared
+# type of a number is its dtype name, such as INT16 or FLOAT32, which
+# SQLite stores as an INTEGER or REAL.
+CATEGORY_TYPE = 'CATEGORY TEXT'
+DATE_TYPE = 'DATE TEXT'
+TEXT_TYPE = 'TEXT'
+DATE_FORMAT = '%Y-%m-%d'
+# Quantiles of the descriptive summary, as in DataFrame.describe.
+SUMMARY_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _quote(name):
+    """
+    Quote a column name for SQL.
+    """
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _lower(values):
+    """
+    Lower-case a list of names, keeping None.
+    """
+    return [None if value is None else str(value).lower()
+            for value in values]
+
+
+def _sql_type(dtype):
+    """
+    Return the declared SQL type of a pandas dtype.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return CATEGORY_TYPE
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return DATE_TYPE
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOL INTEGER'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return dtype.name.upper()
+    return TEXT_TYPE
+
+
+class ObservationStore:
+    """
+    Represent observation records kept in a local SQLite database
+    instead of memory, with indexes on the date, the state and county
+    and the species, so lookups read only the matching rows and sums
+    are grouped by the database. Only query results are held in memory.
+    The connection is shared by all threads, one query at a time.
+    Names are compared ignoring case as by str.lower, like the in-memory
+    lookups, through their hidden lower-cased copies.
+    """
+    table = 'observations'
+
+    def __init__(self, path=':memory:'):
+        """
+        Open or create the store at 'path'.
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS metadata '
+                '(key TEXT PRIMARY KEY, value TEXT)')
+        self._columns, self._keys = self._read_columns()
+
+    def __len__(self):
+        if not self._columns:
+            return 0
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    @property
+    def columns(self):
+        """
+        The names of the stored columns, in order.
+        """
+        return list(self._columns)
+
+    def _read_columns(self):
+        """
+        Return the stored columns with their declared types, and the
+        list of the columns that have a lower-cased copy.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                f"PRAGMA table_info({self.table})").fetchall()
+        names = {name: declared_type for _, name, declared_type, *_ in rows}
+        columns = {name: declared_type for name, declared_type
+                   in names.items() if not name.startswith(KEY_PREFIX)}
+        keys = [name for name in columns if KEY_PREFIX + name in names]
+        return columns, keys
+
+    def _names(self, columns=None):
+        """
+        Return the quoted names of the given columns, or of all the
+        stored columns, for a SELECT.
+        """
+        return ', '.join(_quote(column)
+                         for column in columns or self._columns)
+
+    def _lookup_column(self, column):
+        """
+        Return the quoted column that lookups of a column compare, and
+        whether the looked up values are to be lower-cased.
+        """
+        if column in self._keys:
+            return _quote(KEY_PREFIX + column), True
+        return _quote(column), False
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def get_metadata(self, key, default=None):
+        """
+        Return a value stored with set_metadata.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value FROM metadata WHERE key = ?', (key,)
+                ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_metadata(self, key, value):
+        """
+        Store a JSON value, such as the version of the stored records.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO metadata VALUES (?, ?)',
+                (key, json.dumps(value)))
+
+    def clear(self):
+        """
+        Remove every record, and the table with them.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(f"DROP TABLE IF EXISTS {self.table}")
+        self._columns = {}
+        self._keys = []
+
+    def _create_table(self, df):
+        """
+        Create the observation table and its indexes for the columns of
+        a DataFrame.
+        """
+        columns = {name: _sql_type(dtype)
+                   for name, dtype in df.dtypes.items()}
+        keys = [name for name in CASELESS_COLUMNS if name in columns]
+        definitions = ', '.join(
+            [f"{_quote(name)} {sql_type}"
+             for name, sql_type in columns.items()]
+            + [f"{_quote(KEY_PREFIX + name)} {TEXT_TYPE}" for name in keys])
+        self._columns = columns
+        self._keys = keys
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE {self.table} ({definitions})")
+            for name, index_columns in INDEXES:
+                if all(column in columns for column in index_columns):
+                    indexed = ', '.join(self._lookup_column(column)[0]
+                                        for column in index_columns)
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {self.table}_{name} "
+                        f"ON {self.table} ({indexed})")
+
+    def append(self, df, batch_rows=INSERT_BATCH_ROWS):
+        """
+        Insert records, converting a batch of rows at a time so only
+        that batch is copied into Python objects. The first records
+        appended set the columns of the store; later records must have
+        the same ones. The lower-cased copies of names are added here.
+        """
+        if df is None or df.empty:
+            return
+        if not self._columns:
+            self._create_table(df)
+        missing = set(self._columns) - set(df.columns)
+        if missing:
+            raise ValueError(
+                f"The records have no {', '.join(sorted(missing))} column.")
+
+        names = list(self._columns)
+        stored = names + [KEY_PREFIX + name for name in self._keys]
+        placeholders = ', '.join('?' * len(stored))
+        statement = (f"INSERT INTO {self.table} "
+                     f"({', '.join(_quote(name) for name in stored)}) "
+                     f"VALUES ({placeholders})")
+        with self._lock, self._connection:
+            for start in range(0, len(df), batch_rows):
+                batch = df.iloc[start:start + batch_rows]
+                values = {name: self._to_sql(batch[name],
+                                             self._columns[name])
+                          for name in names}
+                rows = list(values.values()) + [_lower(values[name])
+                                                for name in self._keys]
+                self._connection.executemany(statement, zip(*rows))
+
+    @staticmethod
+    def _to_sql(values, sql_type):
+        """
+        Convert a column to a list of values SQLite can store, with None
+        for missing values.
+        """
+        if sql_type == DATE_TYPE:
+            values = pd.to_datetime(values, errors='coerce').dt.strftime(
+                DATE_FORMAT)
+        # an object array holds Python scalars, which sqlite3 accepts
+        return values.to_numpy(dtype=object, na_value=None).tolist()
+
+    def _from_sql(self, df):
+        """
+        Restore the dtypes of the stored columns in a query result.
+        """
+        for name in df.columns:
+            sql_type = self._columns.get(name)
+            if sql_type == CATEGORY_TYPE:
+                df[name] = df[name].astype('category')
+            elif sql_type == DATE_TYPE:
+                df[name] = pd.to_datetime(df[name], format=DATE_FORMAT,
+                                          errors='coerce')
+            elif sql_type and sql_type.startswith(('INT', 'FLOAT', 'UINT')):
+                dtype = sql_type.lower()
+                # integer groups with missing values stay floats
+                if not (dtype.startswith(('int', 'uint'))
+                        and df[name].isna().any()):
+                    df[name] = df[name].astype(dtype)
+        return df
+
+    def query(self, sql, parameters=()):
+        """
+        Run a query and return its result as a DataFrame, with the
+        dtypes of the stored columns.
+        """
+        with self._lock:
+            df = pd.read_sql_query(sql, self._connection,
+                                   params=list(parameters))
+        return self._from_sql(df)
+
+    def _where(self, filters, ranges=()):
+        """
+        Return the WHERE clause and parameters matching any of the
+        values of each filtered column, and each range given as a tuple
+        of a column and its inclusive lower and upper bounds, either of
+        which can be None. Names are compared ignoring case, through
+        their lower-cased copies.
+        """
+        clauses = []
+        parameters = []
+        for column, low, high in ranges:
+            for bound, operator in ((low, '>='), (high, '<=')):
+                if bound is None:
+                    continue
+                if self._columns.get(column) == DATE_TYPE:
+                    bound = pd.Timestamp(bound).strftime(DATE_FORMAT)
+                elif hasattr(bound, 'item'):
+                    bound = bound.item()
+                clauses.append(f"{_quote(column)} {operator} ?")
+                parameters.append(bound)
+        for column, values in filters.items():
+            if isinstance(values, str):
+                values = [values]
+            values = list(values)
+            if not values:
+                clauses.append('0')
+                continue
+            lookup_column, caseless = self._lookup_column(column)
+            clauses.append(f"{lookup_column} IN "
+                           f"({', '.join('?' * len(values))})")
+            parameters.extend(_lower(values) if caseless else values)
+        if not clauses:
+            return '', parameters
+        return ' WHERE ' + ' AND '.join(clauses), parameters
+
+    def select(self, filters=None, limit=None, columns=None, ranges=()):
+        """
+        Return the records matching the filters, a dictionary of a
+        column to one value or a list of values, and the ranges (see
+        _where), in insertion order. Only the given columns are read,
+        or all of them.
+        """
+        if not self._columns:
+            return pd.DataFrame(columns=columns)
+        where, parameters = self._where(filters or {}, ranges)
+        sql = (f"SELECT {self._names(columns)} FROM {self.table}{where} "
+               f"ORDER BY rowid")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, parameters)
+
+    def sum_counts_by(self, columns, filters=None, dropna=True, ranges=()):
+        """
+        Sum the observation counts of the records matching the filters
+        and ranges for each group of 'columns', sorted by the groups,
+        like DataFrame.groupby. Groups with a missing value are left out
+        unless 'dropna' is False.
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        if not self._columns:
+            return pd.DataFrame(columns=columns + ['OBSERVATION COUNT'])
+        where, parameters = self._where(filters or {}, ranges)
+        if dropna:
+            conditions = ' AND '.join(f"{_quote(column)} IS NOT NULL"
+                                      for column in columns)
+            where = (f"{where} AND {conditions}" if where
+                     else f" WHERE {conditions}")
+        keys = ', '.join(_quote(column) for column in columns)
+        return self.query(
+            f"SELECT {keys}, SUM(\"OBSERVATION COUNT\") AS "
+            f"\"OBSERVATION COUNT\" FROM {self.table}{where} "
+            f"GROUP BY {keys} ORDER BY {keys}", parameters)
+
+    def total(self, filters=None, ranges=()):
+        """
+        Return the total observation count of the records matching the
+        filters and ranges.
+        """
+        if not self._columns:
+            return 0.0
+        where, parameters = self._where(filters or {}, ranges)
+        with self._lock:
+            total = self._connection.execute(
+                f"SELECT SUM(\"OBSERVATION COUNT\") FROM {self.table}"
+                f"{where}", parameters).fetchone()[0]
+        return float(total or 0)
+
+    def _summarize(self, column):
+        """
+        Return the count, mean, minimum, quantiles, maximum and standard
+        deviation of a numeric or date column, in the order and with the
+        interpolation of DataFrame.describe. Dates are summarized as
+        seconds since the epoch.
+        """
+        values = (f"CAST(strftime('%s', {_quote(column)}) AS INTEGER)"
+                  if self._columns[column] == DATE_TYPE
+                  else _quote(column))
+        with self._lock:
+            count, total, low, high = self._connection.execute(
+                f"SELECT COUNT({values}), SUM({values}), MIN({values}), "
+                f"MAX({values}) FROM {self.table}").fetchone()
+            if not count:
+                return [0] + [math.nan] * (len(SUMMARY_QUANTILES) + 4)
+            mean = total / count
+            squares = self._connection.execute(
+                f"SELECT SUM(({values} - ?) * ({values} - ?)) "
+                f"FROM {self.table}", (mean, mean)).fetchone()[0]
+            quantiles = []
+            for quantile in SUMMARY_QUANTILES:
+                # the two sorted values around the quantile position
+                position = (count - 1) * quantile
+                below = math.floor(position)
+                pair = [value for value, in self._connection.execute(
+                    f"SELECT {values} FROM {self.table} "
+                    f"WHERE {values} IS NOT NULL ORDER BY {values} "
+                    f"LIMIT 2 OFFSET ?", (below,))]
+                above = pair[-1]
+                quantiles.append(pair[0]
+                                 + (above - pair[0]) * (position - below))
+        std = math.sqrt(squares / (count - 1)) if count > 1 else math.nan
+        return [count, mean, low, *quantiles, high, std]
+
+    def describe(self):
+        """
+        Return the descriptive summary of the numeric and date columns
+        that DataFrame.describe gives, computed by the database, so
+        memory use does not grow with the number of records. The
+        standard deviation of dates is left out, as by describe.
+        """
+        index = (['count', 'mean', 'min']
+                 + [f"{quantile:.0%}" for quantile in SUMMARY_QUANTILES]
+                 + ['max', 'std'])
+        summary = {}
+        for column, sql_type in self._columns.items():
+            if sql_type == DATE_TYPE:
+                count, *seconds, _ = self._summarize(column)
+                # truncated to microseconds like the mean of describe
+                summary[column] = [count] + [
+                    pd.NaT if math.isnan(value)
+                    else pd.Timestamp(int(value * 10**6), unit='us')
+                    for value in seconds] + [math.nan]
+            elif sql_type.startswith(('INT', 'UINT', 'FLOAT')):
+                summary[column] = [float(value)
+                                   for value in self._summarize(column)]
+        return pd.DataFrame(summary, index=index)
+
+    def iter_batches(self, batch_rows=INSERT_BATCH_ROWS):
+        """
+        Yield the records as DataFrames of at most 'batch_rows' rows.
+        """
+        if not self._columns:
+            return
+        last_rowid = 0
+        while True:
+            batch = self.query(
+                f"SELECT rowid AS _rowid, {self._names()} FROM {self.table} "
+                f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_rows))
+            if batch.empty:
+                return
+            last_rowid = int(batch['_rowid'].iloc[-1])
+            yield batch.drop(columns='_rowid')
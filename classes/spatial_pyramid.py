@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Cell size in degrees at zoom level 0. Each level halves it.
+BASE_CELL_SIZE = 8.0
+DEFAULT_LEVELS = 6
+
+# Ways the cell counts are broken down at every level.
+BREAKDOWNS = ((), ('Year',), ('Month',), ('Year', 'Month'))
+
+
+class SpatialPyramid:
+    """
+    Represent observation counts binned into a regular latitude and
+    longitude grid at several zoom levels, broken down by year and by
+    month, so a map view only ever reads pre-aggregated cells.
+    """
+    def __init__(self, tables, levels, base_cell_size=BASE_CELL_SIZE):
+        """
+        Initialize the pyramid from its cell tables, keyed by
+        (level, breakdown).
+        """
+        self.tables = tables
+        self.levels = levels
+        self.base_cell_size = base_cell_size
+        self._offsets = {key: self._build_offsets(table, key[1])
+                         for key, table in tables.items()}
+
+    @classmethod
+    def from_dataframe(cls, df, levels=DEFAULT_LEVELS,
+                       base_cell_size=BASE_CELL_SIZE):
+        """
+        Build the pyramid from cleaned observation records with
+        'LATITUDE', 'LONGITUDE', 'Year', 'Month' and 'OBSERVATION COUNT'
+        columns. Records without coordinates or a date are left out.
+        """
+        finest_size = base_cell_size / 2 ** (levels - 1)
+        latitude = pd.to_numeric(df['LATITUDE'], errors='coerce')
+        longitude = pd.to_numeric(df['LONGITUDE'], errors='coerce')
+        valid = (latitude.notna() & longitude.notna()
+                 & df['Year'].notna() & df['Month'].notna())
+        finest = pd.DataFrame({
+            'Year': df.loc[valid, 'Year'].astype(np.int32),
+            'Month': df.loc[valid, 'Month'].astype(np.int8),
+            'row': np.floor((latitude[valid] + 90) / finest_size
+                            ).astype(np.int32),
+            'col': np.floor((longitude[valid] + 180) / finest_size
+                            ).astype(np.int32),
+            'OBSERVATION COUNT': pd.to_numeric(
+                df.loc[valid, 'OBSERVATION COUNT'],
+                errors='coerce').fillna(0)
+            })
+        finest = finest.groupby(['Year', 'Month', 'row', 'col'],
+                                as_index=False)['OBSERVATION COUNT'].sum()
+
+        # each coarser level merges 2 x 2 cells of the finer one
+        tables = {}
+        cells = finest
+        for level in reversed(range(levels)):
+            if level < levels - 1:
+                cells = cells.assign(row=cells['row'] // 2,
+                                     col=cells['col'] // 2)
+                cells = cells.groupby(['Year', 'Month', 'row', 'col'],
+                                      as_index=False)[
+                    'OBSERVATION COUNT'].sum()
+            for breakdown in BREAKDOWNS:
+                table = cells.groupby(list(breakdown) + ['row', 'col'],
+                                      as_index=False)[
+                    'OBSERVATION COUNT'].sum()
+                tables[(level, breakdown)] = table.sort_values(
+                    list(breakdown) + ['row', 'col'],
+                    ignore_index=True)
+        return cls(tables, levels, base_cell_size)
+
+    @staticmethod
+    def _build_offsets(table, breakdown):
+        """
+        Map each year, month or (year, month) key of a sorted table to
+        the slice of its rows.
+        """
+        if not breakdown:
+            return {(): slice(0, len(table))}
+        keys = table[list(breakdown)].to_numpy()
+        if len(keys) == 0:
+            return {}
+        changes = np.flatnonzero((keys[1:] != keys[:-1]).any(axis=1)) + 1
+        starts = np.concatenate([[0], changes])
+        stops = np.concatenate([changes, [len(keys)]])
+        return {tuple(int(value) for value in keys[start]): slice(start, stop)
+                for start, stop in zip(starts, stops)}
+
+    def cell_size(self, level):
+        """
+        Return the cell size in degrees at a zoom level.
+        """
+        return self.base_cell_size / 2 ** level
+
+    def level_for_span(self, span, cells_across=64):
+        """
+        Return the coarsest level that shows about 'cells_across' cells
+        over a span of degrees.
+        """
+        for level in range(self.levels):
+            if span / self.cell_size(level) >= cells_across:
+                return level
+        return self.levels - 1
+
+    def cells(self, level, year=None, month=None, bounds=None):
+        """
+        Return a DataFrame with the centre 'LATITUDE' and 'LONGITUDE' and
+        the 'OBSERVATION COUNT' of every non-empty cell at a level, for
+        one year and/or month if given, inside
+        bounds=(south, west, north, east) if given.
+        """
+        level = min(max(int(level), 0), self.levels - 1)
+        breakdown = tuple(name for name, value
+                          in (('Year', year), ('Month', month))
+                          if value is not None)
+        key = tuple(int(value) for value in (year, month)
+                    if value is not None)
+        table = self.tables[(level, breakdown)]
+        rows = self._offsets[(level, breakdown)].get(key, slice(0, 0))
+        table = table.iloc[rows]
+
+        size = self.cell_size(level)
+        result = pd.DataFrame({
+            'LATITUDE': (table['row'].to_numpy() + 0.5) * size - 90,
+            'LONGITUDE': (table['col'].to_numpy() + 0.5) * size - 180,
+            'OBSERVATION COUNT': table['OBSERVATION COUNT'].to_numpy()
+            })
+        if bounds is not None:
+            south, west, north, east = bounds
+            half = size / 2
+            inside = (result['LATITUDE'].between(south - half, north + half)
+                      & result['LONGITUDE'].between(west - half, east + half))
+            result = result[inside].reset_index(drop=True)
+        return result
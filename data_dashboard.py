@@ -1,43 +1,114 @@
+import argparse
+import functools
+import io
+import logging
+import os
 import pandas as pd
-import requests
 import csv
+import sys
 from classes.bird_observation import BirdObservation
 from classes.snowy_owl_trend import SnowyOwlTrend
-import tkinter as tk
-
-from visualizations import (
-    plot_observations_by_year,
-    plot_correlation,
-    plot_monthly_observations,
+from ingestion import iter_csv_batches, concat_batches, DEFAULT_BATCH_ROWS
+from schema import (
+    OBSERVATION_SCHEMA,
+    TREND_SCHEMA,
+    DATE_FORMAT,
+    TIMESTAMP_FORMAT
+    )
+from cache import (
+    load_cached_frame,
+    update_cached_frame,
+    source_fingerprint
+    )
+from archives import open_decompressed
+from downloader import fetch_to_mirror
+from fetcher import fetch_and_load
+from partitioned import load_partitioned, can_partition, default_workers
+from instrumentation import (
+    span,
+    timed_batches,
+    profiling,
+    configure,
+    print_summary,
+    PROFILE_MODES
+    )
+from analysis import (
+    analyze_correlation,
     interpret_correlation,
-    plot_population_trend
+    analyze_cross_correlation,
+    DEFAULT_RESAMPLES
     )
 
-from gui import DataDashboardGUI
+# The plotting functions are only imported when they are used, since
+# importing matplotlib is slow.
+PLOT_FUNCTIONS = (
+    'plot_observations_by_year',
+    'plot_correlation',
+    'plot_monthly_observations',
+    'plot_population_trend'
+    )
+
+
+def __getattr__(name):
+    """
+    Import the plotting functions lazily on first access.
+    """
+    if name in PLOT_FUNCTIONS:
+        import visualizations
+        return getattr(visualizations, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Version of the cleaning logic. Bump it whenever the cleaning functions
+# change so that cached DataFrames are rebuilt.
+CLEANING_VERSION = 4
+
+# Columns that can mark the newest ingested record, with the format of
+# their values, in which text order is time order. OBSERVATION DATE is
+# the default: a LAST EDITED DATE watermark also picks up edits of
+# records that are already stored, which would then be counted twice.
+# A watermark column that is not in OBSERVATION_SCHEMA is loaded too
+# (see observation_schema).
+WATERMARK_FORMATS = {
+    'OBSERVATION DATE': DATE_FORMAT,
+    'LAST EDITED DATE': TIMESTAMP_FORMAT
+    }
+DEFAULT_WATERMARK_COLUMN = 'OBSERVATION DATE'
+
+BIRD_OBSERVATION_URL = 'https://raw.githubusercontent.com/0b00101111/cs5001-final-project-data-dashboard-birds/refs/heads/main/snowy_owl_record.csv'
+POPULATION_TREND_URL = 'https://raw.githubusercontent.com/0b00101111/cs5001-final-project-data-dashboard-birds/refs/heads/main/snowy_owl_trend.csv'
 
 
 # Download, parse and load data.
-def download_csv(url):
+def download_csv(url, offline=False):
     """
-    Download the csv file from given url.
+    Download the csv file from given url, through the local mirror.
+    A compressed file is decompressed as it is read.
     """
+    csv_path = fetch_to_mirror(url, offline=offline)
+    if csv_path is None:
+        return None
     try:
-        response = requests.get(url)
-        csv_content = response.content.decode('utf-8')
-        print(f"Data downloaded successfully from {url}.")
-        return csv_content
-    except requests.exceptions.RequestException as e:
-        print(f"Error while downloading data from {url}: {e}")
+        with open(csv_path, 'rb') as file, \
+                open_decompressed(file) as stream:
+            return io.TextIOWrapper(stream, encoding='utf-8').read()
+    except (OSError, ValueError) as oe:
+        print(f"Error while reading mirrored data for {url}: {oe}")
         return None
 
 
 def parse_csv(csv_content):
     """
-    Parse the csv file to a list of dictionaries.
+    Parse the csv file to a list of dictionaries. Tab-separated text is
+    recognised by its header line.
     """
     try:
         csv_lines = csv_content.strip().split('\n')
-        reader = csv.DictReader(csv_lines)
+        if csv_lines[0].count('\t') > csv_lines[0].count(','):
+            reader = csv.DictReader(csv_lines, delimiter='\t',
+                                    quoting=csv.QUOTE_NONE)
+        else:
+            reader = csv.DictReader(csv_lines)
         data_list = [row for row in reader]
         return data_list
     except csv.Error as e:
@@ -69,34 +140,199 @@ def load_csv_into_dataframe(data_list):
         return None
 
 
+def observation_schema(watermark_column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Return the schema of the observation columns to load: those of
+    OBSERVATION_SCHEMA and the watermark column.
+    """
+    if watermark_column in OBSERVATION_SCHEMA:
+        return OBSERVATION_SCHEMA
+    return {**OBSERVATION_SCHEMA, watermark_column: 'timestamp'}
+
+
+def load_observations_streaming(source, batch_rows=DEFAULT_BATCH_ROWS,
+                                schema=OBSERVATION_SCHEMA):
+    """
+    Stream the observation csv from a url or local file and clean it
+    batch by batch, so the raw text is never held in memory as a whole.
+    Only the columns of the schema are loaded.
+    """
+    try:
+        cleaned_batches = []
+        batches = iter_csv_batches(source, batch_rows, schema=schema)
+        for batch in timed_batches('parse', batches):
+            with span('clean', rows=len(batch)):
+                cleaned_batches.append(clean_data_for_observation(batch))
+        if not cleaned_batches:
+            return pd.DataFrame()
+        print(f"Data streamed successfully from {source}.")
+        with span('concat', batches=len(cleaned_batches)) as stage:
+            bird_observations_df = concat_batches(cleaned_batches)
+            stage['rows'] = len(bird_observations_df)
+        return bird_observations_df
+    except OSError as oe:
+        # network errors from requests are OSErrors too
+        print(f"Error while streaming data from {source}: {oe}")
+        return None
+    except Exception as e:
+        print(f"Unexpected error while streaming data from {source}: {e}")
+        return None
+
+
+def load_observations_parallel(source, workers=None,
+                               batch_rows=DEFAULT_BATCH_ROWS,
+                               schema=OBSERVATION_SCHEMA):
+    """
+    Load the observation file in parallel partitions (see
+    partitioned.py), parsing, cleaning and aggregating them on 'workers'
+    processes, by default one per core. The records are the same as
+    those of load_observations_streaming.
+
+    Returns a tuple of the cleaned records and their merged aggregates,
+    or None if the file cannot be read.
+    """
+    try:
+        with span('load partitions', workers=workers or default_workers()
+                  ) as stage:
+            bird_observations_df, aggregates = load_partitioned(
+                source, clean_data_for_observation, workers, batch_rows,
+                schema)
+            stage['rows'] = len(bird_observations_df)
+        print(f"Data loaded successfully from {source} in parallel.")
+        return bird_observations_df, aggregates
+    except OSError as oe:
+        print(f"Error while loading data from {source}: {oe}")
+        return None
+    except Exception as e:
+        print(f"Unexpected error while loading data from {source}: {e}")
+        return None
+
+
+def observation_watermark(bird_observations_df,
+                          column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Return the manifest fields that record the newest value of the
+    watermark column in cleaned observation records, as text, and the
+    number of records with that value, or an empty dictionary if the
+    column is missing or empty.
+    """
+    if column not in bird_observations_df.columns:
+        return {}
+    values = pd.to_datetime(bird_observations_df[column], errors='coerce')
+    latest = values.max()
+    if pd.isna(latest):
+        return {}
+    watermark = latest.strftime(WATERMARK_FORMATS[column])
+    return {
+        'watermark_column': column,
+        'watermark': watermark,
+        # the text drops the time below its precision, so every record
+        # from its start on has the newest value
+        'watermark_rows': int((values >= pd.Timestamp(watermark)).sum())
+        }
+
+
+def load_new_observations(source, manifest, batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Stream the observation csv and clean only the rows newer than the
+    watermark stored in the manifest of its cached frame.
+
+    The watermark is compared with the raw text of each batch, so older
+    rows are dropped before any conversion or cleaning. Rows with the
+    watermark value itself are read too: the cached frame already holds
+    the number of them recorded in the manifest, so if there are more
+    now, rows were added on the watermark day, and since they cannot be
+    told apart from the cached ones the frame must be built in full.
+
+    Returns a tuple of the new rows and the updated watermark fields, or
+    None if there is no watermark, rows were added with the watermark
+    value, or the source cannot be read.
+    """
+    column = manifest.get('watermark_column')
+    watermark = manifest.get('watermark')
+    watermark_rows = manifest.get('watermark_rows')
+    if (column not in WATERMARK_FORMATS or not watermark
+            or watermark_rows is None):
+        return None
+    try:
+        new_batches = [
+            clean_data_for_observation(batch)
+            for batch in iter_csv_batches(
+                source, batch_rows, schema=observation_schema(column),
+                row_filter=lambda batch: batch[column].str.strip()
+                >= watermark)
+            ]
+        new_rows = concat_batches(new_batches)
+        on_watermark = pd.Series(False, index=new_rows.index)
+        if not new_rows.empty:
+            on_watermark = pd.to_datetime(new_rows[column]).dt.strftime(
+                WATERMARK_FORMATS[column]) == watermark
+    except OSError as oe:
+        print(f"Error while streaming new data from {source}: {oe}")
+        return None
+    except KeyError as ke:
+        print(f"Key error while streaming new data from {source}: {ke}")
+        return None
+
+    if int(on_watermark.sum()) != watermark_rows:
+        print(f"The rows of {watermark}, the newest in the cached data "
+              f"for {source}, have changed.")
+        return None
+    new_rows = new_rows[~on_watermark.to_numpy()].reset_index(drop=True)
+    updates = {'watermark_column': column, 'watermark': watermark,
+               'watermark_rows': watermark_rows}
+    if not new_rows.empty:
+        updates.update(observation_watermark(new_rows, column))
+    return new_rows, updates
+
+
+def load_population_trend(source):
+    """
+    Load and clean the population trend csv from a url or local file.
+    """
+    try:
+        batches = list(iter_csv_batches(source, schema=TREND_SCHEMA))
+    except (OSError, ValueError) as oe:
+        print(f"Error while reading data from {source}: {oe}")
+        return None
+    if not batches:
+        return pd.DataFrame()
+    population_trend_df = concat_batches(batches)
+    return clean_data_for_population(population_trend_df)
+
+
 # Clean the data
 def clean_data_for_observation(bird_observations_df):
     """
     Clean the data to get correct data types.
     """
     try:
-        # Replace 'X' with 1 in 'OBSERVATION COUNT' and convert to numeric
-        bird_observations_df['OBSERVATION COUNT'] = bird_observations_df['OBSERVATION COUNT'].replace('X', 1)
-        bird_observations_df['OBSERVATION COUNT'] = pd.to_numeric(
-                bird_observations_df['OBSERVATION COUNT'], errors='coerce')
+        # Replace 'X' with 1 in 'OBSERVATION COUNT' and convert to
+        # numeric, unless the schema loader already did so
+        if not pd.api.types.is_numeric_dtype(
+                bird_observations_df['OBSERVATION COUNT']):
+            bird_observations_df['OBSERVATION COUNT'] = bird_observations_df['OBSERVATION COUNT'].replace('X', 1)
+            bird_observations_df['OBSERVATION COUNT'] = pd.to_numeric(
+                    bird_observations_df['OBSERVATION COUNT'], errors='coerce')
 
         # Convert 'OBSERVATION DATE' to datetime format
-        bird_observations_df['OBSERVATION DATE'] = pd.to_datetime(
-                bird_observations_df['OBSERVATION DATE'],
-                errors='coerce'
-                )
+        if not pd.api.types.is_datetime64_dtype(
+                bird_observations_df['OBSERVATION DATE']):
+            bird_observations_df['OBSERVATION DATE'] = pd.to_datetime(
+                    bird_observations_df['OBSERVATION DATE'],
+                    errors='coerce'
+                    )
 
         # Drop rows with invalid 'OBSERVATION DATE'
         bird_observations_df = bird_observations_df.dropna(
             subset=['OBSERVATION DATE']).reset_index(drop=True)
 
-        # Extract 'Year', 'Month', and 'Day' from 'OBSERVATION DATE'
-        bird_observations_df['Year'] = bird_observations_df[
-            'OBSERVATION DATE'].dt.year
-        bird_observations_df['Month'] = bird_observations_df[
-            'OBSERVATION DATE'].dt.month
-        bird_observations_df['Day'] = bird_observations_df[
-            'OBSERVATION DATE'].dt.day
+        # Extract 'Year', 'Month', and 'Day' from 'OBSERVATION DATE',
+        # in the smallest integer types that hold them
+        dates = bird_observations_df['OBSERVATION DATE'].dt
+        bird_observations_df['Year'] = dates.year.astype('int16')
+        bird_observations_df['Month'] = dates.month.astype('int8')
+        bird_observations_df['Day'] = dates.day.astype('int8')
 
         return bird_observations_df
 
@@ -149,76 +385,214 @@ def clean_data_for_population(population_trend_df):
         return population_trend_df
 
 
-# Analyse data
-def analyze_correlation(bird_observation, snowy_owl_trend):
+def download_to_mirror(url, offline=False):
     """
-    Analyzes the correlation between bird observations and snowy
-    owl population trend.
+    Bring the mirror of a url up to date as a timed 'download' span.
     """
-    try:
-        observations_per_year = bird_observation.aggregate_observations_by_year()
-        trend_data = snowy_owl_trend.data.copy()
-        if ('Year' not in trend_data.columns or 'Index' not in
-                trend_data.columns):
-            return {}
+    with span('download', url=url) as stage:
+        path = fetch_to_mirror(url, offline=offline)
+        if path is not None:
+            stage['bytes'] = os.path.getsize(path)
+        return path
 
 
-        merged_data = pd.merge(observations_per_year, trend_data,
-                               on='Year', how='inner')
-        if merged_data.empty:
-            print("No data of mutual years for analysis.")
-            return {}
+def load_observations(path, incremental=False, workers=1,
+                      watermark_column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Load the cleaned observation data of a mirrored file as a
+    BirdObservation, in a timed 'load observations' span.
+
+    The cleaned data comes from the local cache when the file is
+    unchanged. Otherwise the observation data is streamed, parsed and
+    cleaned in batches, since a full eBird extract is far too large to
+    hold in memory as text. With more than one worker (0 for one per
+    core) an uncompressed file is split into partitions that are
+    loaded and aggregated in parallel, and the merged aggregates are
+    kept. In incremental mode only the rows newer than the cached ones,
+    by their 'watermark_column', are cleaned and appended to the cache.
+
+    Returns the BirdObservation, or None.
+    """
+    aggregates = {}
+    schema = observation_schema(watermark_column)
+
+    def build(source):
+        if workers == 1 or not can_partition(source):
+            return load_observations_streaming(source, schema=schema)
+        loaded = load_observations_parallel(source, workers or None,
+                                            schema=schema)
+        if loaded is None:
+            return None
+        aggregates.update(loaded[1])
+        return loaded[0]
+
+    def load_new_rows(source, manifest):
+        # a cache with another watermark is rebuilt with this one
+        if manifest.get('watermark_column') != watermark_column:
+            return None
+        return load_new_observations(source, manifest)
+
+    with span('load observations', bytes=os.path.getsize(path)) as stage:
+        update = None
+        if incremental:
+            update = update_cached_frame(path, load_new_rows,
+                                         CLEANING_VERSION)
+        if update is not None:
+            bird_observations_df = update[0]
+        else:
+            bird_observations_df = load_cached_frame(
+                path, build, CLEANING_VERSION,
+                describe=functools.partial(observation_watermark,
+                                           column=watermark_column))
+        if bird_observations_df is None:
+            return None
+        stage['rows'] = len(bird_observations_df)
+        bird_observation = BirdObservation(bird_observations_df)
+        bird_observation.preload_aggregates(aggregates)
+        return bird_observation
+
+
+def load_cached_population_trend(path):
+    """
+    Load the cleaned population trend data of a mirrored file as a
+    timed 'load population trend' span.
+    """
+    with span('load population trend') as stage:
+        population_trend_df = load_cached_frame(
+            path, load_population_trend, CLEANING_VERSION)
+        if population_trend_df is not None:
+            stage['rows'] = len(population_trend_df)
+        return population_trend_df
 
-        correlation_coefficient = merged_data[('OBSERVATION '
-                                               'COUNT')].corr(
-                merged_data['Index'], method='pearson')
-        print(f"Pearson correlation coefficient: {correlation_coefficient}")
 
-        interpretation = interpret_correlation(correlation_coefficient)
+def load_observation_store(path, store_path,
+                           batch_rows=DEFAULT_BATCH_ROWS):
+    """
+    Load the cleaned observation records of a mirrored file into the
+    SQLite ObservationStore at 'store_path', as a timed 'load
+    observations' span.
 
-        correlation_results = {
-                'Correlation Coefficient': correlation_coefficient,
-                'Interpretation': interpretation
-                }
+    The records are parsed, cleaned and inserted a batch at a time, so
+    memory use does not grow with the size of the file. The store is
+    only rebuilt when the file or the cleaning version changed.
 
-        return correlation_results
+    Returns the ObservationStore, or None if the file cannot be read.
+    """
+    # sqlite3 is only imported when a store is used
+    from classes.observation_store import ObservationStore
+
+    with span('load observations', bytes=os.path.getsize(path),
+              store=store_path) as stage:
+        try:
+            store = ObservationStore(store_path)
+            fingerprint = source_fingerprint(
+                path, store.get_metadata('fingerprint'))
+            if fingerprint is None:
+                return None
+            content = {'sha256': fingerprint['sha256'],
+                       'version': CLEANING_VERSION}
+            if store.get_metadata('content') != content:
+                # marked as incomplete until every batch is stored
+                store.set_metadata('content', None)
+                store.clear()
+                batches = iter_csv_batches(path, batch_rows,
+                                           schema=OBSERVATION_SCHEMA)
+                for batch in timed_batches('parse', batches):
+                    with span('clean', rows=len(batch)):
+                        store.append(clean_data_for_observation(batch))
+                store.set_metadata('fingerprint', fingerprint)
+                store.set_metadata('content', content)
+                print(f"Data stored successfully in {store_path}.")
+            stage['rows'] = len(store)
+            return store
+        except OSError as oe:
+            print(f"Error while storing data from {path}: {oe}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error while storing data from {path}: {e}")
+            return None
+
+
+def load_data(offline=False, incremental=False, store_path=None,
+              workers=1, watermark_column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Download, load and clean both datasets.
+
+    The sources are downloaded concurrently and each is parsed as soon
+    as its download is done, so loading takes about as long as the
+    slowest source. In offline mode the previously mirrored files are
+    used without contacting the server. In incremental mode only the
+    observation rows newer than the cached ones, by their
+    'watermark_column', are cleaned and appended to the cache. With a
+    'store_path' the observation records
+    are kept in a SQLite database there instead of in memory (see
+    load_observation_store), and 'incremental' is not used. With more
+    than one worker (0 for one per core) the observation file is
+    loaded in parallel partitions (see load_observations).
+
+    Returns a tuple of the BirdObservation and SnowyOwlTrend objects, or
+    None if the data could not be downloaded.
+    """
+    if store_path is None:
+        def load(path):
+            return load_observations(path, incremental, workers,
+                                     watermark_column)
+    else:
+        def load(path):
+            return load_observation_store(path, store_path)
+
+    # Bring the local mirrors of the sources up to date, where an
+    # unchanged file costs a single 304 response, and load them.
+    data = fetch_and_load({
+        'observations': (BIRD_OBSERVATION_URL, load),
+        'population trend': (
+            POPULATION_TREND_URL, load_cached_population_trend)
+        }, offline=offline)
+    observations = data['observations']
+    population_trend_df = data['population trend']
+    if observations is None or population_trend_df is None:
+        print("The data could not be loaded.")
+        return None
 
-    except KeyError as ke:
-        print(f"Key error while analyzing correlation: {ke}")
-        return {}
-    except ValueError as ve:
-        print(f"Value error while analyzing correlation: {ve}")
-        return {}
-    except Exception as e:
-        print(f"Unexpected error while analyzing correlation: {e}")
-        return {}
+    if store_path is not None:
+        observations = BirdObservation.from_store(observations)
+    return observations, SnowyOwlTrend(population_trend_df)
 
 
-def main():
-    """
-    Download, load and analyze the correlation between bird
-    observations and the population trend of snowy owl.
+def refresh_observations(bird_observation, offline=False):
     """
-    bird_observation_url = 'https://raw.githubusercontent.com/0b00101111/cs5001-final-project-data-dashboard-birds/refs/heads/main/snowy_owl_record.csv'
-    population_trend_url = 'https://raw.githubusercontent.com/0b00101111/cs5001-final-project-data-dashboard-birds/refs/heads/main/snowy_owl_trend.csv'
+    Add the observation rows published since the data was loaded to a
+    loaded BirdObservation, updating its aggregates with only the new
+    rows.
 
-    # download the data
-    bird_observations_csv = download_csv(bird_observation_url)
-    population_trend_csv = download_csv(population_trend_url)
-
-    # Parse and load the data into DataFrames
-    bird_data_list = parse_csv(bird_observations_csv)
-    bird_observations_df = load_csv_into_dataframe(bird_data_list)
+    Returns the number of new rows, or None if the cache could not be
+    updated incrementally.
+    """
+    bird_observation_path = download_to_mirror(BIRD_OBSERVATION_URL,
+                                               offline)
+    if bird_observation_path is None:
+        return None
+    update = update_cached_frame(bird_observation_path,
+                                 load_new_observations, CLEANING_VERSION)
+    if update is None:
+        return None
+    new_rows = update[1]
+    bird_observation.append_data(new_rows)
+    return len(new_rows)
 
-    population_data_list = parse_csv(population_trend_csv)
-    population_trend_df = load_csv_into_dataframe(population_data_list)
 
-    # Clean the data
-    bird_observations_df = clean_data_for_observation(bird_observations_df)
-    population_trend_df = clean_data_for_population(population_trend_df)
+def load_and_summarize(offline=False, incremental=False, store_path=None,
+                       workers=1, watermark_column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Load both datasets and print their summaries and correlation.
 
-    # initialize the class of the observation data
-    bird_observation = BirdObservation(bird_observations_df)
+    Returns the same tuple as load_data, or None.
+    """
+    data = load_data(offline, incremental, store_path, workers,
+                     watermark_column)
+    if data is None:
+        return None
+    bird_observation, snowy_owl_trend = data
 
     # Peek the observation data
     bird_observation_peek = bird_observation.peek_the_data()
@@ -228,9 +602,6 @@ def main():
     descriptive_summary_observation = bird_observation.get_descriptive_summary()
     print(descriptive_summary_observation)
 
-    # initialize the class of the population trend data
-    snowy_owl_trend = SnowyOwlTrend(population_trend_df)
-
     # Peek the population trend data
     population_trend_peek = snowy_owl_trend.peek_the_data()
     print(population_trend_peek)
@@ -240,20 +611,105 @@ def main():
     print(descriptive_summary_population)
 
     # Analyse the correction of observation and population
-    correlation_results = analyze_correlation(bird_observation, snowy_owl_trend)
+    with span('correlation', resamples=DEFAULT_RESAMPLES):
+        correlation_results = analyze_correlation(
+            bird_observation, snowy_owl_trend, resamples=DEFAULT_RESAMPLES)
     print(correlation_results)
 
-    # Plot the visualizations (commented out when run the GUI)
-    # plot_observations_by_year(bird_observation)
-    # plot_monthly_observations(bird_observation)
-    # plot_population_trend(snowy_owl_trend)  # Add this line if you want to plot automatically
-    # plot_correlation(bird_observation, snowy_owl_trend)
+    # Analyse the correlation at other lags and over time
+    with span('cross-correlation'):
+        cross_correlation = analyze_cross_correlation(bird_observation,
+                                                      snowy_owl_trend)
+    if cross_correlation:
+        print(cross_correlation['Lags'])
+        print(f"Strongest correlation at a lag of "
+              f"{cross_correlation['Best Lag']} years.")
+
+    return data
 
-    # Init and run the GUI
+
+def main(offline=False, incremental=False, profile=None,
+         profile_output=None, store_path=None, workers=1,
+         watermark_column=DEFAULT_WATERMARK_COLUMN):
+    """
+    Download, load and analyze the correlation between bird
+    observations and the population trend of snowy owl.
+
+    In offline mode the previously mirrored files are used without
+    contacting the server. In incremental mode only observation rows
+    newer than the cached ones by their 'watermark_column' are cleaned
+    and added to the cached data. With a 'profile'
+    mode (see instrumentation.profiling) the loading is profiled.
+    With a 'store_path' the observation records are kept in a SQLite
+    database instead of in memory. With more than one worker the
+    observation file is loaded in parallel partitions.
+    A summary of the timed stages is printed when the window closes.
+    """
+    # The GUI is imported here so the data functions can be used
+    # without a display.
+    import tkinter as tk
+    from gui import DataDashboardGUI
+
+    # Copy-on-Write is always on from pandas 3.0. The dashboard turns it
+    # on for pandas 2 too, so slices and shallow copies of the records
+    # are views until written to.
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+    def load():
+        # profiled here, since loading runs on the worker thread
+        with profiling(profile, profile_output):
+            return load_and_summarize(offline, incremental, store_path,
+                                      workers, watermark_column)
+
+    # Init and show the GUI right away, and load the data in the
+    # background. The plots are filled in as they become ready.
     root = tk.Tk()
-    app = DataDashboardGUI(root, bird_observation, snowy_owl_trend)
+    app = DataDashboardGUI(root)
+    app.load_in_background(load)
     app.run()
+    print_summary()
+
+
+def parse_arguments(argv):
+    """
+    Parse the command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Show the Snowy Owl data dashboard.")
+    parser.add_argument('--offline', action='store_true',
+                        help="use the mirrored data without downloading")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only clean and add new observation rows")
+    parser.add_argument('--watermark-column', choices=list(WATERMARK_FORMATS),
+                        default=DEFAULT_WATERMARK_COLUMN,
+                        help="column whose newest value marks the rows "
+                             "already added in incremental mode")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="profile the loading with cProfile or "
+                             "tracemalloc")
+    parser.add_argument('--profile-output', default=None,
+                        help="file the profile is saved to")
+    parser.add_argument('--trace-json', default=None,
+                        help="file to append the timed stages to as JSON "
+                             "lines")
+    parser.add_argument('--log-stages', action='store_true',
+                        help="log each timed stage as it finishes")
+    parser.add_argument('--store', default=None, dest='store_path',
+                        help="keep the observation records in a SQLite "
+                             "database at this path instead of in memory")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="processes that parse, clean and aggregate "
+                             "the observation file; 0 for one per core")
+    return parser.parse_args(argv)
 
-if __name__ == '__main__':
-    main()
 
+if __name__ == '__main__':
+    arguments = parse_arguments(sys.argv[1:])
+    if arguments.log_stages:
+        logging.basicConfig(level=logging.INFO,
+                            format='%(asctime)s %(name)s %(message)s')
+    configure(arguments.trace_json)
+    main(arguments.offline, arguments.incremental, arguments.profile,
+         arguments.profile_output, arguments.store_path, arguments.workers,
+         arguments.watermark_column)
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+DEFAULT_MIRROR_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'snowy_owl_dashboard', 'mirror')
+DEFAULT_TIMEOUT = 30
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Connections kept open per host by the shared session.
+DEFAULT_POOL_SIZE = 16
+# Attempts after the first one, and the delay before the first retry in
+# seconds, which doubles with every further retry.
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# Statuses that are worth retrying; other errors are not.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest Retry-After delay of a server that is honoured, in seconds.
+MAX_RETRY_AFTER = 120
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the shared requests session, so connections are reused. Its
+    connection pool is large enough for concurrent downloads.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE,
+                                  pool_maxsize=DEFAULT_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def mirror_path(url, mirror_dir=DEFAULT_MIRROR_DIR):
+    """
+    Return the local mirror path of a url. The file name keeps the last
+    part of the url so the file type can still be recognised.
+    """
+    digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+    base_name = os.path.basename(url.split('?')[0]) or 'download'
+    return os.path.join(mirror_dir, f"{digest}-{base_name}")
+
+
+def _read_metadata(path):
+    """
+    Return the validators stored next to a mirrored file.
+    """
+    try:
+        with open(path + '.json') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_metadata(path, metadata):
+    """
+    Store the validators of a mirrored file next to it.
+    """
+    with open(path + '.json', 'w') as file:
+        json.dump(metadata, file)
+
+
+def _validators(response):
+    """
+    Extract the caching validators from a response.
+    """
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+        }
+
+
+def _part_is_complete(response, part_metadata, size):
+    """
+    Return True if a 416 response to a Range request from the end of a
+    partial download means that it is complete: the response has the
+    validator of the partial download, or gives its size as the size of
+    the file.
+    """
+    if response.status_code != 416:
+        return False
+    validators = _validators(response)
+    if any(value and value == part_metadata.get(name)
+           for name, value in validators.items()):
+        return True
+    content_range = response.headers.get('Content-Range', '')
+    return content_range.rpartition('/')[2] == str(size)
+
+
+def is_retryable(error):
+    """
+    Return True if a failed request may succeed when it is retried:
+    connection errors, including a connection lost in the middle of the
+    body, timeouts and overloaded or failing servers.
+    """
+    import requests
+    if isinstance(error, (requests.exceptions.ConnectionError,
+                          requests.exceptions.ChunkedEncodingError,
+                          requests.exceptions.ContentDecodingError,
+                          requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code in RETRY_STATUSES
+
+
+def retry_after(error):
+    """
+    Return the delay in seconds a server asked for in the Retry-After
+    header of a failed response, at most MAX_RETRY_AFTER, or None.
+    """
+    response = getattr(error, 'response', None)
+    value = None if response is None else response.headers.get(
+        'Retry-After')
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = (parsedate_to_datetime(value).timestamp()
+                     - time.time())
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+def retry_delay(attempt, backoff=DEFAULT_BACKOFF, error=None):
+    """
+    Return the delay before a retry: exponential backoff with jitter, so
+    concurrent downloads do not all retry at once, or the Retry-After
+    delay of the failed response if that is longer.
+    """
+    delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+    return max(delay, retry_after(error) or 0.0)
+
+
+def fetch_to_mirror(url, mirror_dir=DEFAULT_MIRROR_DIR, offline=False,
+                    session=None, timeout=DEFAULT_TIMEOUT,
+                    retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Make sure the local mirror of a url is up to date and return its
+    path.
+
+    An existing mirror is revalidated with If-None-Match and
+    If-Modified-Since, so an unchanged file costs one 304 response. An
+    interrupted download is resumed with a Range request, guarded by
+    If-Range so a changed file is downloaded again from the start, and
+    is kept as it is if it was already complete.
+    Connection errors, timeouts and server errors are retried up to
+    'retries' times with exponential backoff, or after the Retry-After
+    delay of the server; a retry resumes where the failed attempt
+    stopped. In offline mode, or when the server cannot
+    be reached, the existing mirror is used as it is.
+
+    Returns None if there is neither a usable response nor a mirror.
+    """
+    path = mirror_path(url, mirror_dir)
+    has_mirror = os.path.exists(path)
+
+    if offline:
+        if has_mirror:
+            print(f"Offline: using mirrored data for {url}.")
+            return path
+        print(f"Offline: no mirrored data for {url}.")
+        return None
+
+    import requests
+
+    os.makedirs(mirror_dir, exist_ok=True)
+    session = session or get_session()
+    for attempt in range(retries + 1):
+        try:
+            return _fetch_once(url, path, session, timeout)
+        except requests.exceptions.RequestException as e:
+            if attempt < retries and is_retryable(e):
+                delay = retry_delay(attempt, backoff, e)
+                print(f"Error while downloading data from {url}: {e}. "
+                      f"Retrying in {delay:.1f} s.")
+                time.sleep(delay)
+                continue
+            print(f"Error while downloading data from {url}: {e}")
+            if has_mirror:
+                print(f"Using mirrored data for {url}.")
+                return path
+            return None
+
+
+def _fetch_once(url, path, session, timeout):
+    """
+    Make one attempt at bringing the mirror of a url up to date.
+    """
+    part_path = path + '.part'
+    has_mirror = os.path.exists(path)
+    headers = {}
+    metadata = _read_metadata(path) if has_mirror else {}
+    if metadata.get('etag'):
+        headers['If-None-Match'] = metadata['etag']
+    if metadata.get('last_modified'):
+        headers['If-Modified-Since'] = metadata['last_modified']
+
+    part_metadata = _read_metadata(part_path)
+    resume_from = 0
+    if os.path.exists(part_path):
+        resume_validator = (part_metadata.get('etag')
+                            or part_metadata.get('last_modified'))
+        if resume_validator:
+            resume_from = os.path.getsize(part_path)
+            headers['Range'] = f"bytes={resume_from}-"
+            headers['If-Range'] = resume_validator
+
+    with session.get(url, headers=headers, stream=True,
+                     timeout=timeout) as response:
+        if response.status_code == 304 and has_mirror:
+            print(f"Mirrored data for {url} is up to date.")
+            return path
+        if resume_from and _part_is_complete(response, part_metadata,
+                                             resume_from):
+            # the whole file had arrived before the download stopped
+            print(f"Download of {url} was already complete.")
+        else:
+            response.raise_for_status()
+            if response.status_code == 206 and resume_from:
+                mode = 'ab'
+                print(f"Resuming download of {url} at byte "
+                      f"{resume_from}.")
+            else:
+                mode = 'wb'
+                part_metadata = _validators(response)
+                _write_metadata(part_path, part_metadata)
+
+            with open(part_path, mode) as file:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+
+    os.replace(part_path, path)
+    _write_metadata(path, part_metadata)
+    os.remove(part_path + '.json')
+    print(f"Data downloaded successfully from {url}.")
+    return path
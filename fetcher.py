@@ -0,0 +1,115 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from downloader import (
+    fetch_to_mirror,
+    DEFAULT_MIRROR_DIR,
+    DEFAULT_TIMEOUT,
+    DEFAULT_RETRIES,
+    DEFAULT_BACKOFF,
+    DEFAULT_POOL_SIZE
+    )
+from instrumentation import span
+
+# Sources downloaded or parsed at the same time.
+DEFAULT_MAX_WORKERS = 8
+# Downloads from the same host at the same time, to stay polite to it.
+DEFAULT_PER_HOST = 4
+
+
+class HostLimits:
+    """
+    Represent a bounded semaphore per host, created on first use.
+    """
+    def __init__(self, per_host=DEFAULT_PER_HOST):
+        """
+        Initialize the limits, allowing 'per_host' downloads per host.
+        """
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        """
+        Return the semaphore of the host of a url.
+        """
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(
+                    self.per_host)
+            return self._semaphores[host]
+
+
+def fetch_and_load(sources, offline=False, mirror_dir=DEFAULT_MIRROR_DIR,
+                   max_workers=DEFAULT_MAX_WORKERS,
+                   per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                   retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Download and load several data sources concurrently.
+
+    Every source is brought up to date in its mirror on a worker thread
+    and loaded on the same thread as soon as its download is done, so
+    parsing one source overlaps downloading the others and the total
+    time is about that of the slowest source. Downloads share the pooled
+    session of the downloader, and at most 'per_host' of them talk to
+    the same host at a time; loading is not limited by host.
+
+    Parameters:
+    sources (dict): Maps a source name to a tuple of its url and a
+        function loading the mirrored file from its path, or None to
+        only download it.
+    offline (bool): Use the mirrored files without contacting servers.
+    max_workers (int): Sources downloaded or loaded at the same time.
+    per_host (int): Downloads from one host at the same time.
+    timeout (float): Timeout of each request in seconds.
+    retries (int): Retries of a failed download.
+    backoff (float): Delay before the first retry in seconds.
+
+    Returns:
+    dict: The loaded data (or path) per source name, None for the
+        sources that could not be downloaded or loaded.
+    """
+    host_limits = HostLimits(min(per_host, DEFAULT_POOL_SIZE))
+
+    def fetch_one(name, url, load):
+        with host_limits(url):
+            with span('download', source=name, url=url) as stage:
+                path = fetch_to_mirror(url, mirror_dir, offline,
+                                       timeout=timeout, retries=retries,
+                                       backoff=backoff)
+                if path is not None:
+                    stage['bytes'] = os.path.getsize(path)
+        if path is None or load is None:
+            return path
+        try:
+            return load(path)
+        except Exception as e:
+            print(f"Error while loading the data of {name}: {e}")
+            return None
+
+    if not sources:
+        return {}
+    workers = max(1, min(max_workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix='fetch') as executor:
+        futures = {name: executor.submit(fetch_one, name, url, load)
+                   for name, (url, load) in sources.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def fetch_all(urls, offline=False, mirror_dir=DEFAULT_MIRROR_DIR,
+              max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST,
+              timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+              backoff=DEFAULT_BACKOFF):
+    """
+    Bring the mirrors of several urls up to date concurrently.
+
+    Returns a dictionary of the mirror path per url, None for the urls
+    that could not be downloaded.
+    """
+    return fetch_and_load({url: (url, None) for url in urls}, offline,
+                          mirror_dir, max_workers, per_host, timeout,
+                          retries, backoff)
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+# Default memory cap of the rendered figure cache, in bytes.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class RenderedFigureCache:
+    """
+    Represent a least-recently-used cache of rendered figure rasters
+    (NumPy RGBA arrays), keyed by plot type, year and filters, with a cap
+    on the memory they take. It can be shared between the GUI thread
+    and the thread that receives the rasters prewarmed in a background
+    process.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize an empty cache holding at most 'max_bytes' of rasters.
+        """
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._rasters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rasters)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._rasters
+
+    def get(self, key):
+        """
+        Return the raster stored under 'key' and mark it as recently
+        used, or None if it is not cached.
+        """
+        with self._lock:
+            raster = self._rasters.get(key)
+            if raster is not None:
+                self._rasters.move_to_end(key)
+            return raster
+
+    def put(self, key, raster):
+        """
+        Store a raster, evicting the least recently used ones until the
+        cache fits in its memory cap. A raster larger than the cap is
+        not stored.
+        """
+        if raster.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._rasters.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous.nbytes
+            self._rasters[key] = raster
+            self.size_bytes += raster.nbytes
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._rasters.popitem(last=False)
+                self.size_bytes -= evicted.nbytes
+
+    def clear(self):
+        """
+        Remove every raster.
+        """
+        with self._lock:
+            self._rasters.clear()
+            self.size_bytes = 0
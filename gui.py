@@ -1,21 +1,68 @@
+import multiprocessing
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use('TkAgg')
+import numpy as np
+import pandas as pd
+from figure_cache import RenderedFigureCache, DEFAULT_MAX_BYTES
+from instrumentation import span
 from visualizations import (
     plot_observations_by_year,
     plot_correlation,
     plot_monthly_observations,
-    plot_population_trend
+    draw_monthly_observations,
+    plot_population_trend,
+    plot_hotspot_map,
+    draw_hotspot_cells,
+    render_monthly_raster
 )
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import (
+    FigureCanvasTkAgg,
+    NavigationToolbar2Tk
+)
+
+ALL_STATES = "All states"
+ALL_YEARS = "All years"
+ALL_MONTHS = "All months"
+
+# How often the Tk thread checks for messages from the loading thread.
+LOAD_POLL_MS = 50
+
+# Share of the progress bar for loading, the rest is for plotting.
+LOAD_SHARE = 0.6
+
+# Start method of the prewarming process. Forking the GUI process would
+# copy Tk and the locks its other threads may hold at that moment.
+PREWARM_START_METHOD = 'spawn'
+
+# Time each year is shown for when playing through the years.
+PLAY_INTERVAL_MS = 150
 
 class DataDashboardGUI:
-    def __init__(self, master, bird_observation, snowy_owl_trend):
+    def __init__(self, master, bird_observation=None, snowy_owl_trend=None,
+                 figure_cache_bytes=DEFAULT_MAX_BYTES):
         self.master = master
-        self.original_data = bird_observation.data.copy()  # Preserve the original dataset
-        self.bird_observation = bird_observation
-        self.snowy_owl_trend = snowy_owl_trend
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bird_observation = None
+        self.snowy_owl_trend = None
+        self.cube = None
         self.current_selected_year = None  # Store the currently selected year
 
+        # Rendered monthly plots, prewarmed for every year after startup
+        self.figure_cache = RenderedFigureCache(figure_cache_bytes)
+        self.prewarm_executor = None
+        # y limits of the monthly plot of each state, shared by all years
+        self.monthly_ylims = {}
+
+        # Messages from the loading thread, read on the Tk thread
+        self.load_queue = queue.Queue()
+        self.pending_panels = []
+        self.panel_count = 0
+
         self.master.title("Snowy Owl Data Dashboard")
         self.master.geometry("1400x800")
 
@@ -33,36 +80,186 @@ class DataDashboardGUI:
         for col in range(2):
             self.plot_grid_frame.grid_columnconfigure(col, weight=1)
 
-        # Initialize plots
-        self.initialize_plots()
+        # Add a status bar that reports the loading progress
+        status_frame = ttk.Frame(self.main_frame)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+        self.status_text = tk.StringVar(value="Loading data...")
+        ttk.Label(status_frame, textvariable=self.status_text).pack(
+            side=tk.LEFT)
+        self.progress = ttk.Progressbar(status_frame, maximum=1.0,
+                                        length=200, mode='determinate')
+        self.progress.pack(side=tk.RIGHT)
+
+        # Show placeholders until the plots are ready
+        self.placeholders = {}
+        for row in range(2):
+            for col in range(2):
+                placeholder = ttk.Label(self.plot_grid_frame,
+                                        text="Loading...", anchor="center")
+                placeholder.grid(row=row, column=col, padx=10, pady=10,
+                                 sticky="nsew")
+                self.placeholders[(row, col)] = placeholder
+
+        # Initialize plots right away when the data is already loaded
+        if bird_observation is not None:
+            self.set_data(bird_observation, snowy_owl_trend)
+
+    def report_progress(self, message, fraction):
+        """
+        Show a progress message and fraction (0 to 1) in the status bar.
+        """
+        self.status_text.set(message)
+        self.progress['value'] = fraction
+
+    def load_in_background(self, load):
+        """
+        Call load() on a worker thread and fill in the plots when it
+        returns a (BirdObservation, SnowyOwlTrend) tuple. The window
+        stays responsive meanwhile.
+        """
+        worker = threading.Thread(target=self.load_worker, args=(load,),
+                                  daemon=True)
+        worker.start()
+        self.master.after(LOAD_POLL_MS, self.poll_load_queue)
+
+    def load_worker(self, load):
+        """
+        Load the data and compute the aggregates behind the plots, on
+        the worker thread. Results and progress are passed to the Tk
+        thread through the queue.
+        """
+        try:
+            self.load_queue.put(('progress', "Loading data...", 0.05))
+            data = load()
+            if data is None:
+                self.load_queue.put(('error', "The data could not be loaded."))
+                return
+
+            bird_observation, _ = data
+            steps = [
+                ("Aggregating observations by year...",
+                 bird_observation.aggregate_observations_by_year),
+                ("Aggregating observations by month...",
+                 bird_observation.aggregate_observations_by_month),
+                ("Building the aggregate cube...",
+                 bird_observation.get_aggregate_cube),
+                ("Building the date range index...",
+                 bird_observation.get_date_range_index)
+                ]
+            for position, (message, step) in enumerate(steps):
+                fraction = LOAD_SHARE * (position + 1) / (len(steps) + 1)
+                self.load_queue.put(('progress', message, fraction))
+                step()
+            self.load_queue.put(('data', data))
+        except Exception as e:
+            self.load_queue.put(('error', f"Error while loading data: {e}"))
+
+    def poll_load_queue(self):
+        """
+        Handle the messages from the loading thread, then check again
+        shortly unless loading has finished.
+        """
+        while True:
+            try:
+                kind, *payload = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.report_progress(*payload)
+            elif kind == 'error':
+                self.report_progress(payload[0], 0)
+                return
+            elif kind == 'data':
+                self.set_data(*payload[0])
+                return
+        self.master.after(LOAD_POLL_MS, self.poll_load_queue)
+
+    def set_data(self, bird_observation, snowy_owl_trend):
+        """
+        Use the loaded data and build the plots one panel at a time, so
+        the window keeps handling events in between.
+        """
+        self.bird_observation = bird_observation
+        self.snowy_owl_trend = snowy_owl_trend
+
+        # Year x month x state totals, so selections are array slices
+        self.cube = bird_observation.get_aggregate_cube()
+        self.monthly_ylims = {}
+
+        self.pending_panels = [
+            ("Plotting observations by year...",
+             self.show_observations_by_year),
+            ("Plotting monthly observations...",
+             self.show_monthly_observations),
+            ("Plotting the population trend...",
+             self.show_population_trend),
+            ("Plotting the correlation...", self.show_correlation),
+            ("Adding the date range selector...",
+             self.create_date_range_selector)
+            ]
+        self.panel_count = len(self.pending_panels)
+        self.master.after_idle(self.show_next_panel)
+
+    def show_next_panel(self):
+        """
+        Build the next pending panel and schedule the one after it.
+        """
+        if not self.pending_panels:
+            self.report_progress("Ready.", 1.0)
+            self.start_prewarming()
+            return
+        message, show_panel = self.pending_panels.pop(0)
+        done = self.panel_count - len(self.pending_panels)
+        self.report_progress(
+            message,
+            LOAD_SHARE + (1 - LOAD_SHARE) * done / (self.panel_count + 1))
+        with span('render', panel=show_panel.__name__):
+            show_panel()
+        self.master.after(1, self.show_next_panel)
+
+    def place_figure(self, row, col, fig):
+        """
+        Embed a figure in a grid cell in place of its placeholder.
+        """
+        placeholder = self.placeholders.pop((row, col), None)
+        if placeholder is not None:
+            placeholder.destroy()
+        if fig is None:
+            return None
+        canvas = FigureCanvasTkAgg(fig, master=self.plot_grid_frame)
+        canvas.draw()
+        canvas_widget = canvas.get_tk_widget()
+        canvas_widget.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
+        return canvas
+
+    def show_observations_by_year(self):
+        """
+        Embed the observations by year plot in the top-left cell.
+        """
+        self.place_figure(0, 0, plot_observations_by_year(self.bird_observation))
+
+    def show_population_trend(self):
+        """
+        Embed the population trend plot in the bottom-left cell.
+        """
+        self.place_figure(1, 0, plot_population_trend(self.snowy_owl_trend))
 
-    def initialize_plots(self):
+    def show_correlation(self):
         """
-        Generate and embed all four plots within the GUI.
+        Embed the correlation plot in the bottom-right cell.
+        """
+        self.place_figure(1, 1, plot_correlation(self.bird_observation,
+                                                 self.snowy_owl_trend))
+
+    def show_monthly_observations(self):
+        """
+        Embed the monthly observations plot, with its year and state
+        dropdowns, in the top-right cell.
         """
-        # Generate Figures
-        fig1 = plot_observations_by_year(self.bird_observation)
         fig2 = plot_monthly_observations(self.bird_observation)
-        fig3 = plot_population_trend(self.snowy_owl_trend)
-        fig4 = plot_correlation(self.bird_observation, self.snowy_owl_trend)
-
-        # Define grid positions for other plots
-        plot_positions = [
-            (0, 0, fig1, ""),
-            (1, 0, fig3, ""),
-            (1, 1, fig4, "")
-        ]
-
-        # Place the other three plots
-        for row, col, fig, title in plot_positions:
-            if fig:
-                canvas = FigureCanvasTkAgg(fig, master=self.plot_grid_frame)
-                canvas.draw()
-                canvas_widget = canvas.get_tk_widget()
-                canvas_widget.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-
-                label = ttk.Label(self.plot_grid_frame, text=title, anchor="center")
-                label.grid(row=row+1, column=col, padx=10, pady=(0, 10))
+        placeholder = self.placeholders.pop((0, 1), None)
+        if placeholder is not None:
+            placeholder.destroy()
 
         # Create a frame for the top-right cell to host the monthly observations plot
         top_right_frame = ttk.Frame(self.plot_grid_frame)
@@ -76,8 +273,8 @@ class DataDashboardGUI:
         self.fig2_widget = self.fig2_canvas.get_tk_widget()
         self.fig2_widget.grid(row=0, column=0, sticky="nsew")
 
-        # Extract unique years for the dropdown
-        unique_years = sorted(set(self.bird_observation.data['Year'].dropna().astype(int)))
+        # Extract unique years for the dropdown from the aggregate cube
+        unique_years = [int(year) for year in self.cube.years]
         self.selected_year = tk.StringVar(value=str(unique_years[0]))
 
         # Add a label to indicate what the dropdown is for
@@ -97,6 +294,27 @@ class DataDashboardGUI:
         # Bind a selection event to the dropdown
         self.year_selector.bind("<<ComboboxSelected>>", self.on_year_selected)
 
+        # Add a dropdown to narrow the monthly plot down to one state
+        self.selected_state = tk.StringVar(value=ALL_STATES)
+        self.state_selector = ttk.Combobox(
+            top_right_frame,
+            textvariable=self.selected_state,
+            values=[ALL_STATES] + list(self.cube.regions),
+            state='readonly'
+        )
+        self.state_selector.place(relx=0.75, rely=0.15, anchor="n", width=120)
+        self.state_selector.bind("<<ComboboxSelected>>", self.on_year_selected)
+
+        # Step through the years with the arrow keys or the play button
+        self.playing = False
+        self.play_button = ttk.Button(top_right_frame, text="Play",
+                                      command=self.on_play_clicked)
+        self.play_button.place(relx=0.92, rely=0.15, anchor="n", width=60)
+        self.master.bind("<Left>", lambda event: self.step_year(-1))
+        self.master.bind("<Right>", lambda event: self.step_year(1))
+
+        self.setup_monthly_artists()
+
     def on_year_selected(self, event):
         """
         Callback function triggered when a year is selected from the dropdown.
@@ -106,51 +324,374 @@ class DataDashboardGUI:
         self.current_selected_year = selected_year  # Update the selected year state
         print(f"Year selected: {selected_year}")
 
-        # Filter the bird observation data to include only records for the selected year
-        filtered_data = self.original_data[
-            self.original_data['Year'] == selected_year
-        ]
-
-        # Recalculate the monthly data based on the filtered subset
-        monthly_data = filtered_data.groupby('Month')['OBSERVATION COUNT'].sum().reset_index()
+        # Slice the monthly totals of the selected year (and state) out of the cube
+        selected_state = self.selected_state.get()
+        regions = None if selected_state == ALL_STATES else selected_state
+        monthly_data = self.cube.monthly_totals(year=selected_year,
+                                                regions=regions)
 
-        # Store the filtered data and monthly aggregation for further use
+        # Store the monthly aggregation for further use
         self.filtered_monthly_data = monthly_data
-        self.selected_year_data = filtered_data
 
         # Debug: Print the recalculated monthly data
         print("Filtered Monthly Data:")
         print(monthly_data)
 
-        # Update the plot with the new data
-        self.update_monthly_plot(monthly_data)
+        # Show the cached raster of this view if there is one, otherwise
+        # update the plot and cache the result
+        label = f"{selected_year}, {selected_state}"
+        key = self.monthly_cache_key(selected_year, selected_state)
+        raster = self.figure_cache.get(key)
+        if raster is not None and self.show_monthly_raster(raster):
+            # keep the artists current for later full redraws
+            if self.monthly_line is not None:
+                self.monthly_line.set_data(
+                    monthly_data['Month'].to_numpy(),
+                    monthly_data['OBSERVATION COUNT'].to_numpy())
+                self.monthly_label.set_text(label)
+            return
+        self.update_monthly_plot(monthly_data, label,
+                                 self.monthly_ylim(selected_state))
+        self.figure_cache.put(key, self.monthly_buffer().copy())
 
-    def update_monthly_plot(self, monthly_data):
+    def monthly_ylim(self, state):
         """
-        Updates the monthly observations plot with new data.
+        Return the y limits of the monthly plot of a state, or of all
+        states, which fit its busiest month of any year. All years are
+        drawn with them, so live and prewarmed plots match.
         """
-        # Clear the existing figure
-        self.fig2_canvas.figure.clear()
+        if state not in self.monthly_ylims:
+            regions = None if state == ALL_STATES else state
+            top = self.cube.peak_monthly_total(regions=regions)
+            self.monthly_ylims[state] = (0, top * 1.1 or 1)
+        return self.monthly_ylims[state]
 
-        # Create a new plot
-        ax = self.fig2_canvas.figure.add_subplot(111)  # Add a new subplot
-        ax.plot(
-            monthly_data['Month'],
-            monthly_data['OBSERVATION COUNT'],
-            marker='o',
-            linestyle='-',
-            color='seagreen'
-        )
+    def monthly_buffer(self):
+        """
+        Return the RGBA pixel buffer of the monthly plot's renderer.
+        """
+        return np.asarray(self.fig2_canvas.get_renderer().buffer_rgba())
+
+    def monthly_cache_key(self, year, state):
+        """
+        Return the figure cache key of a monthly plot view at the
+        current canvas size.
+        """
+        renderer = self.fig2_canvas.get_renderer()
+        return ('monthly', int(year), state,
+                (int(renderer.width), int(renderer.height)))
+
+    def show_monthly_raster(self, raster):
+        """
+        Blit a cached raster into the monthly plot. Returns False if the
+        raster does not match the current canvas size.
+        """
+        buffer = self.monthly_buffer()
+        if buffer.shape != raster.shape:
+            return False
+        buffer[...] = raster
+        self.fig2_canvas.blit()
+        return True
+
+    def start_prewarming(self):
+        """
+        Render the monthly plot of every year in a background process
+        and add the rasters to the figure cache as they arrive.
+        """
+        renderer = self.fig2_canvas.get_renderer()
+        width, height = int(renderer.width), int(renderer.height)
+        dpi = self.fig2_canvas.figure.dpi
+        ylim = self.monthly_ylim(ALL_STATES)
+        self.prewarm_executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context(PREWARM_START_METHOD))
+        for year in self.cube.years:
+            key = self.monthly_cache_key(year, ALL_STATES)
+            if key in self.figure_cache:
+                continue
+            monthly_data = self.cube.monthly_totals(year=year)
+            future = self.prewarm_executor.submit(
+                render_monthly_raster, monthly_data, width, height, dpi,
+                f"{int(year)}, {ALL_STATES}", ylim)
+            future.add_done_callback(
+                lambda done, key=key: self.store_prewarmed(key, done))
+
+    def store_prewarmed(self, key, future):
+        """
+        Add a prewarmed raster to the figure cache, unless the cache
+        already got one from the GUI.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        if key not in self.figure_cache:
+            self.figure_cache.put(key, future.result())
+
+    def on_close(self):
+        """
+        Stop prewarming and close the window.
+        """
+        if self.prewarm_executor is not None:
+            self.prewarm_executor.shutdown(wait=False, cancel_futures=True)
+        self.master.destroy()
+
+    def create_date_range_selector(self):
+        """
+        Add entries for an arbitrary date range and a label showing the
+        total observations in it, for the state selected above.
+        """
+        range_index = self.bird_observation.get_date_range_index()
+        first_day = str(range_index.first_day)
+        last_day = str(range_index.first_day
+                       + len(range_index.total_prefix) - 2)
+
+        range_frame = ttk.Frame(self.main_frame)
+        range_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Label(range_frame, text="From:").pack(side=tk.LEFT)
+        self.range_start = tk.StringVar(value=first_day)
+        ttk.Entry(range_frame, textvariable=self.range_start,
+                  width=12).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(range_frame, text="To:").pack(side=tk.LEFT)
+        self.range_end = tk.StringVar(value=last_day)
+        ttk.Entry(range_frame, textvariable=self.range_end,
+                  width=12).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(range_frame, text="Total",
+                   command=self.on_date_range_selected).pack(side=tk.LEFT)
+        self.range_total = tk.StringVar()
+        ttk.Label(range_frame, textvariable=self.range_total).pack(
+            side=tk.LEFT, padx=10)
+
+        # Open the hotspot map when the records have coordinates
+        columns = self.bird_observation.columns
+        if 'LATITUDE' in columns and 'LONGITUDE' in columns:
+            ttk.Button(range_frame, text="Hotspot Map",
+                       command=self.open_hotspot_map).pack(side=tk.RIGHT)
+
+        self.on_date_range_selected()
+
+    def on_date_range_selected(self):
+        """
+        Callback function triggered when the date range total is requested.
+        """
+        selected_state = self.selected_state.get()
+        states = None if selected_state == ALL_STATES else selected_state
+        try:
+            start = pd.Timestamp(self.range_start.get())
+            end = pd.Timestamp(self.range_end.get())
+        except ValueError:
+            self.range_total.set("Please enter dates as YYYY-MM-DD.")
+            return
+
+        total = self.bird_observation.get_total_in_date_range(start, end,
+                                                              states)
+        if total is None:
+            self.range_total.set("The total could not be computed.")
+            return
+        self.range_total.set(
+            f"Observations from {start.date()} to {end.date()} "
+            f"({selected_state}): {total:,.0f}")
+
+    def open_hotspot_map(self):
+        """
+        Open the hotspot map in a separate window, or report in the
+        status bar that it could not be drawn.
+        """
+        figure = plot_hotspot_map(self.bird_observation, level=0)
+        if figure is None or not figure.axes:
+            self.status_text.set("The hotspot map could not be drawn.")
+            return
+        HotspotMapWindow(tk.Toplevel(self.master), self.bird_observation,
+                         [int(year) for year in self.cube.years], figure)
+
+    def setup_monthly_artists(self):
+        """
+        Keep the axes and line of the monthly plot so that year changes
+        only update them. The line and a year label are animated, so
+        they can be blitted over a cached background of the axes.
+
+        If the plot could not be made, there is no line to update, and
+        the plot is drawn again in full on every change instead.
+        """
+        figure = self.fig2_canvas.figure
+        self.monthly_background = None
+        self.monthly_line = None
+        if not figure.axes or not figure.axes[0].lines:
+            return
+        self.monthly_ax = figure.axes[0]
+        self.monthly_ax.set_xlim(0.5, 12.5)
+        self.monthly_ax.set_ylim(bottom=0)
+        self.monthly_line = self.monthly_ax.lines[0]
+        self.monthly_line.set_animated(True)
+        self.monthly_label = self.monthly_ax.text(
+            0.98, 0.92, "", transform=self.monthly_ax.transAxes,
+            ha='right', va='top', fontsize=9, animated=True)
+        self.fig2_canvas.mpl_connect('draw_event', self.on_monthly_draw)
 
-        # Customize the plot
-        ax.set_title("Snowy Owl Observations by Month")
-        ax.set_xlabel("Month")
-        ax.set_ylabel("Total Observations")
-        ax.set_facecolor('#ECECEC')
-        ax.grid(True, linestyle='--', alpha=0.5)
+    def on_monthly_draw(self, event):
+        """
+        Cache the background after a full redraw of the monthly plot,
+        then draw the animated artists on top of it.
+        """
+        canvas = self.fig2_canvas
+        self.monthly_background = canvas.copy_from_bbox(canvas.figure.bbox)
+        self.monthly_ax.draw_artist(self.monthly_line)
+        self.monthly_ax.draw_artist(self.monthly_label)
+
+    def update_monthly_plot(self, monthly_data, label="", ylim=None):
+        """
+        Updates the monthly observations plot with new data, drawn with
+        the given y limits, by default fitted to the data.
+        """
+        if self.monthly_line is None:
+            self.redraw_monthly_plot(monthly_data, label, ylim)
+            return
+
+        counts = monthly_data['OBSERVATION COUNT'].to_numpy()
+        self.monthly_line.set_data(monthly_data['Month'].to_numpy(), counts)
+        self.monthly_label.set_text(label)
+        if ylim is None:
+            top = float(counts.max()) if len(counts) else 0.0
+            ylim = (0, top * 1.1 or 1)
+
+        # Rescale and fully redraw only if the y limits change
+        if (self.monthly_background is None
+                or tuple(self.monthly_ax.get_ylim()) != tuple(ylim)):
+            self.monthly_ax.set_ylim(*ylim)
+            self.fig2_canvas.draw()
+            return
+
+        # Otherwise blit the new line over the cached background
+        canvas = self.fig2_canvas
+        canvas.restore_region(self.monthly_background)
+        self.monthly_ax.draw_artist(self.monthly_line)
+        self.monthly_ax.draw_artist(self.monthly_label)
+        canvas.blit(canvas.figure.bbox)
 
-        # Redraw the canvas with the updated plot
+    def redraw_monthly_plot(self, monthly_data, label="", ylim=None):
+        """
+        Draw the monthly observations plot again from scratch, when its
+        line cannot be updated in place.
+        """
+        figure = self.fig2_canvas.figure
+        figure.clear()
+        ax = figure.add_subplot(111)
+        draw_monthly_observations(figure, ax, monthly_data,
+                                  'Snowy Owl Observations by Month')
+        ax.set_xlim(0.5, 12.5)
+        if ylim is None:
+            ax.set_ylim(bottom=0)
+        else:
+            ax.set_ylim(*ylim)
+        ax.text(0.98, 0.92, label, transform=ax.transAxes, ha='right',
+                va='top', fontsize=9)
         self.fig2_canvas.draw()
 
+    def step_year(self, step):
+        """
+        Select the year 'step' places after the selected one, if any.
+        Returns True if the selection changed.
+        """
+        years = list(self.year_selector['values'])
+        position = years.index(self.selected_year.get()) + step
+        if not 0 <= position < len(years):
+            return False
+        self.selected_year.set(years[position])
+        self.on_year_selected(None)
+        return True
+
+    def on_play_clicked(self):
+        """
+        Start or stop playing through the years.
+        """
+        self.playing = not self.playing
+        self.play_button.config(text="Stop" if self.playing else "Play")
+        if self.playing:
+            self.play_next_year()
+
+    def play_next_year(self):
+        """
+        Show the next year and schedule the one after it while playing.
+        """
+        if not self.playing:
+            return
+        if self.step_year(1):
+            self.master.after(PLAY_INTERVAL_MS, self.play_next_year)
+        else:
+            self.on_play_clicked()
+
     def run(self):
-        self.master.mainloop()
\ No newline at end of file
+        self.master.mainloop()
+
+
+class HotspotMapWindow:
+    """
+    A window with a zoomable hotspot map. Every pan, zoom, year or month
+    change is drawn from the cells of the spatial pyramid at the level
+    that suits the visible area.
+    """
+    def __init__(self, master, bird_observation, years, figure):
+        self.master = master
+        self.pyramid = bird_observation.get_spatial_pyramid()
+        self.master.title("Snowy Owl Hotspot Map")
+
+        controls = ttk.Frame(self.master, padding="5")
+        controls.pack(fill=tk.X)
+        self.selected_year = tk.StringVar(value=ALL_YEARS)
+        self.selected_month = tk.StringVar(value=ALL_MONTHS)
+        for label, variable, values in (
+                ("Year:", self.selected_year,
+                 [ALL_YEARS] + [str(year) for year in years]),
+                ("Month:", self.selected_month,
+                 [ALL_MONTHS] + [str(month) for month in range(1, 13)])):
+            ttk.Label(controls, text=label).pack(side=tk.LEFT)
+            selector = ttk.Combobox(controls, textvariable=variable,
+                                    values=values, state='readonly',
+                                    width=10)
+            selector.pack(side=tk.LEFT, padx=5)
+            selector.bind("<<ComboboxSelected>>", self.redraw)
+
+        self.ax = figure.axes[0]
+        self.ax.set_autoscale_on(False)
+        self.image = self.ax.images[0] if self.ax.images else None
+        self.redrawing = False
+        self.canvas = FigureCanvasTkAgg(figure, master=self.master)
+        NavigationToolbar2Tk(self.canvas, self.master)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        # redraw from the pyramid whenever the visible area changes
+        self.ax.callbacks.connect('xlim_changed', self.redraw)
+        self.ax.callbacks.connect('ylim_changed', self.redraw)
+        self.redraw()
+
+    def redraw(self, *args):
+        """
+        Draw the cells of the visible area at a matching zoom level.
+        """
+        if self.redrawing:
+            return
+        self.redrawing = True
+        try:
+            self.draw_visible_cells()
+        finally:
+            self.redrawing = False
+
+    def draw_visible_cells(self):
+        """
+        Read the visible cells from the pyramid and draw them.
+        """
+        year = self.selected_year.get()
+        month = self.selected_month.get()
+        west, east = self.ax.get_xlim()
+        south, north = self.ax.get_ylim()
+        level = self.pyramid.level_for_span(max(east - west, north - south))
+        cells = self.pyramid.cells(
+            level,
+            year=None if year == ALL_YEARS else int(year),
+            month=None if month == ALL_MONTHS else int(month),
+            bounds=(south, west, north, east))
+        self.image = draw_hotspot_cells(self.ax, cells,
+                                        self.pyramid.cell_size(level),
+                                        self.image)
+        self.canvas.draw_idle()
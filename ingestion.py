@@ -0,0 +1,115 @@
+import csv
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from archives import open_decompressed, peek, detect_delimiter
+from schema import apply_schema, select_columns
+
+# Number of csv rows parsed into each DataFrame batch.
+DEFAULT_BATCH_ROWS = 100_000
+
+
+def is_url(source):
+    """
+    Return True if the source is an http(s) url rather than a local path.
+    """
+    return isinstance(source, str) and source.startswith(
+        ('http://', 'https://'))
+
+
+def iter_csv_batches(source, batch_rows=DEFAULT_BATCH_ROWS, timeout=30,
+                     schema=None, row_filter=None):
+    """
+    Read a csv file from a url, a local path or an open binary stream
+    and yield it as DataFrames of at most 'batch_rows' rows.
+
+    The source is read incrementally, so only one batch is held in
+    memory at a time. Gzip, bzip2, zip and tar archives are
+    decompressed as they are read (see archives.py), and tab-separated
+    text such as the eBird Basic Dataset is recognised by its header.
+    Without a schema all columns are kept as strings, like the rows
+    produced by parse_csv. With a schema (see schema.py) only its
+    columns are loaded, converted to their compact types.
+    A 'row_filter' gets each batch of raw strings and returns a boolean
+    mask of the rows to keep, before any conversion is done; batches
+    left empty are skipped.
+    """
+    if is_url(source):
+        # requests is only imported when a url is read
+        import requests
+        with requests.get(source, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield from _read_csv_batches(response.raw, batch_rows, schema,
+                                         row_filter)
+    elif hasattr(source, 'read'):
+        yield from _read_csv_batches(source, batch_rows, schema,
+                                     row_filter)
+    else:
+        with open(source, 'rb') as stream:
+            yield from _read_csv_batches(stream, batch_rows, schema,
+                                         row_filter)
+
+
+def _read_csv_batches(stream, batch_rows, schema=None, row_filter=None):
+    """
+    Decompress an open binary stream and parse it into DataFrame
+    batches.
+    """
+    with open_decompressed(stream) as text_stream:
+        yield from _parse_batches(text_stream, batch_rows, schema,
+                                  row_filter)
+
+
+def _parse_batches(stream, batch_rows, schema=None, row_filter=None):
+    """
+    Parse an uncompressed binary stream of delimited text into
+    DataFrame batches.
+    """
+    head, stream = peek(stream)
+    delimiter = detect_delimiter(head)
+    usecols = select_columns(schema) if schema else None
+    try:
+        # eBird's tab-separated files do not quote their fields, and
+        # comments can hold stray quotes
+        reader = pd.read_csv(stream, sep=delimiter, dtype=str,
+                             keep_default_na=False, usecols=usecols,
+                             chunksize=batch_rows, encoding='utf-8',
+                             quoting=csv.QUOTE_NONE if delimiter == '\t'
+                             else csv.QUOTE_MINIMAL)
+    except pd.errors.EmptyDataError:
+        return
+
+    with reader:
+        for batch in reader:
+            # strip whitespace from column names
+            batch.columns = batch.columns.str.strip()
+            if row_filter is not None:
+                batch = batch[row_filter(batch)].reset_index(drop=True)
+                if batch.empty:
+                    continue
+            if schema:
+                batch = apply_schema(batch, schema)
+            yield batch
+
+
+def concat_batches(batches):
+    """
+    Concatenate DataFrame batches into one DataFrame. Categorical
+    columns are combined with the sorted union of their categories so
+    they stay categorical, with the same categories however the records
+    were split into batches.
+    """
+    if not batches:
+        return pd.DataFrame()
+
+    columns = {}
+    for name in batches[0].columns:
+        parts = [batch[name] for batch in batches]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[name] = union_categoricals(parts,
+                                               sort_categories=True)
+        else:
+            columns[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('snowy_owl_dashboard')
+
+# Capture modes of profiling().
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+# Allocation sites listed by the tracemalloc capture.
+TRACEMALLOC_TOP = 15
+
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+_json_path = None
+
+
+def configure(json_path=None):
+    """
+    Write each finished span as a line of JSON to 'json_path', in
+    addition to the log records, and forget the spans of earlier runs.
+    """
+    global _json_path
+    _json_path = json_path
+    reset()
+
+
+def reset():
+    """
+    Forget the recorded spans.
+    """
+    with _lock:
+        _records.clear()
+
+
+def records():
+    """
+    Return a copy of the spans recorded so far, in the order they
+    finished.
+    """
+    with _lock:
+        return list(_records)
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the process in bytes, or None
+    where the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _stack():
+    """
+    Return the stack of open span names of the current thread.
+    """
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time a pipeline stage such as 'download', 'parse', 'clean',
+    'aggregate' or 'render'.
+
+    The block gets the dictionary of fields of the span and can add
+    counts to it, such as 'rows' and 'bytes'. When the block ends, its
+    duration, the peak RSS of the process and the enclosing span are
+    added, and the span is logged and recorded.
+    """
+    record = dict(fields)
+    parent, start = _open(name)
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = repr(e)
+        raise
+    finally:
+        _close(name, parent, start, record)
+
+
+def _open(name):
+    """
+    Push a span on the stack of the current thread and return its
+    parent and start time.
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    return parent, time.perf_counter()
+
+
+def _close(name, parent, start, fields, keep=True):
+    """
+    Pop a span opened with _open off the stack and, unless 'keep' is
+    False, record it with its fields.
+    """
+    stack = _stack()
+    stack.pop()
+    if not keep:
+        return
+    _finish({
+        'span': name,
+        'parent': parent,
+        'depth': len(stack),
+        'seconds': time.perf_counter() - start,
+        'peak_rss': peak_rss(),
+        'thread': threading.current_thread().name,
+        **fields
+        })
+
+
+def add_records(spans):
+    """
+    Record spans that finished in another process, such as a worker of
+    a process pool, nested in the open span of the current thread.
+    """
+    stack = _stack()
+    for record in spans:
+        record = dict(record)
+        if record['parent'] is None and stack:
+            record['parent'] = stack[-1]
+        record['depth'] += len(stack)
+        _finish(record)
+
+
+def timed_batches(name, batches, **fields):
+    """
+    Yield the items of an iterable of DataFrame batches, recording the
+    time taken to produce each one as a span with its row count. The
+    end of the iterable is not a batch and is not recorded.
+    """
+    iterator = iter(batches)
+    while True:
+        record = dict(fields)
+        parent, start = _open(name)
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            _close(name, parent, start, record, keep=False)
+            return
+        except BaseException as e:
+            record['error'] = repr(e)
+            _close(name, parent, start, record)
+            raise
+        record['rows'] = len(batch)
+        _close(name, parent, start, record)
+        yield batch
+
+
+def _finish(record):
+    """
+    Record a finished span and send it to the log and the JSON file.
+    """
+    with _lock:
+        _records.append(record)
+        line = json.dumps(record, default=str)
+        if _json_path:
+            with open(_json_path, 'a') as file:
+                file.write(line + '\n')
+    logger.info(line, extra={'span': record})
+
+
+def summarize(spans=None):
+    """
+    Total the spans by name, keeping the order in which each name first
+    finished.
+
+    Returns a list of dictionaries with the 'span' name, its 'depth',
+    the number of 'calls', the total 'seconds', 'rows' and 'bytes' and
+    the highest 'peak_rss'.
+    """
+    totals = {}
+    for record in records() if spans is None else spans:
+        total = totals.setdefault(record['span'], {
+            'span': record['span'], 'depth': record['depth'], 'calls': 0,
+            'seconds': 0.0, 'rows': None, 'bytes': None, 'peak_rss': None
+            })
+        total['calls'] += 1
+        total['seconds'] += record['seconds']
+        for key in ('rows', 'bytes'):
+            if record.get(key) is not None:
+                total[key] = (total[key] or 0) + record[key]
+        if record.get('peak_rss') is not None:
+            total['peak_rss'] = max(total['peak_rss'] or 0,
+                                    record['peak_rss'])
+    return list(totals.values())
+
+
+def format_summary(spans=None):
+    """
+    Return the span totals as a text table.
+    """
+    def number(value, scale=1, unit=''):
+        return '-' if value is None else f"{value / scale:,.1f}{unit}"
+
+    lines = [f"{'Stage':<32} {'Calls':>6} {'Seconds':>9} {'Rows':>13} "
+             f"{'MiB':>9} {'Peak RSS':>10}"]
+    for total in summarize(spans):
+        name = '  ' * total['depth'] + total['span']
+        lines.append(
+            f"{name:<32} {total['calls']:>6} {total['seconds']:>9.3f} "
+            f"{number(total['rows']).replace('.0', ''):>13} "
+            f"{number(total['bytes'], 2 ** 20):>9} "
+            f"{number(total['peak_rss'], 2 ** 20, ' MiB'):>10}")
+    return '\n'.join(lines)
+
+
+def print_summary():
+    """
+    Print the table of the spans recorded in this run.
+    """
+    if records():
+        print(format_summary())
+
+
+@contextmanager
+def profiling(mode=None, output=None):
+    """
+    Optionally profile a block of code on the current thread.
+
+    With mode 'cprofile' the function statistics are saved to 'output'
+    (default 'profile.pstats') and the slowest functions are printed.
+    With mode 'tracemalloc' the allocation sites holding the most
+    memory at the end of the block are saved and printed. Without a
+    mode the block runs as it is.
+    """
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'.")
+
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            output = output or 'profile.pstats'
+            profile.dump_stats(output)
+            print(f"Saved the cProfile statistics to {output}.")
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+        return
+
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        output = output or 'tracemalloc.txt'
+        lines = [f"Peak traced memory: {peak / 2 ** 20:,.1f} MiB"]
+        lines += [str(statistic) for statistic
+                  in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]]
+        with open(output, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        print(f"Saved the tracemalloc statistics to "
+              f"{os.path.abspath(output)}.")
+        print('\n'.join(lines))
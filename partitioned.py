@@ -0,0 +1,213 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import instrumentation
+from archives import detect_compression
+from classes.bird_observation import BirdObservation
+from ingestion import (
+    iter_csv_batches,
+    concat_batches,
+    is_url,
+    DEFAULT_BATCH_ROWS
+    )
+from schema import OBSERVATION_SCHEMA
+
+# Smallest byte range worth a partition of its own, and partitions per
+# worker, so a slow partition does not hold up the others at the end.
+MIN_PARTITION_BYTES = 8 << 20
+PARTITIONS_PER_WORKER = 4
+# Start method of the worker processes. The GUI loads the data while Tk
+# and the download threads run, and a forked child would inherit any
+# lock one of them holds, such as the lock of the recorded spans.
+START_METHOD = 'spawn'
+
+# Aggregates of BirdObservation computed per partition, with the
+# columns they group by, so they can be merged by summing again.
+GROUPED_AGGREGATES = {
+    'year': 'Year',
+    'month': 'Month',
+    'state': 'STATE',
+    'location': ['STATE', 'COUNTY']
+    }
+
+
+def default_workers():
+    """
+    Return the number of worker processes to use: one per core.
+    """
+    return os.cpu_count() or 1
+
+
+def can_partition(source):
+    """
+    Return True if a source can be split into byte ranges: a local,
+    uncompressed file. Compressed data can only be read from its start.
+    """
+    if is_url(source) or not isinstance(source, (str, os.PathLike)):
+        return False
+    try:
+        with open(source, 'rb') as file:
+            return detect_compression(file.read(512)) is None
+    except OSError:
+        return False
+
+
+def partition_ranges(path, partitions, min_bytes=MIN_PARTITION_BYTES):
+    """
+    Split a delimited text file into at most 'partitions' byte ranges,
+    each at least 'min_bytes' long, that start and end on line
+    boundaries after the header line. Fields must not span lines, as
+    in the eBird files.
+
+    Returns a tuple of the header line and the list of (start, end)
+    byte ranges.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as file:
+        header = file.readline()
+        body_start = file.tell()
+        count = max(1, min(partitions, (size - body_start) // min_bytes))
+        step = (size - body_start) / count
+        bounds = [body_start]
+        for part in range(1, count):
+            # the line holding the split point ends the previous range
+            file.seek(int(body_start + part * step))
+            file.readline()
+            position = file.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+        bounds.append(size)
+    return header, list(zip(bounds[:-1], bounds[1:]))
+
+
+class _RangeStream(io.RawIOBase):
+    """
+    Represent a byte range of a file, read after the header line so it
+    parses like a file of its own.
+    """
+    def __init__(self, path, header, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._header = header
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._header:
+            size = min(len(buffer), len(self._header))
+            buffer[:size] = self._header[:size]
+            self._header = self._header[size:]
+            return size
+        data = self._file.read(min(len(buffer), self._remaining))
+        self._remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def load_partition(path, header, start, end, clean,
+                   batch_rows=DEFAULT_BATCH_ROWS, schema=OBSERVATION_SCHEMA):
+    """
+    Parse, clean and aggregate one byte range of an observation file.
+
+    Returns a tuple of the cleaned records, a dictionary of their
+    aggregates, keyed like the memoized aggregates of BirdObservation,
+    which is empty if the range holds no valid records, and the spans
+    recorded while loading the range.
+    """
+    first_span = len(instrumentation.records())
+    with instrumentation.span('partition', bytes=end - start) as stage:
+        with _RangeStream(path, header, start, end) as stream:
+            cleaned_batches = [
+                clean(batch) for batch in iter_csv_batches(
+                    io.BufferedReader(stream), batch_rows, schema=schema)]
+        records = concat_batches(cleaned_batches)
+        stage['rows'] = len(records)
+        aggregates = {}
+        if not records.empty:
+            bird_observation = BirdObservation(records)
+            aggregates = {
+                'year': bird_observation.aggregate_observations_by_year(),
+                'month': bird_observation.aggregate_observations_by_month(),
+                'state': bird_observation.aggregate_observations_by_state(),
+                'location':
+                    bird_observation.aggregate_observations_by_location(),
+                'cube': bird_observation.get_aggregate_cube()
+                }
+    return records, aggregates, instrumentation.records()[first_span:]
+
+
+def merge_aggregates(partials):
+    """
+    Merge the aggregates of partitions, in order, into the aggregates
+    of all their records.
+    """
+    partials = [partial for partial in partials if partial]
+    if not partials:
+        return {}
+
+    merged = {}
+    for key, columns in GROUPED_AGGREGATES.items():
+        merged[key] = concat_batches(
+            [partial[key] for partial in partials]).groupby(
+                columns, observed=True, as_index=False)[
+                'OBSERVATION COUNT'].sum()
+    cube = partials[0]['cube']
+    for partial in partials[1:]:
+        cube.add(partial['cube'])
+    merged['cube'] = cube
+    return merged
+
+
+def load_partitioned(path, clean, workers=None,
+                     batch_rows=DEFAULT_BATCH_ROWS,
+                     schema=OBSERVATION_SCHEMA,
+                     min_bytes=MIN_PARTITION_BYTES):
+    """
+    Load an observation file in parallel: split it into byte ranges on
+    line boundaries, parse, clean and aggregate the ranges in a pool of
+    'workers' processes, and join the records and merge the aggregates
+    in file order. The result is the same as loading the file serially.
+    The spans recorded by the workers are added to those of this
+    process, under its open span.
+
+    Parameters:
+    path (str): A local, uncompressed csv or tsv file.
+    clean (function): The cleaning function, applied to every batch.
+    workers (int): Number of processes, by default one per core.
+    batch_rows (int): Rows parsed and cleaned at a time in a worker.
+    schema (dict): The columns to load, see schema.py.
+    min_bytes (int): Smallest byte range worth a partition.
+
+    Returns:
+    tuple: The cleaned records and a dictionary of their aggregates.
+    """
+    workers = workers or default_workers()
+    header, ranges = partition_ranges(
+        path, workers * PARTITIONS_PER_WORKER, min_bytes)
+    arguments = (repeat(path), repeat(header),
+                 [start for start, _ in ranges], [end for _, end in ranges],
+                 repeat(clean), repeat(batch_rows), repeat(schema))
+    if workers > 1 and len(ranges) > 1:
+        with ProcessPoolExecutor(
+                max_workers=min(workers, len(ranges)),
+                mp_context=multiprocessing.get_context(START_METHOD)
+                ) as executor:
+            results = list(executor.map(load_partition, *arguments))
+        for _, _, spans in results:
+            instrumentation.add_records(spans)
+    else:
+        results = list(map(load_partition, *arguments))
+
+    records = concat_batches([records for records, _, _ in results
+                              if not records.empty])
+    return records, merge_aggregates(
+        [partial for _, partial, _ in results])
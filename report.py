@@ -0,0 +1,172 @@
+"""
+Render the dashboard figures to image files without a display.
+
+Usage:
+    python report.py [--output-dir DIR] [--formats png svg]
+                     [--years all | YEAR ...] [--workers N] [--offline]
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from classes.bird_observation import BirdObservation
+from classes.snowy_owl_trend import SnowyOwlTrend
+from data_dashboard import load_data
+from instrumentation import span, print_summary
+from visualizations import (
+    plot_observations_by_year,
+    plot_correlation,
+    plot_monthly_observations,
+    plot_population_trend
+    )
+
+DEFAULT_OUTPUT_DIR = 'report'
+DEFAULT_FORMATS = ('png',)
+
+# The data each worker process renders from, set by _init_worker.
+_worker_data = {}
+
+
+def _init_worker(bird_observations_df, population_trend_df):
+    """
+    Give a worker process its own copy of the data, once.
+    """
+    _worker_data['bird_observation'] = BirdObservation(bird_observations_df)
+    _worker_data['snowy_owl_trend'] = SnowyOwlTrend(population_trend_df)
+
+
+def build_tasks(years):
+    """
+    Return the (file name, plot name, year) of every figure to render:
+    the four dashboard figures and a monthly figure for each year.
+    """
+    tasks = [
+        ('observations_by_year', 'observations_by_year', None),
+        ('monthly_observations', 'monthly_observations', None),
+        ('population_trend', 'population_trend', None),
+        ('correlation', 'correlation', None)
+        ]
+    tasks += [(f'monthly_observations_{year}', 'monthly_observations', year)
+              for year in years]
+    return tasks
+
+
+def _make_figure(plot_name, year):
+    """
+    Generate one figure from the worker's data.
+    """
+    bird_observation = _worker_data['bird_observation']
+    snowy_owl_trend = _worker_data['snowy_owl_trend']
+    if plot_name == 'observations_by_year':
+        return plot_observations_by_year(bird_observation)
+    if plot_name == 'monthly_observations':
+        return plot_monthly_observations(bird_observation, year)
+    if plot_name == 'population_trend':
+        return plot_population_trend(snowy_owl_trend)
+    if plot_name == 'correlation':
+        return plot_correlation(bird_observation, snowy_owl_trend)
+    raise ValueError(f"Unknown plot '{plot_name}'.")
+
+
+def render_task(task, output_dir, formats):
+    """
+    Render one figure to a file per format and return the file paths.
+    """
+    file_name, plot_name, year = task
+    fig = _make_figure(plot_name, year)
+    if fig is None:
+        return []
+    paths = []
+    try:
+        for file_format in formats:
+            path = os.path.join(output_dir, f"{file_name}.{file_format}")
+            fig.savefig(path, format=file_format, bbox_inches='tight')
+            paths.append(path)
+    finally:
+        plt.close(fig)
+    return paths
+
+
+def render_report(bird_observation, snowy_owl_trend,
+                  output_dir=DEFAULT_OUTPUT_DIR, formats=DEFAULT_FORMATS,
+                  years=None, workers=None):
+    """
+    Render the dashboard figures and the monthly figure of each year to
+    'output_dir', in parallel over 'workers' processes.
+
+    Returns the list of written file paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if years is None:
+        years = [int(year)
+                 for year in bird_observation.get_aggregate_cube().years]
+    tasks = build_tasks(years)
+    initargs = (bird_observation.data, snowy_owl_trend.data)
+    workers = workers or os.cpu_count() or 1
+
+    with span('render', tasks=len(tasks), workers=workers) as stage:
+        if workers == 1:
+            _init_worker(*initargs)
+            results = [render_task(task, output_dir, formats)
+                       for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                     initializer=_init_worker,
+                                     initargs=initargs) as executor:
+                results = list(executor.map(
+                    render_task, tasks,
+                    [output_dir] * len(tasks), [formats] * len(tasks)))
+        paths = [path for paths in results for path in paths]
+        stage['files'] = len(paths)
+    return paths
+
+
+def parse_arguments(argv):
+    """
+    Parse the command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Render the Snowy Owl dashboard figures to files.")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help="directory the figures are written to")
+    parser.add_argument('--formats', nargs='+', default=list(DEFAULT_FORMATS),
+                        choices=['png', 'svg', 'pdf'],
+                        help="file formats to write")
+    parser.add_argument('--years', nargs='+', default=['all'],
+                        help="years to render monthly figures for, or 'all'")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes")
+    parser.add_argument('--offline', action='store_true',
+                        help="use the mirrored data without downloading")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Load the data and render the report.
+    """
+    arguments = parse_arguments(sys.argv[1:] if argv is None else argv)
+    data = load_data(arguments.offline)
+    if data is None:
+        return 1
+    bird_observation, snowy_owl_trend = data
+
+    years = None
+    if arguments.years != ['all']:
+        years = [int(year) for year in arguments.years]
+
+    paths = render_report(bird_observation, snowy_owl_trend,
+                          arguments.output_dir, arguments.formats, years,
+                          arguments.workers)
+    print(f"Rendered {len(paths)} files to {arguments.output_dir}.")
+    print_summary()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
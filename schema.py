@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Date format used by the eBird Basic Dataset.
+DATE_FORMAT = '%Y-%m-%d'
+# Format of the timestamps of the eBird Basic Dataset, such as LAST
+# EDITED DATE.
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# eBird records a species as present without counting it as 'X'.
+COUNT_SENTINEL = 'X'
+COUNT_SENTINEL_VALUE = 1
+
+# Columns of the eBird Basic Dataset used by the dashboard, with the
+# kind of value each one holds. All other columns are not loaded.
+OBSERVATION_SCHEMA = {
+    'COMMON NAME': 'category',
+    'OBSERVATION COUNT': 'count',
+    'STATE': 'category',
+    'COUNTY': 'category',
+    'LATITUDE': 'float32',
+    'LONGITUDE': 'float32',
+    'OBSERVATION DATE': 'date',
+    'OBSERVER ID': 'category'
+    }
+
+# Columns of the NatureCounts population trend file.
+TREND_SCHEMA = {
+    'Year': 'int16',
+    'Index': 'float32',
+    'Lower CI': 'float32',
+    'Upper CI': 'float32'
+    }
+
+
+def select_columns(schema):
+    """
+    Return a usecols filter for pd.read_csv that keeps only the schema
+    columns, ignoring whitespace around the header names.
+    """
+    return lambda name: name.strip() in schema
+
+
+def convert_count(values):
+    """
+    Convert observation counts to int32, counting the 'X' sentinel as
+    one bird. Counts that cannot be parsed are counted as zero, which
+    leaves the totals unchanged.
+    """
+    values = values.replace(COUNT_SENTINEL, str(COUNT_SENTINEL_VALUE))
+    counts = pd.to_numeric(values, errors='coerce')
+    return counts.fillna(0).astype(np.int32)
+
+
+def apply_schema(df, schema):
+    """
+    Convert the string columns of a DataFrame to the compact types
+    declared in the schema.
+
+    Schema columns missing from the DataFrame are skipped. Rows whose
+    integer columns cannot be parsed are dropped.
+    """
+    invalid_rows = pd.Series(False, index=df.index)
+    for name, kind in schema.items():
+        if name not in df.columns:
+            continue
+        if kind == 'count':
+            df[name] = convert_count(df[name])
+        elif kind == 'date':
+            df[name] = pd.to_datetime(df[name], format=DATE_FORMAT,
+                                      errors='coerce')
+        elif kind == 'timestamp':
+            df[name] = pd.to_datetime(df[name], format=TIMESTAMP_FORMAT,
+                                      errors='coerce')
+        elif kind == 'category':
+            df[name] = df[name].astype('category')
+        elif kind.startswith('float'):
+            df[name] = pd.to_numeric(df[name], errors='coerce').astype(kind)
+        elif kind.startswith('int'):
+            values = pd.to_numeric(df[name], errors='coerce')
+            invalid_rows |= values.isna()
+            df[name] = values
+        else:
+            raise ValueError(f"Unknown schema kind '{kind}' for {name}.")
+
+    if invalid_rows.any():
+        df = df[~invalid_rows].reset_index(drop=True)
+    for name, kind in schema.items():
+        if name in df.columns and kind.startswith('int'):
+            df[name] = df[name].astype(kind)
+    return df
@@ -0,0 +1,184 @@
+"""
+Generate synthetic eBird Basic Dataset records for benchmarks and tests.
+
+The records have the column mix of a real EBD extract, 'X' counts, a
+share of unparseable dates and a skewed state distribution. The output
+only depends on the seed, so runs at the same scale are comparable.
+"""
+import numpy as np
+import pandas as pd
+
+# Rows generated and written per chunk, which bounds the memory used.
+GENERATOR_CHUNK_ROWS = 250_000
+
+EBD_COLUMNS = (
+    'GLOBAL UNIQUE IDENTIFIER', 'LAST EDITED DATE', 'TAXONOMIC ORDER',
+    'CATEGORY', 'COMMON NAME', 'SCIENTIFIC NAME', 'OBSERVATION COUNT',
+    'COUNTRY', 'STATE', 'COUNTY', 'LOCALITY', 'LATITUDE', 'LONGITUDE',
+    'OBSERVATION DATE', 'TIME OBSERVATIONS STARTED', 'OBSERVER ID',
+    'SAMPLING EVENT IDENTIFIER', 'PROTOCOL TYPE', 'DURATION MINUTES',
+    'NUMBER OBSERVERS', 'ALL SPECIES REPORTED'
+    )
+
+# States with their country and approximate centre, in order of how
+# often they are drawn.
+STATES = (
+    ('Ontario', 'Canada', 44.5, -79.5),
+    ('Quebec', 'Canada', 46.5, -72.0),
+    ('Manitoba', 'Canada', 50.0, -97.5),
+    ('Alberta', 'Canada', 52.0, -113.5),
+    ('New York', 'United States', 42.9, -75.5),
+    ('Michigan', 'United States', 43.5, -84.5),
+    ('Minnesota', 'United States', 46.0, -94.0),
+    ('Saskatchewan', 'Canada', 51.5, -106.0),
+    ('Massachusetts', 'United States', 42.3, -71.8),
+    ('British Columbia', 'Canada', 49.5, -123.0),
+    ('Wisconsin', 'United States', 44.5, -89.5),
+    ('Nova Scotia', 'Canada', 45.0, -63.0),
+    ('Maine', 'United States', 45.0, -69.0),
+    ('Alaska', 'United States', 64.0, -150.0),
+    ('Nunavut', 'Canada', 64.0, -90.0),
+    ('Newfoundland and Labrador', 'Canada', 48.5, -56.0)
+    )
+COUNTIES_PER_STATE = 12
+PROTOCOLS = ('Traveling', 'Stationary', 'Incidental', 'Area')
+
+FIRST_DAY = np.datetime64('1970-01-01')
+LAST_DAY = np.datetime64('2024-09-30')
+BAD_DATES = ('not a date', '2021-02-30', '')
+
+_TIME_NAMES = None
+
+
+def state_weights(count=len(STATES), skew=1.2):
+    """
+    Return Zipf-like probabilities of drawing each state.
+    """
+    weights = 1 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def _time_names():
+    """
+    Return the text of every day from FIRST_DAY, with room for edits
+    after LAST_DAY, and of every second of a day, so dates are formatted
+    by indexing instead of one by one.
+    """
+    global _TIME_NAMES
+    if _TIME_NAMES is None:
+        days = np.arange(FIRST_DAY, LAST_DAY + 400, dtype='datetime64[D]')
+        seconds = np.arange(86_400)
+        clock = np.char.add(
+            np.char.add(np.char.zfill((seconds // 3600).astype(str), 2),
+                        ':'),
+            np.char.add(
+                np.char.zfill((seconds // 60 % 60).astype(str), 2),
+                np.char.add(':', np.char.zfill((seconds % 60).astype(str),
+                                               2))))
+        _TIME_NAMES = (days.astype(str), clock)
+    return _TIME_NAMES
+
+
+def _prefixed(prefix, numbers):
+    """
+    Return the numbers as strings after a prefix.
+    """
+    return np.char.add(prefix, np.asarray(numbers).astype(str))
+
+
+def _decimals(values, places=6):
+    """
+    Format floats with a fixed number of decimal places, much faster
+    than converting them one by one.
+    """
+    scaled = np.round(np.abs(values) * 10 ** places).astype(np.int64)
+    whole = (scaled // 10 ** places).astype(str)
+    fraction = np.char.zfill((scaled % 10 ** places).astype(str), places)
+    sign = np.where(values < 0, '-', '')
+    return np.char.add(np.char.add(sign, whole), np.char.add('.', fraction))
+
+
+def generate_ebd_frame(rows, seed=0, start_row=0, x_rate=0.05,
+                       bad_date_rate=0.01):
+    """
+    Generate synthetic EBD records as a DataFrame of strings, the way
+    they are read from the csv.
+
+    Parameters:
+    rows (int): Number of records.
+    seed (int): Seed of the random generator.
+    start_row (int): Number of the first record, which keeps the
+        identifiers unique across chunks.
+    x_rate (float): Share of counts recorded as 'X'.
+    bad_date_rate (float): Share of unparseable observation dates.
+
+    Returns:
+    pandas.DataFrame: The records, with the columns of EBD_COLUMNS.
+    """
+    rng = np.random.default_rng([seed, start_row])
+    numbers = np.arange(start_row, start_row + rows)
+
+    # later years have far more records, as eBird grew
+    day_names, second_names = _time_names()
+    span = int((LAST_DAY - FIRST_DAY).astype(np.int64))
+    days = (span * np.sqrt(rng.random(rows))).astype(np.int64)
+    dates = day_names[days].astype(object)
+    bad = rng.random(rows) < bad_date_rate
+    dates[bad] = rng.choice(BAD_DATES, int(bad.sum()))
+    edited = np.char.add(
+        np.char.add(day_names[days + rng.integers(0, 400, rows)], ' '),
+        second_names[rng.integers(0, 86_400, rows)])
+
+    counts = rng.geometric(0.6, rows).astype(str).astype(object)
+    counts[rng.random(rows) < x_rate] = 'X'
+
+    state_index = rng.choice(len(STATES), rows, p=state_weights())
+    names, countries, latitudes, longitudes = (
+        np.array(values) for values in zip(*STATES))
+    county_index = rng.integers(0, COUNTIES_PER_STATE, rows)
+    locality = rng.integers(0, 5000, rows)
+    observers = rng.zipf(1.5, rows) % 200_000
+    checklists = numbers // 3
+
+    return pd.DataFrame({
+        'GLOBAL UNIQUE IDENTIFIER': _prefixed(
+            'URN:CornellLabOfOrnithology:EBIRD:OBS', numbers),
+        'LAST EDITED DATE': edited,
+        'TAXONOMIC ORDER': '8757',
+        'CATEGORY': 'species',
+        'COMMON NAME': 'Snowy Owl',
+        'SCIENTIFIC NAME': 'Bubo scandiacus',
+        'OBSERVATION COUNT': counts,
+        'COUNTRY': countries[state_index],
+        'STATE': names[state_index],
+        'COUNTY': _prefixed('County ', county_index),
+        'LOCALITY': _prefixed('Locality ', locality),
+        'LATITUDE': _decimals(latitudes.astype(float)[state_index]
+                              + rng.normal(0, 1.5, rows)),
+        'LONGITUDE': _decimals(longitudes.astype(float)[state_index]
+                               + rng.normal(0, 2.5, rows)),
+        'OBSERVATION DATE': dates,
+        'TIME OBSERVATIONS STARTED': np.char.add(
+            np.char.zfill(rng.integers(5, 20, rows).astype(str), 2),
+            ':00:00'),
+        'OBSERVER ID': _prefixed('obsr', observers),
+        'SAMPLING EVENT IDENTIFIER': _prefixed('S', checklists),
+        'PROTOCOL TYPE': rng.choice(PROTOCOLS, rows),
+        'DURATION MINUTES': rng.integers(1, 240, rows).astype(str),
+        'NUMBER OBSERVERS': rng.integers(1, 6, rows).astype(str),
+        'ALL SPECIES REPORTED': rng.integers(0, 2, rows).astype(str)
+        }, columns=list(EBD_COLUMNS))
+
+
+def write_ebd_csv(path, rows, seed=0, chunk_rows=GENERATOR_CHUNK_ROWS):
+    """
+    Write 'rows' synthetic EBD records to a csv file, a chunk at a time,
+    so any scale can be generated in bounded memory.
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_ebd_frame(min(chunk_rows, rows - start), seed,
+                                       start)
+            chunk.to_csv(file, index=False, header=start == 0)
+        if rows == 0:
+            file.write(','.join(EBD_COLUMNS) + '\n')
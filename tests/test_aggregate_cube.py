@@ -0,0 +1,61 @@
+import unittest
+import pandas as pd
+
+from classes.aggregate_cube import AggregateCube
+from classes.bird_observation import BirdObservation
+
+
+class TestAggregateCube(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime([
+                '2000-01-05', '2000-01-20', '2000-03-01', '2001-03-02',
+                '2001-12-24', '2002-06-30']),
+            'OBSERVATION COUNT': [1, 2, 3, 4, 5, None],
+            'STATE': ['Ontario', 'Quebec', 'Ontario', 'Ontario', None,
+                      'Quebec']
+        })
+        self.bird_observation = BirdObservation(self.data)
+        self.cube = self.bird_observation.get_aggregate_cube()
+
+    def test_monthly_totals_match_groupby(self):
+        result = self.cube.monthly_totals(year=2000)
+        expected = self.data[self.data['Year'] == 2000].groupby('Month')[
+            'OBSERVATION COUNT'].sum().reset_index()
+        self.assertEqual(result['Month'].tolist(), expected['Month'].tolist())
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(),
+                         expected['OBSERVATION COUNT'].tolist())
+
+    def test_region_and_month_range(self):
+        result = self.cube.monthly_totals(year=2000, regions='ontario')
+        self.assertEqual(result['Month'].tolist(), [1, 3])
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [1, 3])
+        self.assertEqual(self.cube.total(months=(3, 12)), 12)
+        self.assertEqual(self.cube.total(regions=['Quebec']), 2)
+
+    def test_yearly_totals(self):
+        result = self.cube.yearly_totals()
+        self.assertEqual(result['Year'].tolist(), [2000, 2001, 2002])
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [6, 9, 0])
+
+    def test_peak_monthly_total(self):
+        self.assertEqual(self.cube.peak_monthly_total(), 5)
+        self.assertEqual(self.cube.peak_monthly_total(regions='Ontario'), 4)
+        self.assertEqual(self.cube.peak_monthly_total(regions='Atlantis'),
+                         0)
+
+    def test_unknown_year(self):
+        self.assertTrue(self.cube.monthly_totals(year=1990).empty)
+
+    def test_cube_is_shared(self):
+        self.assertIs(self.bird_observation.get_aggregate_cube(), self.cube)
+
+    def test_without_region_column(self):
+        cube = AggregateCube.from_dataframe(pd.DataFrame({
+            'Year': [2000, 2000], 'Month': [2, 2],
+            'OBSERVATION COUNT': [1, 1]}))
+        self.assertEqual(cube.total(year=2000), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    pearson_rows,
+    bootstrap_correlation_interval,
+    permutation_p_value,
+    analyze_correlation
+    )
+from classes.bird_observation import BirdObservation
+from classes.snowy_owl_trend import SnowyOwlTrend
+
+
+class TestCorrelationSignificance(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.x = np.arange(30, dtype=float)
+        self.related = self.x * 2 + rng.normal(0, 5, 30)
+        self.unrelated = rng.normal(0, 1, 30)
+
+    def test_pearson_rows_matches_numpy(self):
+        rows = np.vstack([self.related, self.unrelated])
+        result = pearson_rows(np.tile(self.x, (2, 1)), rows)
+        self.assertAlmostEqual(result[0],
+                               np.corrcoef(self.x, self.related)[0, 1])
+        self.assertAlmostEqual(result[1],
+                               np.corrcoef(self.x, self.unrelated)[0, 1])
+        self.assertTrue(np.isnan(pearson_rows(np.ones(3), self.x[:3])))
+
+    def test_bootstrap_interval_contains_coefficient(self):
+        coefficient = np.corrcoef(self.x, self.related)[0, 1]
+        lower, upper = bootstrap_correlation_interval(
+            self.x, self.related, resamples=5000, seed=0)
+        self.assertLess(lower, coefficient)
+        self.assertLess(coefficient, upper)
+        self.assertLessEqual(upper, 1.0)
+
+    def test_permutation_p_value(self):
+        self.assertLess(permutation_p_value(self.x, self.related,
+                                            permutations=2000, seed=0),
+                        0.01)
+        self.assertGreater(permutation_p_value(self.x, self.unrelated,
+                                               permutations=2000, seed=0),
+                           0.05)
+
+    def test_permutation_p_value_of_constant_series(self):
+        self.assertTrue(np.isnan(permutation_p_value(
+            self.x, np.full(30, 4.0), permutations=500, seed=0)))
+        self.assertTrue(np.isnan(permutation_p_value(
+            self.x, np.full(30, np.nan), permutations=500, seed=0)))
+
+    def test_results_do_not_depend_on_workers(self):
+        single = bootstrap_correlation_interval(
+            self.x, self.related, resamples=25_000, seed=3)
+        pooled = bootstrap_correlation_interval(
+            self.x, self.related, resamples=25_000, seed=3, workers=2)
+        self.assertEqual(single, pooled)
+
+    def test_tens_of_thousands_of_resamples(self):
+        # their speed is measured by benchmark.py
+        coefficient = np.corrcoef(self.x, self.related)[0, 1]
+        lower, upper = bootstrap_correlation_interval(
+            self.x, self.related, resamples=50_000, seed=0)
+        self.assertLess(lower, coefficient)
+        self.assertLess(coefficient, upper)
+        self.assertLessEqual(upper, 1.0)
+        self.assertEqual(bootstrap_correlation_interval(
+            self.x, self.related, resamples=50_000, seed=0), (lower, upper))
+
+        p_value = permutation_p_value(self.x, self.related,
+                                      permutations=50_000, seed=0)
+        self.assertGreaterEqual(p_value, 1 / 50_001)
+        self.assertLess(p_value, 0.01)
+        self.assertEqual(permutation_p_value(
+            self.x, self.related, permutations=50_000, seed=0), p_value)
+
+    def test_analyze_correlation_with_resamples(self):
+        years = np.arange(2000, 2030)
+        bird_observation = BirdObservation(pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime(
+                [f"{year}-01-01" for year in years]),
+            'OBSERVATION COUNT': self.related
+        }))
+        snowy_owl_trend = SnowyOwlTrend(pd.DataFrame({
+            'Year': years, 'Index': self.x}))
+        result = analyze_correlation(bird_observation, snowy_owl_trend,
+                                     resamples=2000, seed=0)
+        lower, upper = result['Confidence Interval']
+        self.assertLess(lower, result['Correlation Coefficient'])
+        self.assertLess(result['Correlation Coefficient'], upper)
+        self.assertLess(result['P-Value'], 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+import pandas as pd
+
+from archives import (
+    detect_compression,
+    detect_delimiter,
+    is_data_member,
+    open_decompressed,
+    peek
+    )
+from ingestion import iter_csv_batches, concat_batches
+from schema import OBSERVATION_SCHEMA
+from data_dashboard import parse_csv
+
+CSV = (b'COMMON NAME,OBSERVATION COUNT,STATE,OBSERVATION DATE\n'
+       b'Snowy Owl,2,Ontario,2020-01-05\n'
+       b'Snowy Owl,X,Quebec,2021-12-24\n'
+       b'Snowy Owl,1,"Nova Scotia",2022-02-11\n')
+# eBird's files are tab-separated, unquoted, with a trailing tab
+TSV = (b'COMMON NAME\tOBSERVATION COUNT\tSTATE\tOBSERVATION DATE\t\n'
+       b'Snowy Owl\t2\tOntario\t2020-01-05\t\n'
+       b'Snowy Owl\tX\tQuebec\t2021-12-24\t\n'
+       b'Snowy Owl\t1\tNova Scotia\t2022-02-11\t\n')
+README = b'Read me first.\n' * 1000
+# The code tables eBird ships with the records, first in its archives.
+CODE_TABLES = [
+    ('BCRCodes.txt', b'BCR CODE\tBCR NAME\n1\tAleutian/Bering Sea Islands\n'),
+    ('IBACodes.txt', b'IBA CODE\tIBA NAME\nUS-AK_3166\tAdak Island\n'),
+    ('USFWSCodes.txt', b'USFWS CODE\tUSFWS NAME\nUSFWS_1\tPacific\n')
+    ]
+
+
+class Unseekable(io.RawIOBase):
+    """
+    Represent a stream that can only be read forwards, like a response.
+    """
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(min(len(buffer), 1000))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def make_tar(members, mode='w'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class TestArchives(unittest.TestCase):
+    def setUp(self):
+        self.expected = concat_batches(list(iter_csv_batches(
+            io.BytesIO(CSV), batch_rows=2, schema=OBSERVATION_SCHEMA)))
+
+    def load(self, data, seekable=True):
+        stream = io.BytesIO(data) if seekable else Unseekable(data)
+        return concat_batches(list(iter_csv_batches(
+            stream, batch_rows=2, schema=OBSERVATION_SCHEMA)))
+
+    def assertLoaded(self, data):
+        for seekable in (True, False):
+            pd.testing.assert_frame_equal(self.load(data, seekable),
+                                          self.expected)
+
+    def test_detect_compression(self):
+        self.assertEqual(detect_compression(gzip.compress(CSV)), 'gzip')
+        self.assertEqual(detect_compression(make_zip([('a.csv', CSV)])),
+                         'zip')
+        self.assertEqual(detect_compression(make_tar([('a.csv', CSV)])),
+                         'tar')
+        self.assertIsNone(detect_compression(CSV))
+
+    def test_detect_delimiter(self):
+        self.assertEqual(detect_delimiter(CSV), ',')
+        self.assertEqual(detect_delimiter(TSV), '\t')
+
+    def test_is_data_member(self):
+        self.assertTrue(is_data_member('ebd_snoowl_relAug-2024.txt.gz'))
+        self.assertTrue(is_data_member('data/records.csv'))
+        self.assertFalse(is_data_member('README.txt'))
+        self.assertFalse(is_data_member('terms_of_use.txt'))
+        self.assertFalse(is_data_member('metadata.pdf'))
+        self.assertFalse(is_data_member('ebd_relAug-2024/BCRCodes.txt'))
+
+    def test_peek_keeps_bytes(self):
+        head, stream = peek(Unseekable(CSV), 10)
+        self.assertEqual(head, CSV[:10])
+        self.assertEqual(stream.read(), CSV)
+
+    def test_plain_text(self):
+        self.assertLoaded(CSV)
+        self.assertLoaded(TSV)
+
+    def test_gzip(self):
+        self.assertLoaded(gzip.compress(CSV))
+        self.assertLoaded(gzip.compress(TSV))
+
+    def test_zip_picks_data_member(self):
+        self.assertLoaded(make_zip([('README.txt', README),
+                                    ('ebd.txt', TSV)]))
+
+    def test_tar_with_nested_gzip(self):
+        self.assertLoaded(make_tar([('README.txt', README),
+                                    ('ebd.txt.gz', gzip.compress(TSV))]))
+        self.assertLoaded(make_tar([('ebd.csv', CSV)], mode='w:gz'))
+
+    def test_code_tables_are_skipped(self):
+        members = CODE_TABLES + [
+            ('ebd_snoowl_relAug-2024.txt.gz', gzip.compress(TSV))]
+        self.assertLoaded(make_tar(members))
+        self.assertLoaded(make_zip(members))
+
+    def test_named_member(self):
+        data = make_zip([('first.csv', CSV), ('second.tsv', TSV)])
+        with open_decompressed(io.BytesIO(data), 'second.tsv') as stream:
+            self.assertEqual(stream.read(), TSV)
+
+    def test_archive_without_data(self):
+        with self.assertRaises(ValueError):
+            self.load(make_tar([('README.txt', README)]))
+
+    def test_local_gzip_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'ebd.txt.gz')
+        with open(path, 'wb') as file:
+            file.write(gzip.compress(TSV))
+        result = concat_batches(list(iter_csv_batches(
+            path, batch_rows=2, schema=OBSERVATION_SCHEMA)))
+        pd.testing.assert_frame_equal(result, self.expected)
+
+    def test_parse_tsv(self):
+        rows = parse_csv(TSV.decode('utf-8'))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2]['STATE'], 'Nova Scotia')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+from benchmark import run_benchmark, find_regressions, AGGREGATIONS, PLOTS
+from data_dashboard import load_observations_streaming
+from synthetic_ebd import generate_ebd_frame, write_ebd_csv, EBD_COLUMNS
+
+
+class TestSyntheticEbd(unittest.TestCase):
+    def test_deterministic(self):
+        pd.testing.assert_frame_equal(generate_ebd_frame(500, seed=4),
+                                      generate_ebd_frame(500, seed=4))
+        self.assertFalse(generate_ebd_frame(500, seed=4).equals(
+            generate_ebd_frame(500, seed=5)))
+
+    def test_record_mix(self):
+        records = generate_ebd_frame(20_000)
+        self.assertEqual(tuple(records.columns), EBD_COLUMNS)
+        self.assertTrue(records['GLOBAL UNIQUE IDENTIFIER'].is_unique)
+        x_share = (records['OBSERVATION COUNT'] == 'X').mean()
+        self.assertAlmostEqual(x_share, 0.05, delta=0.01)
+        dates = pd.to_datetime(records['OBSERVATION DATE'],
+                               format='%Y-%m-%d', errors='coerce')
+        self.assertAlmostEqual(dates.isna().mean(), 0.01, delta=0.005)
+        # the most common state is far more common than the rarest
+        shares = records['STATE'].value_counts(normalize=True)
+        self.assertGreater(shares.iloc[0], 10 * shares.iloc[-1])
+
+    def test_chunked_csv_matches_frame(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ebd.csv')
+            write_ebd_csv(path, 1000, seed=2, chunk_rows=300)
+            written = pd.read_csv(path, dtype=str, keep_default_na=False)
+            self.assertEqual(len(written), 1000)
+            self.assertTrue(written['GLOBAL UNIQUE IDENTIFIER'].is_unique)
+            pd.testing.assert_frame_equal(
+                written.iloc[:300],
+                generate_ebd_frame(300, seed=2).astype(object),
+                check_dtype=False)
+            cleaned = load_observations_streaming(path)
+            self.assertLess(len(cleaned), 1000)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_benchmark(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ebd.csv')
+            write_ebd_csv(path, 2000)
+            results = run_benchmark(path, 2000, repeats=1)
+        for stage in ('parse_csv', 'load_csv_into_dataframe',
+                      'clean_data_for_observation',
+                      'analyze_correlation',
+                      'bootstrap_correlation_interval',
+                      'permutation_p_value') + AGGREGATIONS + PLOTS:
+            self.assertGreater(results[stage]['seconds'], 0)
+            self.assertGreater(results[stage]['peak_bytes'], 0)
+
+    def test_find_regressions(self):
+        baseline = {'results': {'1000': {
+            'slow': {'seconds': 1.0, 'peak_bytes': 100 << 20},
+            'noisy': {'seconds': 0.001, 'peak_bytes': 1000}
+            }}}
+        results = {1000: {
+            'slow': {'seconds': 2.0, 'peak_bytes': 110 << 20},
+            'noisy': {'seconds': 0.01, 'peak_bytes': 5000},
+            'new': {'seconds': 1.0, 'peak_bytes': 1}
+            }}
+        regressions = find_regressions(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('slow', regressions[0])
+        self.assertIn('seconds', regressions[0])
+        self.assertEqual(len(find_regressions(results, baseline,
+                                              memory_threshold=0.05)), 2)
+        self.assertEqual(find_regressions(results, {}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+
+
+class TestBirdObservationAggregates(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'OBSERVATION DATE': ['2000-01-01', '2000-01-02', '2000-01-03'],
+            'OBSERVATION COUNT': [1, 2, 3]
+        })
+        self.bird_observation = BirdObservation(self.data)
+
+    def test_aggregate_observations_by_month(self):
+        result = self.bird_observation.aggregate_observations_by_month()
+        self.assertEqual(result['Month'].tolist(), [1])
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [6])
+
+    def test_aggregates_are_memoized(self):
+        first = self.bird_observation.aggregate_observations_by_year()
+        # changing a returned aggregate must not change the stored one
+        first['OBSERVATION COUNT'] = 0
+        second = self.bird_observation.aggregate_observations_by_year()
+        self.assertEqual(second['OBSERVATION COUNT'].tolist(), [6])
+        self.assertIn('year', self.bird_observation._aggregates)
+
+    def test_aggregates_invalidated_on_new_data(self):
+        self.bird_observation.aggregate_observations_by_year()
+        self.bird_observation.data = pd.DataFrame({
+            'OBSERVATION DATE': ['2001-05-01'],
+            'OBSERVATION COUNT': [4]
+        })
+        result = self.bird_observation.aggregate_observations_by_year()
+        self.assertEqual(result['Year'].tolist(), [2001])
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [4])
+
+    def test_aggregate_observations_by_state(self):
+        self.data['STATE'] = ['State1', 'State2', 'State1']
+        self.bird_observation.invalidate_aggregates()
+        result = self.bird_observation.aggregate_observations_by_state()
+        self.assertEqual(result['STATE'].tolist(), ['State1', 'State2'])
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [4, 2])
+
+    def test_get_data_by_state_case_insensitive(self):
+        self.data['STATE'] = ['State1', 'STATE2', 'state1']
+        self.bird_observation.data = self.data
+        result = self.bird_observation.get_data_by_state('STATE1')
+        self.assertEqual(result.index.tolist(), [0, 2])
+
+    def test_get_data_by_states(self):
+        self.data['STATE'] = ['State1', 'State2', 'State3']
+        self.bird_observation.data = self.data
+        result = self.bird_observation.get_data_by_states(['state3',
+                                                           'State1'])
+        self.assertEqual(result.index.tolist(), [0, 2])
+        # a contiguous run of rows is returned as a slice
+        result = self.bird_observation.get_data_by_states(['State1',
+                                                           'State2'])
+        self.assertEqual(result.index.tolist(), [0, 1])
+
+    def test_get_data_by_county(self):
+        self.data['STATE'] = ['State1', 'State2', 'State1']
+        self.data['COUNTY'] = ['County1', 'County1', 'County2']
+        self.bird_observation.data = self.data
+        result = self.bird_observation.get_data_by_county('county1')
+        self.assertEqual(result.index.tolist(), [0, 1])
+        result = self.bird_observation.get_data_by_county('County1',
+                                                          state='State2')
+        self.assertEqual(result.index.tolist(), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from cache import (
+    load_cached_frame,
+    save_frame,
+    load_frame,
+    append_frame,
+    read_manifest
+    )
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        handle, self.source = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as file:
+            file.write('a,b\n1,x\n')
+        self.builds = 0
+
+    def tearDown(self):
+        os.remove(self.source)
+        shutil.rmtree(self.cache_dir)
+
+    def build(self, source):
+        self.builds += 1
+        return pd.DataFrame({
+            'OBSERVATION COUNT': [1.0, None, 3.0],
+            'OBSERVATION DATE': pd.to_datetime(
+                ['2000-01-01', '2001-02-03', '2002-04-05']),
+            'STATE': ['Ontario', None, 'Quebec'],
+            'COUNTY': pd.Categorical(['A', 'B', 'A']),
+            'Year': [2000, 2001, 2002]
+            })
+
+    def test_save_and_load_round_trip(self):
+        df = self.build(self.source)
+        entry_dir = os.path.join(self.cache_dir, 'entry')
+        save_frame(df, entry_dir)
+        pd.testing.assert_frame_equal(load_frame(entry_dir), df)
+
+    def test_array_columns_are_memory_mapped(self):
+        df = self.build(self.source)
+        entry_dir = os.path.join(self.cache_dir, 'entry')
+        save_frame(df, entry_dir)
+        loaded = load_frame(entry_dir)
+        for name in ('OBSERVATION COUNT', 'OBSERVATION DATE', 'Year'):
+            values = loaded[name].to_numpy()
+            while not isinstance(values, np.memmap):
+                values = values.base
+                self.assertIsNotNone(values, name)
+        # writes go to the frame only
+        loaded.loc[0, 'Year'] = 1999
+        self.assertEqual(load_frame(entry_dir)['Year'].tolist(),
+                         [2000, 2001, 2002])
+        self.assertFalse(isinstance(
+            load_frame(entry_dir, mmap=False)['Year'].to_numpy().base,
+            np.memmap))
+
+    def test_warm_start_skips_build(self):
+        first = load_cached_frame(self.source, self.build, 1, self.cache_dir)
+        second = load_cached_frame(self.source, self.build, 1, self.cache_dir)
+        self.assertEqual(self.builds, 1)
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_source_change_invalidates(self):
+        load_cached_frame(self.source, self.build, 1, self.cache_dir)
+        with open(self.source, 'a') as file:
+            file.write('2,y\n')
+        load_cached_frame(self.source, self.build, 1, self.cache_dir)
+        self.assertEqual(self.builds, 2)
+
+    def test_version_change_invalidates(self):
+        load_cached_frame(self.source, self.build, 1, self.cache_dir)
+        load_cached_frame(self.source, self.build, 2, self.cache_dir)
+        self.assertEqual(self.builds, 2)
+
+    def test_append_frame(self):
+        df = self.build(self.source)
+        entry_dir = os.path.join(self.cache_dir, 'entry')
+        save_frame(df, entry_dir, {'watermark': 'a'})
+        new_rows = pd.DataFrame({
+            'OBSERVATION COUNT': [5.0, 6.0],
+            'OBSERVATION DATE': pd.to_datetime(['2003-01-01', '2003-02-01']),
+            'STATE': ['Manitoba', 'Quebec'],
+            'COUNTY': pd.Categorical(['C', None]),
+            'Year': [2003, 2003]
+            })
+        append_frame(new_rows, entry_dir, {'watermark': 'b'})
+        expected = pd.concat([df, new_rows], ignore_index=True)
+        expected['COUNTY'] = pd.Categorical(expected['COUNTY'])
+        pd.testing.assert_frame_equal(load_frame(entry_dir), expected)
+        manifest = read_manifest(entry_dir)
+        self.assertEqual(manifest['rows'], 5)
+        self.assertEqual(manifest['watermark'], 'b')
+
+    def test_interrupted_append_is_ignored(self):
+        df = self.build(self.source)
+        entry_dir = os.path.join(self.cache_dir, 'entry')
+        save_frame(df, entry_dir)
+        manifest = read_manifest(entry_dir)
+        # rows appended to a column without updating the manifest
+        path = os.path.join(entry_dir, manifest['columns'][4]['file'])
+        np.save(path, np.array([2000, 2001, 2002, 2003]))
+        pd.testing.assert_frame_equal(load_frame(entry_dir), df)
+        append_frame(df.iloc[:1], entry_dir)
+        self.assertEqual(load_frame(entry_dir)['Year'].tolist(),
+                         [2000, 2001, 2002, 2000])
+
+    def test_append_rejects_other_columns(self):
+        entry_dir = os.path.join(self.cache_dir, 'entry')
+        save_frame(self.build(self.source), entry_dir)
+        with self.assertRaises(ValueError):
+            append_frame(pd.DataFrame({'Year': [2003]}), entry_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
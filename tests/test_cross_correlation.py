@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from analysis import (
+    masked_pearson_rows,
+    lagged_correlations,
+    rolling_correlations,
+    yearly_series,
+    analyze_cross_correlation
+    )
+from classes.bird_observation import BirdObservation
+from classes.snowy_owl_trend import SnowyOwlTrend
+from visualizations import plot_cross_correlation
+
+
+class TestCrossCorrelation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.years = np.arange(1990, 2020)
+        self.index = rng.normal(100, 20, len(self.years))
+        # observations follow the Index two years later
+        self.totals = np.roll(self.index, 2) * 3
+        self.totals[:2] = np.nan
+
+    def test_masked_pearson_rows(self):
+        x = np.array([[1, 2, np.nan, 4, 5], [1, 2, 3, np.nan, np.nan]])
+        y = np.array([[2, 4, 1, 8, 10], [3, 1, 2, 5, 5]])
+        coefficients, pairs = masked_pearson_rows(x, y)
+        self.assertAlmostEqual(coefficients[0], 1.0)
+        self.assertAlmostEqual(coefficients[1], -0.5)
+        self.assertEqual(pairs.tolist(), [4, 3])
+        coefficients, _ = masked_pearson_rows(x, y, min_pairs=4)
+        self.assertTrue(np.isnan(coefficients[1]))
+
+    def test_lag_spectrum_finds_the_offset(self):
+        lags = lagged_correlations(self.totals, self.index, max_lag=4)
+        self.assertEqual(lags['Lag'].tolist(), list(range(-4, 5)))
+        peak = lags.loc[lags['Correlation'].idxmax()]
+        self.assertEqual(peak['Lag'], 2)
+        self.assertAlmostEqual(peak['Correlation'], 1.0)
+        self.assertEqual(peak['Pairs'], len(self.years) - 2)
+
+    def test_lag_matches_manual_shift(self):
+        lags = lagged_correlations(self.totals, self.index, max_lag=3)
+        for lag in range(-3, 4):
+            expected = pd.Series(self.totals).corr(
+                pd.Series(self.index).shift(lag))
+            result = lags.loc[lags['Lag'] == lag, 'Correlation'].item()
+            self.assertAlmostEqual(result, expected)
+
+    def test_rolling_windows(self):
+        totals = self.index.copy()
+        totals[15:] = -totals[15:]
+        rolling = rolling_correlations(self.years, totals, self.index,
+                                       window=5)
+        self.assertEqual(len(rolling), len(self.years) - 4)
+        self.assertEqual(rolling['Start Year'].iloc[0], 1990)
+        self.assertEqual(rolling['End Year'].iloc[-1], 2019)
+        self.assertAlmostEqual(rolling['Correlation'].iloc[0], 1.0)
+        self.assertAlmostEqual(rolling['Correlation'].iloc[-1], -1.0)
+        self.assertTrue(rolling_correlations(self.years[:3], totals[:3],
+                                             self.index[:3]).empty)
+
+    def test_analyze_cross_correlation(self):
+        bird_observation = BirdObservation(pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime(
+                [f"{year}-06-01" for year in self.years[2:]]),
+            'OBSERVATION COUNT': self.totals[2:]
+        }))
+        snowy_owl_trend = SnowyOwlTrend(pd.DataFrame({
+            'Year': self.years, 'Index': self.index}))
+        years, totals, _ = yearly_series(bird_observation, snowy_owl_trend)
+        self.assertEqual(years.tolist(), self.years.tolist())
+        self.assertTrue(np.isnan(totals[0]))
+
+        result = analyze_cross_correlation(bird_observation,
+                                           snowy_owl_trend, max_lag=3,
+                                           window=8)
+        self.assertEqual(result['Best Lag'], 2)
+        self.assertEqual(len(result['Rolling']), len(self.years) - 7)
+
+        fig = plot_cross_correlation(bird_observation, snowy_owl_trend)
+        self.assertIsNotNone(fig)
+        self.assertEqual(len(fig.axes), 2)
+
+    def test_analyze_cross_correlation_error(self):
+        snowy_owl_trend = SnowyOwlTrend(pd.DataFrame({
+            'Year': self.years, 'Index': self.index}))
+        self.assertEqual(analyze_cross_correlation(None, snowy_owl_trend),
+                         {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+
+
+class TestDateRangeIndex(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime([
+                '2013-10-30', '2013-11-01', '2013-12-15', '2014-01-10',
+                '2014-03-31', '2014-04-01', None]),
+            'OBSERVATION COUNT': [1, 2, 3, 4, 5, 6, 7],
+            'STATE': ['Ontario', 'Quebec', 'Ontario', None, 'Quebec',
+                      'Ontario', 'Ontario']
+        })
+        self.bird_observation = BirdObservation(self.data)
+
+    def brute_force(self, start, end, states=None):
+        mask = ((self.data['OBSERVATION DATE'] >= start)
+                & (self.data['OBSERVATION DATE'] <= end))
+        if states is not None:
+            mask &= self.data['STATE'].str.lower().isin(
+                [state.lower() for state in states])
+        return self.data.loc[mask, 'OBSERVATION COUNT'].sum()
+
+    def test_irruption_winter_total(self):
+        result = self.bird_observation.get_total_in_date_range(
+            '2013-11-01', '2014-03-31')
+        self.assertEqual(result, self.brute_force('2013-11-01', '2014-03-31'))
+        self.assertEqual(result, 14)
+
+    def test_range_by_region(self):
+        result = self.bird_observation.get_total_in_date_range(
+            '2013-11-01', '2014-03-31', ['ontario'])
+        self.assertEqual(result, 3)
+        totals = self.bird_observation.get_date_range_index(
+            ).totals_by_region('2013-01-01', '2014-12-31')
+        self.assertEqual(totals, {'Ontario': 10.0, 'Quebec': 7.0})
+
+    def test_ranges_outside_data(self):
+        self.assertEqual(self.bird_observation.get_total_in_date_range(
+            '2000-01-01', '2100-01-01'), 21)
+        self.assertEqual(self.bird_observation.get_total_in_date_range(
+            '2020-01-01', '2021-01-01'), 0)
+        self.assertEqual(self.bird_observation.get_total_in_date_range(
+            '2014-02-01', '2014-01-01'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
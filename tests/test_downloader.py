@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from downloader import fetch_to_mirror, mirror_path, _write_metadata
+
+PAYLOAD = b'Year,Index\n' + b''.join(
+    f"{year},{year % 7}\n".encode('utf-8') for year in range(1970, 2020))
+ETAG = '"v1"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serve PAYLOAD with ETag revalidation and Range support. The first
+    request of /truncated.csv loses its connection after 100 bytes of
+    the body, and the first request of /busy.csv gets a 503 asking to
+    retry after a second.
+    """
+    requests_seen = []
+    failed = set()
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        first = self.path not in self.failed
+        self.failed.add(self.path)
+        if first and self.path == '/busy.csv':
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if first and self.path == '/truncated.csv':
+            self.send_response(200)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Length', str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD[:100])
+            self.close_connection = True
+            return
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = PAYLOAD
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == ETAG:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(PAYLOAD)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = PAYLOAD[start:]
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             f"bytes {start}-{len(PAYLOAD) - 1}/"
+                             f"{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDownloader(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.url = f"{cls.base}/trend.csv"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.mirror_dir = tempfile.mkdtemp()
+        StandInHandler.requests_seen = []
+        StandInHandler.failed = set()
+
+    def tearDown(self):
+        shutil.rmtree(self.mirror_dir)
+
+    def read(self, path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_download_and_revalidate(self):
+        path = fetch_to_mirror(self.url, self.mirror_dir)
+        self.assertEqual(self.read(path), PAYLOAD)
+        self.assertEqual(fetch_to_mirror(self.url, self.mirror_dir), path)
+        self.assertEqual(StandInHandler.requests_seen[-1]['If-None-Match'],
+                         ETAG)
+        self.assertEqual(self.read(path), PAYLOAD)
+
+    def test_resume_partial_download(self):
+        part_path = mirror_path(self.url, self.mirror_dir) + '.part'
+        with open(part_path, 'wb') as file:
+            file.write(PAYLOAD[:100])
+        _write_metadata(part_path, {'etag': ETAG, 'last_modified': None})
+
+        path = fetch_to_mirror(self.url, self.mirror_dir)
+        self.assertEqual(StandInHandler.requests_seen[-1]['Range'],
+                         'bytes=100-')
+        self.assertEqual(self.read(path), PAYLOAD)
+        self.assertFalse(os.path.exists(part_path))
+
+    def test_complete_partial_download(self):
+        part_path = mirror_path(self.url, self.mirror_dir) + '.part'
+        with open(part_path, 'wb') as file:
+            file.write(PAYLOAD)
+        _write_metadata(part_path, {'etag': ETAG, 'last_modified': None})
+
+        path = fetch_to_mirror(self.url, self.mirror_dir)
+        self.assertEqual(len(StandInHandler.requests_seen), 1)
+        self.assertEqual(self.read(path), PAYLOAD)
+        self.assertFalse(os.path.exists(part_path))
+
+    def test_truncated_download_is_resumed(self):
+        url = f"{self.base}/truncated.csv"
+        # chunks smaller than the part that arrived, which is kept
+        with mock.patch('downloader.DOWNLOAD_CHUNK_SIZE', 50):
+            path = fetch_to_mirror(url, self.mirror_dir, backoff=0.01)
+        self.assertEqual(len(StandInHandler.requests_seen), 2)
+        self.assertEqual(StandInHandler.requests_seen[-1]['Range'],
+                         'bytes=100-')
+        self.assertEqual(self.read(path), PAYLOAD)
+
+    def test_retry_after_is_honoured(self):
+        start = time.perf_counter()
+        path = fetch_to_mirror(f"{self.base}/busy.csv", self.mirror_dir,
+                               backoff=0.01)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9)
+        self.assertEqual(len(StandInHandler.requests_seen), 2)
+        self.assertEqual(self.read(path), PAYLOAD)
+
+    def test_offline_mode(self):
+        self.assertIsNone(
+            fetch_to_mirror(self.url, self.mirror_dir, offline=True))
+        path = fetch_to_mirror(self.url, self.mirror_dir)
+        count = len(StandInHandler.requests_seen)
+        self.assertEqual(
+            fetch_to_mirror(self.url, self.mirror_dir, offline=True), path)
+        self.assertEqual(len(StandInHandler.requests_seen), count)
+
+    def test_unreachable_server_uses_mirror(self):
+        path = fetch_to_mirror(self.url, self.mirror_dir)
+        dead_url = 'http://127.0.0.1:1/trend.csv'
+        shutil.copy(path, mirror_path(dead_url, self.mirror_dir))
+        self.assertIsNotNone(fetch_to_mirror(dead_url, self.mirror_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fetcher import fetch_and_load, fetch_all, HostLimits
+
+PAYLOAD = b'Year,Index\n2000,1\n2001,2\n'
+DELAY = 0.3
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """
+    Serve PAYLOAD slowly, failing the first request of paths starting
+    with /flaky with a 503, and count the requests served at once.
+    """
+    lock = threading.Lock()
+    active = 0
+    most_active = 0
+    failed = set()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.most_active = max(cls.most_active, cls.active)
+            fail = (self.path.startswith('/flaky')
+                    and self.path not in cls.failed)
+            cls.failed.add(self.path)
+        try:
+            time.sleep(DELAY)
+            if fail:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(PAYLOAD)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.mirror_dir = tempfile.mkdtemp()
+        SlowHandler.most_active = 0
+        SlowHandler.failed = set()
+
+    def tearDown(self):
+        shutil.rmtree(self.mirror_dir)
+
+    def read(self, path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_downloads_run_concurrently(self):
+        urls = [f"{self.base}/source{i}.csv" for i in range(4)]
+        start = time.perf_counter()
+        paths = fetch_all(urls, mirror_dir=self.mirror_dir)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(set(paths), set(urls))
+        for path in paths.values():
+            self.assertEqual(self.read(path), PAYLOAD)
+        self.assertEqual(SlowHandler.most_active, 4)
+        self.assertLess(elapsed, 4 * DELAY)
+
+    def test_per_host_limit(self):
+        urls = [f"{self.base}/limited{i}.csv" for i in range(3)]
+        fetch_all(urls, mirror_dir=self.mirror_dir, per_host=1)
+        self.assertEqual(SlowHandler.most_active, 1)
+
+    def test_load_runs_after_download(self):
+        loaded = fetch_and_load(
+            {'trend': (f"{self.base}/trend.csv", self.read),
+             'raw': (f"{self.base}/raw.csv", None)},
+            mirror_dir=self.mirror_dir)
+        self.assertEqual(loaded['trend'], PAYLOAD)
+        self.assertTrue(loaded['raw'].endswith('raw.csv'))
+
+    def test_failed_load_gives_none(self):
+        def fail(path):
+            raise ValueError('bad data')
+        loaded = fetch_and_load({'bad': (f"{self.base}/bad.csv", fail)},
+                                mirror_dir=self.mirror_dir)
+        self.assertIsNone(loaded['bad'])
+
+    def test_retries_server_errors(self):
+        url = f"{self.base}/flaky.csv"
+        paths = fetch_all([url], mirror_dir=self.mirror_dir, backoff=0.01)
+        self.assertEqual(self.read(paths[url]), PAYLOAD)
+
+    def test_no_retries_gives_none(self):
+        url = f"{self.base}/flaky-once.csv"
+        paths = fetch_all([url], mirror_dir=self.mirror_dir, retries=0)
+        self.assertIsNone(paths[url])
+
+    def test_host_limits_are_per_host(self):
+        limits = HostLimits(2)
+        self.assertIs(limits('http://a.org/x.csv'),
+                      limits('http://a.org/y.csv'))
+        self.assertIsNot(limits('http://a.org/x.csv'),
+                         limits('http://b.org/x.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from figure_cache import RenderedFigureCache
+from visualizations import render_monthly_raster
+
+
+def make_raster(fill, size=10):
+    return np.full((size, size, 4), fill, dtype=np.uint8)
+
+
+class TestRenderedFigureCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = RenderedFigureCache()
+        raster = make_raster(1)
+        cache.put(('monthly', 2000, 'All'), raster)
+        self.assertIs(cache.get(('monthly', 2000, 'All')), raster)
+        self.assertIsNone(cache.get(('monthly', 2001, 'All')))
+        self.assertEqual(cache.size_bytes, raster.nbytes)
+
+    def test_evicts_least_recently_used(self):
+        raster_bytes = make_raster(0).nbytes
+        cache = RenderedFigureCache(max_bytes=2 * raster_bytes)
+        cache.put('a', make_raster(1))
+        cache.put('b', make_raster(2))
+        cache.get('a')
+        cache.put('c', make_raster(3))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.size_bytes, 2 * raster_bytes)
+
+    def test_replacing_and_oversized_rasters(self):
+        raster_bytes = make_raster(0).nbytes
+        cache = RenderedFigureCache(max_bytes=raster_bytes)
+        cache.put('a', make_raster(1))
+        cache.put('a', make_raster(2))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size_bytes, raster_bytes)
+        cache.put('big', make_raster(0, size=20))
+        self.assertNotIn('big', cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size_bytes, 0)
+
+    def test_render_monthly_raster(self):
+        data = pd.DataFrame({'Month': [1, 2, 12],
+                             'OBSERVATION COUNT': [5, 0, 3]})
+        raster = render_monthly_raster(data, 400, 200, 100, '2000, All')
+        self.assertEqual(raster.shape, (200, 400, 4))
+        self.assertEqual(raster.dtype, np.uint8)
+
+    def test_render_monthly_raster_with_shared_ylim(self):
+        data = pd.DataFrame({'Month': [1, 2, 12],
+                             'OBSERVATION COUNT': [5, 0, 3]})
+        fitted = render_monthly_raster(data, 400, 200, 100)
+        np.testing.assert_array_equal(
+            render_monthly_raster(data, 400, 200, 100, ylim=(0, 5.5)),
+            fitted)
+        self.assertFalse(np.array_equal(
+            render_monthly_raster(data, 400, 200, 100, ylim=(0, 50)),
+            fitted))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmark import IMPORT_BUDGET, IMPORT_ENTRY_POINTS, check_import_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the plotting, GUI, network and store code may
+# import, which the entry points must leave to be imported on demand.
+LAZY_MODULES = ('tkinter', 'matplotlib', 'requests', 'urllib3', 'sqlite3')
+
+
+def run_python(code):
+    """
+    Run code in a fresh interpreter in the project root and return its
+    stdout.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, capture_output=True,
+        text=True, check=True)
+    return result.stdout
+
+
+class TestImportTime(unittest.TestCase):
+    def test_entry_points_do_not_import_lazy_modules(self):
+        for module in IMPORT_ENTRY_POINTS:
+            stdout = run_python(
+                f"import sys, {module}; "
+                f"print(' '.join(sorted(sys.modules)))")
+            loaded = stdout.split()
+            for lazy_module in LAZY_MODULES:
+                self.assertNotIn(lazy_module, loaded,
+                                 f"{module} imports {lazy_module}")
+
+    def test_plot_functions_load_on_demand(self):
+        stdout = run_python(
+            "import sys, data_dashboard; "
+            "data_dashboard.plot_correlation; "
+            "print('matplotlib' in sys.modules)")
+        self.assertEqual(stdout.strip(), 'True')
+
+    def test_import_budget(self):
+        # relative to pandas, so a slow machine slows both alike
+        self.assertEqual(check_import_budget(budget=IMPORT_BUDGET), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+import functools
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from cache import load_cached_frame, update_cached_frame
+from classes.aggregate_cube import AggregateCube
+from classes.bird_observation import BirdObservation
+from data_dashboard import (
+    CLEANING_VERSION,
+    load_observations_streaming,
+    load_new_observations,
+    observation_schema,
+    observation_watermark,
+    parse_arguments
+    )
+from ingestion import iter_csv_batches
+
+HEADER = ('COMMON NAME,OBSERVATION COUNT,STATE,COUNTY,LATITUDE,LONGITUDE,'
+          'OBSERVATION DATE,OBSERVER ID\n')
+RELEASE_ROWS = (
+    'Snowy Owl,2,Ontario,Ottawa,45.4,-75.7,2010-01-02,obs1\n'
+    'Snowy Owl,X,Quebec,Laval,45.6,-73.7,2011-02-03,obs2\n'
+    'Snowy Owl,4,Ontario,Ottawa,45.4,-75.7,2012-03-04,obs1\n'
+    )
+NEW_ROWS = (
+    'Snowy Owl,3,Manitoba,Winnipeg,49.9,-97.1,2012-11-20,obs4\n'
+    'Snowy Owl,6,Quebec,Laval,45.6,-73.7,2013-01-15,obs2\n'
+    )
+# A row observed on the newest day of the release, published later.
+SAME_DAY_ROW = 'Snowy Owl,1,Ontario,Ottawa,45.4,-75.7,2012-03-04,obs3\n'
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_dir, 'ebd.csv')
+        self.write_release(RELEASE_ROWS)
+        self.builds = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def write_release(self, rows, *columns):
+        header = HEADER.rstrip('\n') + ''.join(
+            f',{column}' for column in columns) + '\n'
+        with open(self.path, 'w') as file:
+            file.write(header + rows)
+
+    def build(self, source):
+        self.builds += 1
+        return load_observations_streaming(source)
+
+    def load_full(self):
+        return load_cached_frame(self.path, self.build, CLEANING_VERSION,
+                                 os.path.join(self.cache_dir, 'cache'),
+                                 describe=observation_watermark)
+
+    def update(self):
+        return update_cached_frame(self.path, load_new_observations,
+                                   CLEANING_VERSION,
+                                   os.path.join(self.cache_dir, 'cache'))
+
+    def test_row_filter(self):
+        batches = list(iter_csv_batches(
+            self.path, row_filter=lambda batch: batch['STATE'] == 'Quebec'))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0]['STATE'].tolist(), ['Quebec'])
+
+    def test_watermark(self):
+        self.assertEqual(observation_watermark(self.load_full()), {
+            'watermark_column': 'OBSERVATION DATE',
+            'watermark': '2012-03-04',
+            'watermark_rows': 1
+            })
+        self.assertEqual(observation_watermark(pd.DataFrame({'a': [1]})),
+                         {})
+
+    def test_update_appends_only_new_rows(self):
+        self.load_full()
+        self.write_release(RELEASE_ROWS + NEW_ROWS)
+        frame, new_rows = self.update()
+        self.assertEqual(new_rows['OBSERVATION COUNT'].tolist(), [3, 6])
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(frame['STATE'].tolist(), [
+            'Ontario', 'Quebec', 'Ontario', 'Manitoba', 'Quebec'])
+        self.assertEqual(frame['Year'].tolist()[-2:], [2012, 2013])
+        self.assertEqual(self.builds, 1)
+
+        # an unchanged source appends nothing
+        frame, new_rows = self.update()
+        self.assertTrue(new_rows.empty)
+        self.assertEqual(len(frame), 5)
+        self.assertEqual(self.load_full()['OBSERVATION COUNT'].tolist(),
+                         [2, 1, 4, 3, 6])
+        self.assertEqual(self.builds, 1)
+
+    def test_rows_added_on_the_watermark_day_are_kept(self):
+        self.load_full()
+        self.write_release(RELEASE_ROWS + SAME_DAY_ROW + NEW_ROWS)
+        # the new row cannot be told from the cached one of its day
+        self.assertIsNone(self.update())
+        frame = self.load_full()
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(frame['OBSERVATION COUNT'].tolist(),
+                         [2, 1, 4, 1, 3, 6])
+
+        # later days are appended again
+        self.write_release(RELEASE_ROWS + SAME_DAY_ROW + NEW_ROWS
+                           + 'Snowy Owl,5,Quebec,Laval,45.6,-73.7,'
+                           '2014-02-01,obs5\n')
+        frame, new_rows = self.update()
+        self.assertEqual(new_rows['OBSERVATION COUNT'].tolist(), [5])
+        self.assertEqual(frame['OBSERVATION COUNT'].tolist(),
+                         [2, 1, 4, 1, 3, 6, 5])
+        self.assertEqual(self.builds, 2)
+
+    def test_update_without_cache(self):
+        self.assertIsNone(self.update())
+
+    def test_last_edited_date_watermark(self):
+        column = 'LAST EDITED DATE'
+        edited = ['2012-05-01 10:00:00', '2012-05-02 09:30:00',
+                  '2012-05-02 09:30:00']
+        self.write_release(''.join(
+            row.rstrip('\n') + f',{date}\n'
+            for row, date in zip(RELEASE_ROWS.splitlines(True), edited)),
+            column)
+        schema = observation_schema(column)
+        cache_dir = os.path.join(self.cache_dir, 'cache')
+        frame = load_cached_frame(
+            self.path,
+            functools.partial(load_observations_streaming, schema=schema),
+            CLEANING_VERSION, cache_dir,
+            describe=functools.partial(observation_watermark,
+                                       column=column))
+        self.assertEqual(frame[column].dt.hour.tolist(), [10, 9, 9])
+        self.assertEqual(observation_watermark(frame, column), {
+            'watermark_column': column,
+            'watermark': '2012-05-02 09:30:00',
+            'watermark_rows': 2
+            })
+
+        # an old observation edited later is new by this watermark
+        self.write_release(''.join(
+            row.rstrip('\n') + f',{date}\n'
+            for row, date in zip(
+                (RELEASE_ROWS + NEW_ROWS).splitlines(True),
+                edited + ['2011-01-01 00:00:00', '2013-02-01 08:00:00']))
+            + 'Snowy Owl,7,Quebec,Laval,45.6,-73.7,2001-06-07,obs6,'
+            '2013-02-03 12:00:00\n', column)
+        frame, new_rows = update_cached_frame(
+            self.path, load_new_observations, CLEANING_VERSION, cache_dir)
+        self.assertEqual(new_rows['OBSERVATION COUNT'].tolist(), [6, 7])
+        self.assertEqual(len(frame), 5)
+
+    def test_watermark_column_argument(self):
+        self.assertEqual(parse_arguments([]).watermark_column,
+                         'OBSERVATION DATE')
+        self.assertEqual(parse_arguments(
+            ['--watermark-column', 'LAST EDITED DATE']).watermark_column,
+            'LAST EDITED DATE')
+
+
+class TestAppendAggregates(unittest.TestCase):
+    def setUp(self):
+        self.old = pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime(
+                ['2000-01-05', '2000-03-01', '2001-03-02']),
+            'OBSERVATION COUNT': [1, 2, 3],
+            'STATE': pd.Categorical(['Ontario', 'Quebec', None]),
+            'COUNTY': pd.Categorical(['A', 'B', None])
+        })
+        self.new = pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime(
+                ['2001-03-20', '2002-06-30', '2002-07-01']),
+            'OBSERVATION COUNT': [4, 5, 6],
+            'STATE': pd.Categorical(['Quebec', 'Alberta', 'Ontario']),
+            'COUNTY': pd.Categorical(['B', 'C', 'A'])
+        })
+
+    def test_cube_add_matches_rebuild(self):
+        full = BirdObservation(pd.concat([self.old, self.new],
+                                         ignore_index=True))
+        expected = full.get_aggregate_cube()
+        cube = BirdObservation(self.old.copy()).get_aggregate_cube()
+        cube.add(BirdObservation(self.new.copy()).get_aggregate_cube())
+        self.assertEqual(cube.years.tolist(), expected.years.tolist())
+        self.assertEqual(cube.regions, expected.regions)
+        np.testing.assert_array_equal(cube.counts, expected.counts)
+        np.testing.assert_array_equal(cube.records, expected.records)
+
+    def test_cube_add_without_new_axes(self):
+        cube = AggregateCube([2000], ['Ontario'], np.ones((1, 12, 1)),
+                             np.ones((1, 12, 1), dtype=np.int64))
+        cube.add(AggregateCube([2000], ['Ontario'], np.ones((1, 12, 1)),
+                               np.ones((1, 12, 1), dtype=np.int64)))
+        self.assertEqual(cube.total(), 24)
+
+    def test_append_data_updates_aggregates(self):
+        bird_observation = BirdObservation(self.old.copy())
+        bird_observation.aggregate_observations_by_year()
+        bird_observation.aggregate_observations_by_month()
+        bird_observation.aggregate_observations_by_location()
+        bird_observation.get_aggregate_cube()
+        bird_observation.get_data_by_state('Quebec')
+        bird_observation.get_total_in_date_range()
+
+        bird_observation.append_data(self.new.copy())
+        self.assertIn('cube', bird_observation._aggregates)
+        self.assertNotIn('date range', bird_observation._aggregates)
+
+        full = BirdObservation(pd.concat([self.old, self.new],
+                                         ignore_index=True))
+        for name in ('aggregate_observations_by_year',
+                     'aggregate_observations_by_month',
+                     'aggregate_observations_by_location'):
+            result = getattr(bird_observation, name)()
+            expected = getattr(full, name)()
+            self.assertEqual(result.astype(str).values.tolist(),
+                             expected.astype(str).values.tolist())
+        self.assertEqual(
+            bird_observation.get_data_by_state('quebec').index.tolist(),
+            [1, 3])
+        self.assertEqual(
+            bird_observation.get_aggregate_cube().total(regions='Alberta'), 5)
+        self.assertEqual(bird_observation.get_total_in_date_range(), 21)
+        self.assertEqual(len(bird_observation.data), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
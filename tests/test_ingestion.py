@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from ingestion import iter_csv_batches, concat_batches
+from schema import OBSERVATION_SCHEMA, TREND_SCHEMA, apply_schema
+from data_dashboard import (
+    parse_csv,
+    load_csv_into_dataframe,
+    clean_data_for_observation,
+    load_observations_streaming
+    )
+
+
+CSV_CONTENT = (
+    'OBSERVATION COUNT,OBSERVATION DATE,STATE\n'
+    '1,2000-01-01,Ontario\n'
+    'X,2000-02-01,Quebec\n'
+    '3,not a date,Ontario\n'
+    '4,2001-03-05,Manitoba\n'
+    '5,2002-12-31,Quebec\n'
+    )
+
+EBD_CONTENT = (
+    'GLOBAL UNIQUE IDENTIFIER,COMMON NAME,OBSERVATION COUNT,STATE,'
+    'COUNTY,LOCALITY,LATITUDE,LONGITUDE,OBSERVATION DATE,OBSERVER ID\n'
+    'a1,Snowy Owl,2,Ontario,Ottawa,Somewhere,45.4,-75.7,2010-01-02,obs1\n'
+    'a2,Snowy Owl,X,Quebec,Laval,Elsewhere,45.6,-73.7,2011-02-03,obs2\n'
+    'a3,Snowy Owl,?,Ontario,Ottawa,Somewhere,45.4,-75.7,2012-03-04,obs1\n'
+    )
+
+
+class TestIngestion(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as file:
+            file.write(CSV_CONTENT)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_iter_csv_batches_bounded(self):
+        batches = list(iter_csv_batches(self.path, batch_rows=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        expected = load_csv_into_dataframe(parse_csv(CSV_CONTENT))
+        result = pd.concat(batches, ignore_index=True)
+        self.assertEqual(result.astype(object).values.tolist(),
+                         expected.astype(object).values.tolist())
+
+    def test_iter_csv_batches_stream(self):
+        stream = io.BytesIO(CSV_CONTENT.encode('utf-8'))
+        batches = list(iter_csv_batches(stream, batch_rows=10))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(list(batches[0].columns),
+                         ['OBSERVATION COUNT', 'OBSERVATION DATE', 'STATE'])
+
+    def test_iter_csv_batches_empty(self):
+        self.assertEqual(list(iter_csv_batches(io.BytesIO(b''))), [])
+
+    def test_load_observations_streaming_matches_serial(self):
+        result = load_observations_streaming(self.path, batch_rows=2)
+        expected = clean_data_for_observation(
+            load_csv_into_dataframe(parse_csv(CSV_CONTENT)))
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(),
+                         expected['OBSERVATION COUNT'].tolist())
+        self.assertEqual(result['Year'].tolist(), expected['Year'].tolist())
+
+    def test_load_observations_streaming_missing_file(self):
+        self.assertIsNone(load_observations_streaming('no_such_file.csv'))
+
+
+class TestSchema(unittest.TestCase):
+    def test_schema_projection_and_dtypes(self):
+        stream = io.BytesIO(EBD_CONTENT.encode('utf-8'))
+        batches = list(iter_csv_batches(stream, batch_rows=2,
+                                        schema=OBSERVATION_SCHEMA))
+        result = concat_batches(batches)
+        self.assertNotIn('LOCALITY', result.columns)
+        self.assertNotIn('GLOBAL UNIQUE IDENTIFIER', result.columns)
+        self.assertEqual(result['OBSERVATION COUNT'].dtype, np.int32)
+        self.assertEqual(result['OBSERVATION COUNT'].tolist(), [2, 1, 0])
+        self.assertEqual(result['LATITUDE'].dtype, np.float32)
+        self.assertIsInstance(result['STATE'].dtype, pd.CategoricalDtype)
+        self.assertEqual(result['STATE'].tolist(),
+                         ['Ontario', 'Quebec', 'Ontario'])
+        self.assertTrue(pd.api.types.is_datetime64_dtype(
+            result['OBSERVATION DATE']))
+
+    def test_clean_is_noop_on_schema_data(self):
+        stream = io.BytesIO(EBD_CONTENT.encode('utf-8'))
+        typed = concat_batches(list(iter_csv_batches(
+            stream, schema=OBSERVATION_SCHEMA)))
+        cleaned = clean_data_for_observation(typed.copy())
+        pd.testing.assert_series_equal(cleaned['OBSERVATION COUNT'],
+                                       typed['OBSERVATION COUNT'])
+        self.assertEqual(cleaned['Year'].tolist(), [2010, 2011, 2012])
+
+    def test_trend_schema_drops_invalid_years(self):
+        df = pd.DataFrame({
+            'Year': ['2000', 'n/a', '2002'],
+            'Index': ['1.5', '2', 'bad']
+            })
+        result = apply_schema(df, TREND_SCHEMA)
+        self.assertEqual(result['Year'].tolist(), [2000, 2002])
+        self.assertEqual(result['Year'].dtype, np.int16)
+        self.assertTrue(np.isnan(result['Index'].iloc[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+
+import instrumentation
+from instrumentation import (
+    span,
+    timed_batches,
+    summarize,
+    format_summary,
+    profiling
+    )
+from data_dashboard import load_observations_streaming
+
+CSV_CONTENT = (
+    'OBSERVATION COUNT,OBSERVATION DATE,STATE\n'
+    '1,2000-01-01,Ontario\n'
+    'X,2000-02-01,Quebec\n'
+    '4,2001-03-05,Manitoba\n'
+    )
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        instrumentation.configure()
+
+    def tearDown(self):
+        instrumentation.configure()
+        self.directory.cleanup()
+
+    def test_nested_spans(self):
+        with span('load', source='a.csv') as stage:
+            with span('parse') as inner:
+                inner['rows'] = 10
+            stage['bytes'] = 2048
+        parse, load = instrumentation.records()
+        self.assertEqual(parse['span'], 'parse')
+        self.assertEqual(parse['parent'], 'load')
+        self.assertEqual(parse['depth'], 1)
+        self.assertEqual(parse['rows'], 10)
+        self.assertEqual(load['depth'], 0)
+        self.assertEqual(load['source'], 'a.csv')
+        self.assertEqual(load['bytes'], 2048)
+        self.assertGreaterEqual(load['seconds'], parse['seconds'])
+        self.assertGreater(load['peak_rss'], 0)
+
+    def test_failed_span_is_recorded(self):
+        with self.assertRaises(KeyError):
+            with span('aggregate'):
+                raise KeyError('Year')
+        self.assertIn('KeyError', instrumentation.records()[0]['error'])
+
+    def test_timed_batches_and_summary(self):
+        batches = list(timed_batches('parse', [[1, 2], [3]]))
+        self.assertEqual(batches, [[1, 2], [3]])
+        with span('clean', rows=3):
+            pass
+        totals = summarize()
+        self.assertEqual([total['span'] for total in totals],
+                         ['parse', 'clean'])
+        self.assertEqual(totals[0]['calls'], 2)
+        self.assertEqual(totals[0]['rows'], 3)
+        table = format_summary()
+        self.assertIn('parse', table)
+        self.assertIn('clean', table)
+
+    def test_json_lines_and_logging(self):
+        path = os.path.join(self.directory.name, 'trace.jsonl')
+        instrumentation.configure(path)
+        with self.assertLogs('snowy_owl_dashboard', level='INFO') as logs:
+            with span('download', bytes=10):
+                pass
+        with open(path) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual(lines[0]['span'], 'download')
+        self.assertEqual(lines[0]['bytes'], 10)
+        self.assertIn('"download"', logs.output[0])
+
+    def test_pipeline_stages(self):
+        path = os.path.join(self.directory.name, 'records.csv')
+        with open(path, 'w') as file:
+            file.write(CSV_CONTENT)
+        load_observations_streaming(path, batch_rows=2)
+        totals = {total['span']: total for total in summarize()}
+        self.assertEqual(totals['parse']['rows'], 3)
+        self.assertEqual(totals['clean']['calls'], 2)
+        self.assertEqual(totals['concat']['rows'], 3)
+
+    def test_profiling_modes(self):
+        for mode in ('cprofile', 'tracemalloc'):
+            output = os.path.join(self.directory.name, mode)
+            with profiling(mode, output):
+                sum(range(1000))
+            self.assertTrue(os.path.getsize(output) > 0)
+        with self.assertRaises(ValueError):
+            with profiling('perf'):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import tracemalloc
+import unittest
+import numpy as np
+import pandas as pd
+
+from classes.bird_observation import BirdObservation, PANDAS_MAJOR
+from data_dashboard import clean_data_for_observation
+
+ROWS = 200_000
+STATES = ['Ontario', 'Quebec', 'Manitoba', 'Alberta']
+
+
+def make_observations(rows=ROWS):
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 20 * 365, rows)
+    return pd.DataFrame({
+        'OBSERVATION DATE': pd.Timestamp('2000-01-01')
+        + pd.to_timedelta(np.sort(days), unit='D'),
+        'OBSERVATION COUNT': rng.integers(1, 5, rows).astype(np.int32),
+        'STATE': pd.Categorical(rng.choice(STATES, rows)),
+        'COUNTY': pd.Categorical(rng.choice(['A', 'B', 'C'], rows))
+    })
+
+
+class TestDashboardMemory(unittest.TestCase):
+    """
+    The dashboard should hold about one copy of the records: selections
+    read the pre-aggregated structures or views of the records, never
+    new copies of the table.
+    """
+    def setUp(self):
+        # Copy-on-Write is turned on for pandas 2 as data_dashboard.main
+        # does; it is always on from pandas 3.0
+        if PANDAS_MAJOR < 3:
+            copy_on_write = pd.option_context('mode.copy_on_write', True)
+            copy_on_write.__enter__()
+            self.addCleanup(copy_on_write.__exit__, None, None, None)
+        self.data = clean_data_for_observation(make_observations())
+        self.bird_observation = BirdObservation(self.data)
+        self.data_bytes = self.data.memory_usage(deep=True).sum()
+        # the shared structures are built once, as set_data does
+        self.cube = self.bird_observation.get_aggregate_cube()
+        self.bird_observation.get_date_range_index()
+        self.bird_observation.aggregate_observations_by_year()
+        self.bird_observation.aggregate_observations_by_month()
+
+    def measure_peak(self, action):
+        tracemalloc.start()
+        try:
+            action()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_selections_do_not_copy_the_records(self):
+        def select_everything():
+            for year in self.cube.years:
+                for state in [None] + STATES:
+                    self.cube.monthly_totals(year=year, regions=state)
+            for state in STATES:
+                self.bird_observation.get_total_in_date_range(
+                    '2005-01-01', '2010-12-31', state)
+            self.bird_observation.aggregate_observations_by_year()
+            self.bird_observation.aggregate_observations_by_month()
+
+        peak = self.measure_peak(select_everything)
+        self.assertLess(peak, 0.2 * self.data_bytes)
+
+    def test_memoized_aggregates_are_copy_on_write(self):
+        first = self.bird_observation.aggregate_observations_by_year()
+        second = self.bird_observation.aggregate_observations_by_year()
+        self.assertTrue(np.shares_memory(
+            first['OBSERVATION COUNT'].to_numpy(),
+            second['OBSERVATION COUNT'].to_numpy()))
+        first.loc[0, 'OBSERVATION COUNT'] = -1
+        third = self.bird_observation.aggregate_observations_by_year()
+        self.assertNotEqual(third.loc[0, 'OBSERVATION COUNT'], -1)
+
+    def test_contiguous_selection_is_a_view(self):
+        self.bird_observation.data = self.data.sort_values(
+            'STATE', ignore_index=True)
+        records = self.bird_observation.data
+        selection = self.bird_observation.get_data_by_states(['Alberta'])
+        peak = self.measure_peak(
+            lambda: self.bird_observation.get_data_by_states(['Quebec']))
+        self.assertLess(peak, 0.2 * self.data_bytes)
+
+        self.assertTrue(np.shares_memory(
+            selection['OBSERVATION COUNT'].to_numpy(),
+            records['OBSERVATION COUNT'].to_numpy()))
+        selection.loc[selection.index[0], 'OBSERVATION COUNT'] = -1
+        self.assertNotIn(-1, records['OBSERVATION COUNT'].to_numpy())
+
+    def test_date_parts_are_compact(self):
+        self.assertEqual(self.data['Year'].dtype, np.int16)
+        self.assertEqual(self.data['Month'].dtype, np.int8)
+        self.assertEqual(self.data['Day'].dtype, np.int8)
+
+
+if __name__ == '__main__':
+    unittest.main()
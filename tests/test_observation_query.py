@@ -0,0 +1,171 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+from classes.observation_store import ObservationStore
+from tests.test_observation_store import synthetic_records
+
+
+class TestObservationQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.records = synthetic_records(4000, seed=7)
+
+    def setUp(self):
+        self.in_memory = BirdObservation(self.records)
+        self.store = ObservationStore()
+        self.store.append(self.records)
+        self.stored = BirdObservation.from_store(self.store)
+
+    def tearDown(self):
+        self.store.close()
+
+    def expected(self, start=None, end=None, states=None, minimum=None,
+                 bounds=None, observers=None):
+        """
+        Filter the records with a plain pandas mask.
+        """
+        df = self.records
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df['OBSERVATION DATE'] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df['OBSERVATION DATE'] <= pd.Timestamp(end)
+        if states is not None:
+            mask &= df['STATE'].astype(str).str.lower().isin(
+                [state.lower() for state in states])
+        if minimum is not None:
+            mask &= df['OBSERVATION COUNT'] >= minimum
+        if bounds is not None:
+            south, west, north, east = bounds
+            mask &= df['LATITUDE'].between(south, north)
+            mask &= df['LONGITUDE'].between(west, east)
+        if observers is not None:
+            mask &= df['OBSERVER ID'].isin(observers)
+        return df[mask]
+
+    def assertSameRecords(self, result, expected):
+        pd.testing.assert_frame_equal(
+            result.reset_index(drop=True), expected.reset_index(drop=True),
+            check_dtype=False, check_categorical=False)
+
+    def assertSameTotals(self, result, expected):
+        np.testing.assert_allclose(
+            result['OBSERVATION COUNT'].to_numpy(dtype=float),
+            expected['OBSERVATION COUNT'].to_numpy(dtype=float))
+        self.assertEqual(list(result.iloc[:, 0]), list(expected.iloc[:, 0]))
+
+    def both(self):
+        return (self.in_memory.query(), self.stored.query())
+
+    def test_queries_are_lazy(self):
+        for query in self.both():
+            query.between('2001-01-01').in_states('Ontario').with_count(2)
+        self.assertEqual(self.in_memory._aggregates, {})
+        self.assertIsNone(self.stored._data)
+
+    def test_total_uses_precomputed_indexes(self):
+        expected = self.expected('2005-03-15', '2012-07-01', ['ontario'])
+        for base in self.both():
+            query = base.between('2005-03-15', '2012-07-01').in_states(
+                'ONTARIO')
+            self.assertEqual(query.explain('total'), 'date range index')
+            self.assertEqual(query.total(),
+                             expected['OBSERVATION COUNT'].sum())
+            states = base.in_states(['Quebec', 'Alberta'])
+            self.assertEqual(states.explain('total'), 'aggregate cube')
+            self.assertEqual(
+                states.total(),
+                self.expected(states=['Quebec', 'Alberta'])[
+                    'OBSERVATION COUNT'].sum())
+
+    def test_yearly_and_monthly_totals(self):
+        for base in self.both():
+            query = base.between('2010-01-01', '2014-12-31').in_states(
+                'Quebec')
+            self.assertEqual(query.explain('yearly'), 'aggregate cube')
+            expected = self.expected('2010-01-01', '2014-12-31', ['Quebec'])
+            self.assertSameTotals(
+                query.yearly_totals(),
+                expected.groupby('Year')['OBSERVATION COUNT'].sum()
+                .reset_index())
+
+            year = base.between('2012-01-01', '2012-12-31')
+            self.assertEqual(year.explain('monthly'), 'aggregate cube')
+            expected = self.expected('2012-01-01', '2012-12-31')
+            self.assertSameTotals(
+                year.monthly_totals(),
+                expected.groupby('Month')['OBSERVATION COUNT'].sum()
+                .reset_index())
+
+            partial = base.between('2012-02-10', '2013-06-30')
+            self.assertNotEqual(partial.explain('monthly'),
+                                'aggregate cube')
+            expected = self.expected('2012-02-10', '2013-06-30')
+            self.assertSameTotals(
+                partial.monthly_totals(),
+                expected.groupby('Month')['OBSERVATION COUNT'].sum()
+                .reset_index())
+
+    def test_records(self):
+        memory, stored = self.both()
+        self.assertEqual(stored.in_states('Ontario').explain(), 'store')
+        self.assertEqual(memory.in_states('Ontario').explain(),
+                         'region index')
+        self.assertEqual(memory.with_count(3).explain(), 'mask')
+
+        bounds = (42.0, -80.0, 47.0, -70.0)
+        expected = self.expected('2000-01-01', None, ['Ontario', 'Quebec'],
+                                 minimum=2, bounds=bounds)
+        for base in self.both():
+            query = (base.in_states(['ontario', 'quebec'])
+                     .between(start='2000-01-01').with_count(minimum=2)
+                     .within(*bounds))
+            self.assertSameRecords(query.records(), expected)
+            self.assertAlmostEqual(query.total(),
+                                   expected['OBSERVATION COUNT'].sum())
+
+    def test_projection(self):
+        expected = self.expected(states=['Manitoba'])[['COUNTY', 'Year']]
+        for base in self.both():
+            query = base.in_states('Manitoba').select(['COUNTY', 'Year'])
+            self.assertSameRecords(query.records(), expected)
+
+    def test_observers_and_species(self):
+        observers = list(self.records['OBSERVER ID'].astype(str).unique()[:3])
+        expected = self.expected(observers=observers)
+        for base in self.both():
+            query = base.by_observers(observers).of_species('SNOWY OWL')
+            self.assertSameRecords(query.records(), expected)
+            self.assertTrue(
+                base.of_species('Great Horned Owl').records().empty)
+
+    def test_repeated_filters_narrow(self):
+        query = (self.in_memory.query()
+                 .in_states(['Ontario', 'Quebec']).in_states('quebec')
+                 .between('2000-01-01', '2010-12-31')
+                 .between('2005-01-01', '2020-12-31'))
+        self.assertEqual(query.filters['states'], frozenset(['quebec']))
+        self.assertEqual(query.filters['dates'],
+                         (pd.Timestamp('2005-01-01'),
+                          pd.Timestamp('2010-12-31')))
+
+    def test_sum_by(self):
+        expected = self.expected(states=['Ontario']).groupby(
+            'COUNTY', observed=True)['OBSERVATION COUNT'].sum().reset_index()
+        for base in self.both():
+            self.assertSameTotals(
+                base.in_states('Ontario').sum_by('COUNTY'), expected)
+
+    def test_to_observation(self):
+        observation = self.in_memory.query().in_states('Quebec') \
+            .to_observation()
+        self.assertIsInstance(observation, BirdObservation)
+        self.assertEqual(len(observation.data),
+                         len(self.expected(states=['Quebec'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+from classes.observation_store import ObservationStore
+from classes.snowy_owl_trend import SnowyOwlTrend
+from data_dashboard import (
+    load_and_summarize,
+    load_observations_streaming,
+    load_observation_store
+    )
+from synthetic_ebd import generate_ebd_frame
+
+
+def synthetic_records(rows=3000, seed=3):
+    """
+    Return cleaned synthetic observation records.
+    """
+    raw = generate_ebd_frame(rows, seed)
+    return load_observations_streaming(
+        io.BytesIO(raw.to_csv(index=False).encode('utf-8')))
+
+
+class TestObservationStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.records = synthetic_records()
+
+    def setUp(self):
+        self.store = ObservationStore()
+        self.store.append(self.records, batch_rows=700)
+        self.in_memory = BirdObservation(self.records)
+        self.stored = BirdObservation.from_store(self.store)
+
+    def tearDown(self):
+        self.store.close()
+
+    def assertSameFrame(self, result, expected):
+        """
+        Assert equal frames with equal dtypes. The store keeps only the
+        categories in use, so unused ones are dropped from both.
+        """
+        def used(df):
+            df = df.reset_index(drop=True)
+            for name in df.select_dtypes('category'):
+                df[name] = df[name].cat.remove_unused_categories()
+            return df
+        pd.testing.assert_frame_equal(used(result), used(expected))
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), len(self.records))
+        self.assertEqual(self.store.columns, list(self.records.columns))
+        self.assertSameFrame(self.store.select(), self.records)
+        self.assertEqual(self.store.select()['STATE'].dtype, 'category')
+        batches = list(self.store.iter_batches(1000))
+        self.assertEqual([len(batch) for batch in batches],
+                         [1000, 1000, len(self.records) - 2000])
+
+    def test_aggregates_are_pushed_down(self):
+        for method in ('aggregate_observations_by_year',
+                       'aggregate_observations_by_month',
+                       'aggregate_observations_by_state',
+                       'aggregate_observations_by_location'):
+            self.assertSameFrame(getattr(self.stored, method)(),
+                                 getattr(self.in_memory, method)())
+        # the records were never read into memory
+        self.assertIsNone(self.stored._data)
+
+    def test_lookups_are_pushed_down(self):
+        self.assertSameFrame(self.stored.get_data_by_state('ontario'),
+                             self.in_memory.get_data_by_state('ontario'))
+        self.assertSameFrame(
+            self.stored.get_data_by_states(['Quebec', 'MANITOBA']),
+            self.in_memory.get_data_by_states(['Quebec', 'MANITOBA']))
+        self.assertSameFrame(
+            self.stored.get_data_by_county('county 3', 'Ontario'),
+            self.in_memory.get_data_by_county('county 3', 'Ontario'))
+        self.assertTrue(self.stored.get_data_by_state('Atlantis').empty)
+        self.assertIsNone(self.stored._data)
+
+    def test_lookups_use_indexes(self):
+        for filters, ranges in (
+                ({'STATE': ['Ontario']}, ()),
+                ({'COUNTY': ['County 3']}, ()),
+                ({}, [('OBSERVATION DATE', '2000-01-01', None)])):
+            where, parameters = self.store._where(filters, ranges)
+            plan = self.store._connection.execute(
+                f'EXPLAIN QUERY PLAN SELECT * FROM observations{where}',
+                parameters).fetchall()
+            self.assertIn('USING INDEX', plan[0][-1])
+
+    def test_non_ascii_names(self):
+        records = self.records.copy()
+        states = records['STATE'].cat.add_categories(['Québec'])
+        records['STATE'] = states.where(states != 'Quebec', 'Québec')
+        store = ObservationStore()
+        store.append(records)
+        stored = BirdObservation.from_store(store)
+        in_memory = BirdObservation(records)
+        # NOCASE would not match É with é
+        for name in ('QUÉBEC', 'québec'):
+            self.assertSameFrame(stored.get_data_by_state(name),
+                                 in_memory.get_data_by_state(name))
+        self.assertFalse(stored.get_data_by_state('QUÉBEC').empty)
+        store.close()
+
+    def test_indexes_built_from_store(self):
+        self.assertEqual(self.stored.get_aggregate_cube().total(),
+                         self.in_memory.get_aggregate_cube().total())
+        for regions in (None, 'Quebec'):
+            self.assertSameFrame(
+                self.stored.get_aggregate_cube().yearly_totals(
+                    regions=regions),
+                self.in_memory.get_aggregate_cube().yearly_totals(
+                    regions=regions))
+        self.assertEqual(
+            self.stored.get_total_in_date_range('2000-01-01', '2010-12-31',
+                                                'Ontario'),
+            self.in_memory.get_total_in_date_range('2000-01-01',
+                                                   '2010-12-31', 'Ontario'))
+        self.assertIsNone(self.stored._data)
+
+    def test_data_is_read_on_demand(self):
+        self.assertEqual(len(self.stored.peek_the_data(5)), 5)
+        self.assertIsNone(self.stored._data)
+        self.assertSameFrame(self.stored.data, self.records)
+
+    def test_append_data(self):
+        new_records = synthetic_records(500, seed=4)
+        self.stored.aggregate_observations_by_year()
+        self.stored.append_data(new_records)
+        self.in_memory.append_data(new_records)
+        self.assertEqual(len(self.store),
+                         len(self.records) + len(new_records))
+        self.assertSameFrame(self.stored.aggregate_observations_by_year(),
+                             self.in_memory.aggregate_observations_by_year())
+
+    def test_summary_is_computed_by_the_store(self):
+        summary = self.stored.get_descriptive_summary()
+        expected = self.in_memory.get_descriptive_summary()
+        pd.testing.assert_frame_equal(
+            summary.drop(columns='OBSERVATION DATE'),
+            expected.drop(columns='OBSERVATION DATE'))
+        self.assertEqual(summary['OBSERVATION DATE'].iloc[:-1].tolist(),
+                         expected['OBSERVATION DATE'].iloc[:-1].tolist())
+        self.assertEqual(self.stored.columns, list(self.records.columns))
+        self.assertIsNone(self.stored._data)
+
+    def test_metadata(self):
+        self.assertIsNone(self.store.get_metadata('version'))
+        self.store.set_metadata('version', {'cleaning': 3})
+        self.assertEqual(self.store.get_metadata('version'), {'cleaning': 3})
+
+    def test_missing_column(self):
+        with self.assertRaises(ValueError):
+            self.store.append(self.records.drop(columns='STATE'))
+
+
+class TestLoadObservationStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.directory, 'ebd.csv')
+        generate_ebd_frame(2000, seed=5).to_csv(self.csv_path, index=False)
+        self.store_path = os.path.join(self.directory, 'observations.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_is_reused_until_the_file_changes(self):
+        store = load_observation_store(self.csv_path, self.store_path,
+                                       batch_rows=500)
+        rows = len(store)
+        self.assertGreater(rows, 0)
+        store.set_metadata('marker', True)
+        store.close()
+
+        store = load_observation_store(self.csv_path, self.store_path)
+        self.assertTrue(store.get_metadata('marker'))
+        self.assertEqual(len(store), rows)
+        store.close()
+
+        generate_ebd_frame(1000, seed=6).to_csv(self.csv_path, index=False)
+        store = load_observation_store(self.csv_path, self.store_path)
+        self.assertLess(len(store), rows)
+        store.close()
+
+    def test_summary_does_not_read_the_records(self):
+        store = load_observation_store(self.csv_path, self.store_path)
+        bird_observation = BirdObservation.from_store(store)
+        years = np.arange(1970, 2025)
+        snowy_owl_trend = SnowyOwlTrend(pd.DataFrame({
+            'Year': years, 'Index': np.cos(years / 7.0)}))
+        with mock.patch('data_dashboard.load_data',
+                        return_value=(bird_observation, snowy_owl_trend)):
+            load_and_summarize(store_path=self.store_path)
+        self.assertIsNone(bird_observation._data)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
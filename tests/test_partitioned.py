@@ -0,0 +1,117 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+import instrumentation
+from classes.bird_observation import BirdObservation
+from data_dashboard import (
+    clean_data_for_observation,
+    load_observations_streaming
+    )
+from partitioned import can_partition, partition_ranges, load_partitioned
+from synthetic_ebd import generate_ebd_frame
+
+
+class TestPartitioned(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.directory, 'ebd.csv')
+        generate_ebd_frame(3000, seed=11).to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ranges_split_on_lines(self):
+        header, ranges = partition_ranges(self.csv_path, 5, min_bytes=1)
+        with open(self.csv_path, 'rb') as file:
+            content = file.read()
+        self.assertEqual(header, content[:len(header)])
+        self.assertEqual(len(ranges), 5)
+        self.assertEqual(ranges[0][0], len(header))
+        self.assertEqual(ranges[-1][1], len(content))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(content[start - 1:start], b'\n')
+
+    def test_small_file_is_one_range(self):
+        _, ranges = partition_ranges(self.csv_path, 8)
+        self.assertEqual(len(ranges), 1)
+
+    def test_same_as_serial_load(self):
+        expected = load_observations_streaming(self.csv_path)
+        records, aggregates = load_partitioned(
+            self.csv_path, clean_data_for_observation, workers=2,
+            batch_rows=400, min_bytes=1)
+        pd.testing.assert_frame_equal(records, expected)
+
+        serial = BirdObservation(expected)
+        for key, method in (
+                ('year', 'aggregate_observations_by_year'),
+                ('month', 'aggregate_observations_by_month'),
+                ('state', 'aggregate_observations_by_state'),
+                ('location', 'aggregate_observations_by_location')):
+            pd.testing.assert_frame_equal(
+                aggregates[key].reset_index(drop=True),
+                getattr(serial, method)().reset_index(drop=True),
+                check_dtype=False, check_categorical=False)
+        cube = serial.get_aggregate_cube()
+        self.assertEqual(aggregates['cube'].total(), cube.total())
+        pd.testing.assert_frame_equal(aggregates['cube'].yearly_totals(),
+                                      cube.yearly_totals())
+
+    def test_worker_spans_are_recorded(self):
+        instrumentation.reset()
+        with instrumentation.span('load'):
+            load_partitioned(self.csv_path, clean_data_for_observation,
+                             workers=2, min_bytes=1)
+        _, ranges = partition_ranges(self.csv_path, 8, min_bytes=1)
+        partitions = [record for record in instrumentation.records()
+                      if record['span'] == 'partition']
+        self.assertEqual(len(partitions), len(ranges))
+        self.assertTrue(all(record['parent'] == 'load'
+                            and record['depth'] == 1
+                            for record in partitions))
+        self.assertEqual(sum(record['rows'] for record in partitions),
+                         len(load_observations_streaming(self.csv_path)))
+        self.assertTrue(any(record['span'] == 'aggregate'
+                            and record['depth'] == 2
+                            for record in instrumentation.records()))
+        instrumentation.reset()
+
+    def test_preloaded_aggregates(self):
+        records, aggregates = load_partitioned(
+            self.csv_path, clean_data_for_observation, workers=1,
+            min_bytes=1)
+        bird_observation = BirdObservation(records)
+        bird_observation.preload_aggregates(aggregates)
+        pd.testing.assert_frame_equal(
+            bird_observation.aggregate_observations_by_year(),
+            aggregates['year'])
+        self.assertIs(bird_observation._aggregates['year'],
+                      aggregates['year'])
+
+    def test_tsv(self):
+        tsv_path = os.path.join(self.directory, 'ebd.txt')
+        generate_ebd_frame(1000, seed=12).to_csv(tsv_path, sep='\t',
+                                                 index=False)
+        records, _ = load_partitioned(
+            tsv_path, clean_data_for_observation, workers=2, min_bytes=1)
+        pd.testing.assert_frame_equal(
+            records, load_observations_streaming(tsv_path))
+
+    def test_compressed_files_are_not_partitioned(self):
+        self.assertTrue(can_partition(self.csv_path))
+        gz_path = self.csv_path + '.gz'
+        with open(self.csv_path, 'rb') as source, \
+                gzip.open(gz_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        self.assertFalse(can_partition(gz_path))
+        self.assertFalse(can_partition('https://example.com/ebd.csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+from classes.snowy_owl_trend import SnowyOwlTrend
+from report import render_report, build_tasks
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.bird_observation = BirdObservation(pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime([
+                '2000-01-01', '2000-02-01', '2001-03-01', '2002-12-01']),
+            'OBSERVATION COUNT': [1, 2, 3, 4]
+        }))
+        self.snowy_owl_trend = SnowyOwlTrend(pd.DataFrame({
+            'Year': [2000, 2001, 2002],
+            'Index': [10.0, 20.0, 15.0],
+            'Lower CI': [5.0, 15.0, 10.0],
+            'Upper CI': [15.0, 25.0, 20.0]
+        }))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_build_tasks(self):
+        names = [task[0] for task in build_tasks([2000, 2001])]
+        self.assertIn('correlation', names)
+        self.assertIn('monthly_observations_2001', names)
+        self.assertEqual(len(names), 6)
+
+    def test_render_report_in_parallel(self):
+        paths = render_report(self.bird_observation, self.snowy_owl_trend,
+                              self.output_dir, formats=('png', 'svg'),
+                              workers=2)
+        # four dashboard figures plus one monthly figure per year
+        self.assertEqual(len(paths), 2 * (4 + 3))
+        for path in paths:
+            self.assertGreater(os.path.getsize(path), 0)
+
+    def test_render_report_serial(self):
+        paths = render_report(self.bird_observation, self.snowy_owl_trend,
+                              self.output_dir, years=[2001], workers=1)
+        self.assertEqual(sorted(os.path.basename(path) for path in paths), [
+            'correlation.png', 'monthly_observations.png',
+            'monthly_observations_2001.png', 'observations_by_year.png',
+            'population_trend.png'])
+
+
+if __name__ == '__main__':
+    unittest.main()
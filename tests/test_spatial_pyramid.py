@@ -0,0 +1,50 @@
+import unittest
+import pandas as pd
+
+from classes.bird_observation import BirdObservation
+
+
+class TestSpatialPyramid(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame({
+            'OBSERVATION DATE': pd.to_datetime([
+                '2010-01-05', '2010-01-20', '2010-02-01', '2011-01-02',
+                '2011-03-04']),
+            'OBSERVATION COUNT': [1, 2, 3, 4, 5],
+            'LATITUDE': [45.1, 45.2, 45.1, 53.0, None],
+            'LONGITUDE': [-75.6, -75.7, -75.6, -60.1, -70.0]
+        })
+        self.pyramid = BirdObservation(self.data).get_spatial_pyramid()
+
+    def test_totals_are_the_same_at_every_level(self):
+        for level in range(self.pyramid.levels):
+            cells = self.pyramid.cells(level)
+            self.assertEqual(cells['OBSERVATION COUNT'].sum(), 10)
+
+    def test_year_and_month_breakdowns(self):
+        finest = self.pyramid.levels - 1
+        cells = self.pyramid.cells(finest, year=2010)
+        self.assertEqual(cells['OBSERVATION COUNT'].sum(), 6)
+        cells = self.pyramid.cells(finest, year=2010, month=1)
+        self.assertEqual(len(cells), 1)
+        self.assertEqual(cells['OBSERVATION COUNT'].iloc[0], 3)
+        cells = self.pyramid.cells(finest, month=1)
+        self.assertEqual(cells['OBSERVATION COUNT'].sum(), 7)
+        self.assertTrue(self.pyramid.cells(finest, year=1999).empty)
+
+    def test_cell_centres_and_bounds(self):
+        finest = self.pyramid.levels - 1
+        size = self.pyramid.cell_size(finest)
+        cells = self.pyramid.cells(finest, bounds=(44, -77, 46, -74))
+        self.assertEqual(cells['OBSERVATION COUNT'].tolist(), [6])
+        self.assertLess(abs(cells['LATITUDE'].iloc[0] - 45.1), size)
+        self.assertLess(abs(cells['LONGITUDE'].iloc[0] + 75.6), size)
+
+    def test_level_for_span(self):
+        self.assertEqual(self.pyramid.level_for_span(1000), 0)
+        self.assertEqual(self.pyramid.level_for_span(0.1),
+                         self.pyramid.levels - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
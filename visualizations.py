@@ -1,8 +1,17 @@
-import matplotlib
-matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+import numpy as np
 import pandas as pd
 
+from analysis import (
+    interpret_correlation,
+    analyze_cross_correlation,
+    DEFAULT_MAX_LAG,
+    DEFAULT_WINDOW
+    )
+
 
 def plot_observations_by_year(bird_observation):
     """
@@ -52,23 +61,24 @@ def plot_observations_by_year(bird_observation):
         return None
 
 
-def plot_monthly_observations(bird_observation):
+def plot_monthly_observations(bird_observation, year=None):
     """
     Generate a line chart of Snowy Owl observations by month.
 
     Parameters:
     bird_observation (BirdObservation): An instance of BirdObservation class.
+    year (int): Only show the observations of this year, if given.
 
     Returns:
     matplotlib.figure.Figure: The generated plot figure.
     """
     try:
-        # Ensure date components are extracted
-        if 'Month' not in bird_observation.data.columns:
-            bird_observation.data['Month'] = bird_observation.data['OBSERVATION DATE'].dt.month
-
         # Aggregate observations by month
-        observations_per_month = bird_observation.data.groupby('Month')['OBSERVATION COUNT'].sum().reset_index()
+        if year is None:
+            observations_per_month = bird_observation.aggregate_observations_by_month()
+        else:
+            observations_per_month = bird_observation.get_aggregate_cube(
+                ).monthly_totals(year=year)
 
         # Sort by Month
         observations_per_month = observations_per_month.sort_values('Month')
@@ -76,23 +86,10 @@ def plot_monthly_observations(bird_observation):
         # Create the figure and axis
         fig, ax = plt.subplots(figsize=(4, 2))
 
-        # Set background color to match GUI
-        fig.patch.set_facecolor('#ECECEC')
-        ax.set_facecolor('#ECECEC')
-
-        # Plotting
-        ax.plot(
-            observations_per_month['Month'],
-            observations_per_month['OBSERVATION COUNT'],
-            marker='o',
-            linestyle='-',
-            color='seagreen'
-        )
-        ax.set_xlabel('Month', fontsize=10)
-        ax.set_ylabel('Total Observations', fontsize=10)
-        ax.set_title('Snowy Owl Observations by Month', fontsize=12)
-        ax.set_xticks(range(1, 13))
-        ax.grid(True, linestyle='--', alpha=0.5)
+        title = 'Snowy Owl Observations by Month'
+        if year is not None:
+            title += f' in {year}'
+        draw_monthly_observations(fig, ax, observations_per_month, title)
 
         return fig
 
@@ -101,6 +98,74 @@ def plot_monthly_observations(bird_observation):
         return None
 
 
+def draw_monthly_observations(fig, ax, observations_per_month, title):
+    """
+    Draw the monthly observations line chart on existing axes.
+
+    Parameters:
+    fig (matplotlib.figure.Figure): The figure of the axes.
+    ax (matplotlib.axes.Axes): The axes to draw on.
+    observations_per_month (pandas.DataFrame): 'Month' and
+        'OBSERVATION COUNT' columns.
+    title (str): The title of the chart.
+    """
+    # Set background color to match GUI
+    fig.patch.set_facecolor('#ECECEC')
+    ax.set_facecolor('#ECECEC')
+
+    # Plotting
+    ax.plot(
+        observations_per_month['Month'],
+        observations_per_month['OBSERVATION COUNT'],
+        marker='o',
+        linestyle='-',
+        color='seagreen'
+    )
+    ax.set_xlabel('Month', fontsize=10)
+    ax.set_ylabel('Total Observations', fontsize=10)
+    ax.set_title(title, fontsize=12)
+    ax.set_xticks(range(1, 13))
+    ax.grid(True, linestyle='--', alpha=0.5)
+
+
+def render_monthly_raster(observations_per_month, width, height, dpi,
+                          label='', ylim=None):
+    """
+    Render the monthly observations chart to an RGBA array without
+    pyplot, so it can be done in a background process.
+
+    Parameters:
+    observations_per_month (pandas.DataFrame): 'Month' and
+        'OBSERVATION COUNT' columns.
+    width (int): The width of the raster in pixels.
+    height (int): The height of the raster in pixels.
+    dpi (float): The resolution of the figure.
+    label (str): A label shown in the top-right corner of the axes.
+    ylim (tuple): The (bottom, top) limits of the y axis, by default
+        fitted to the data.
+
+    Returns:
+    numpy.ndarray: The rendered (height, width, 4) uint8 raster.
+    """
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    draw_monthly_observations(fig, ax, observations_per_month,
+                              'Snowy Owl Observations by Month')
+
+    if ylim is None:
+        counts = observations_per_month['OBSERVATION COUNT']
+        top = float(counts.max()) if len(counts) else 0.0
+        ylim = (0, top * 1.1 or 1)
+    ax.set_xlim(0.5, 12.5)
+    ax.set_ylim(*ylim)
+    ax.text(0.98, 0.92, label, transform=ax.transAxes, ha='right',
+            va='top', fontsize=9)
+
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
 def plot_population_trend(snowy_owl_trend):
     """
     Generate a line chart of the Population Index trend with confidence intervals.
@@ -152,30 +217,6 @@ def plot_population_trend(snowy_owl_trend):
         return None
 
 
-def interpret_correlation(coefficient):
-    """
-    Provide an interpretation of the correlation coefficient.
-
-    Parameters:
-    coefficient (float): The Pearson correlation coefficient.
-
-    Returns:
-    str: Interpretation of the correlation strength and direction.
-    """
-    if coefficient > 0.7:
-        return "strong positive"
-    elif 0.3 < coefficient <= 0.7:
-        return "moderate positive"
-    elif 0 < coefficient <= 0.3:
-        return "weak positive"
-    elif -0.3 <= coefficient < 0:
-        return "weak negative"
-    elif -0.7 <= coefficient < -0.3:
-        return "moderate negative"
-    else:
-        return "strong negative"
-
-
 def plot_correlation(bird_observation, snowy_owl_trend):
     """
     Generate a correlation plot between observations and population index.
@@ -249,4 +290,156 @@ def plot_correlation(bird_observation, snowy_owl_trend):
 
     except Exception as e:
         print(f"Error while plotting correlation: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def plot_cross_correlation(bird_observation, snowy_owl_trend,
+                           max_lag=DEFAULT_MAX_LAG, window=DEFAULT_WINDOW):
+    """
+    Generate a chart of the correlation between yearly observations and
+    the Population Index versus lag, next to a chart of the correlation
+    within a rolling window of years.
+
+    Parameters:
+    bird_observation (BirdObservation): An instance of BirdObservation class.
+    snowy_owl_trend (SnowyOwlTrend): An instance of SnowyOwlTrend class.
+    max_lag (int): The largest lag shown, in years.
+    window (int): The length of the rolling window, in years.
+
+    Returns:
+    matplotlib.figure.Figure: The generated plot figure.
+    """
+    try:
+        results = analyze_cross_correlation(bird_observation,
+                                            snowy_owl_trend, max_lag, window)
+        if not results:
+            return None
+        lags = results['Lags']
+        rolling = results['Rolling']
+
+        # Create the figure and axes
+        fig, (lag_ax, window_ax) = plt.subplots(1, 2, figsize=(8, 2))
+
+        # Set background color to match GUI
+        fig.patch.set_facecolor('#ECECEC')
+        for ax in (lag_ax, window_ax):
+            ax.set_facecolor('#ECECEC')
+            ax.axhline(0, color='gray', linewidth=0.8)
+            ax.set_ylim(-1.05, 1.05)
+            ax.grid(True, linestyle='--', alpha=0.5)
+
+        # Correlation versus lag, with the strongest lag highlighted
+        colors = ['darkorange' if lag == results['Best Lag'] else 'steelblue'
+                  for lag in lags['Lag']]
+        lag_ax.bar(lags['Lag'], lags['Correlation'].fillna(0), color=colors)
+        lag_ax.set_xlabel('Lag (years, Index earlier)', fontsize=10)
+        lag_ax.set_ylabel('Pearson r', fontsize=10)
+        lag_ax.set_title('Correlation by Lag', fontsize=12)
+
+        # Correlation within each window, placed at its last year
+        window_ax.plot(rolling['End Year'], rolling['Correlation'],
+                       color='seagreen', marker='o')
+        window_ax.set_xlabel(f'Last year of {window}-year window',
+                             fontsize=10)
+        window_ax.set_title('Rolling Correlation', fontsize=12)
+
+        fig.tight_layout()
+        return fig
+
+    except Exception as e:
+        print(f"Error while plotting cross-correlation: {e}")
+        return None
+
+
+def draw_hotspot_cells(ax, cells, cell_size, image=None):
+    """
+    Draw map cells as an image of observation counts on a log scale.
+
+    Parameters:
+    ax (matplotlib.axes.Axes): The axes to draw on.
+    cells (pandas.DataFrame): Cells from SpatialPyramid.cells.
+    cell_size (float): The cell size in degrees.
+    image (matplotlib.image.AxesImage): An image from an earlier call to
+        update instead of drawing a new one.
+
+    Returns:
+    matplotlib.image.AxesImage: The image of the cells, or None if there
+    are no cells.
+    """
+    if cells.empty:
+        if image is not None:
+            image.set_visible(False)
+        return image
+
+    # lay the cells out on a grid covering just the non-empty ones
+    rows = np.round((cells['LATITUDE'].to_numpy() + 90) / cell_size
+                    - 0.5).astype(int)
+    cols = np.round((cells['LONGITUDE'].to_numpy() + 180) / cell_size
+                    - 0.5).astype(int)
+    grid = np.full((rows.max() - rows.min() + 1,
+                    cols.max() - cols.min() + 1), np.nan)
+    grid[rows - rows.min(), cols - cols.min()] = cells[
+        'OBSERVATION COUNT'].to_numpy()
+    grid = np.ma.masked_where(~(grid > 0), grid)
+    extent = (cols.min() * cell_size - 180,
+              (cols.max() + 1) * cell_size - 180,
+              rows.min() * cell_size - 90,
+              (rows.max() + 1) * cell_size - 90)
+    norm = LogNorm(vmin=1, vmax=max(grid.max(), 1))
+
+    if image is None:
+        image = ax.imshow(grid, origin='lower', extent=extent,
+                          cmap='YlOrRd', norm=norm, aspect='auto',
+                          interpolation='nearest')
+    else:
+        image.set_data(grid)
+        image.set_extent(extent)
+        image.set_norm(norm)
+        image.set_visible(True)
+    return image
+
+
+def plot_hotspot_map(bird_observation, level=2, year=None, month=None,
+                     bounds=None):
+    """
+    Generate a hotspot map of Snowy Owl observations from the
+    pre-aggregated map cells.
+
+    Parameters:
+    bird_observation (BirdObservation): An instance of BirdObservation class.
+    level (int): The zoom level of the cells.
+    year (int): Only show this year, if given.
+    month (int): Only show this month, if given.
+    bounds (tuple): (south, west, north, east) limits of the map, if given.
+
+    Returns:
+    matplotlib.figure.Figure: The generated plot figure.
+    """
+    try:
+        pyramid = bird_observation.get_spatial_pyramid()
+        cells = pyramid.cells(level, year=year, month=month, bounds=bounds)
+
+        # Create the figure and axis
+        fig, ax = plt.subplots(figsize=(6, 4))
+
+        # Set background color to match GUI
+        fig.patch.set_facecolor('#ECECEC')
+        ax.set_facecolor('#ECECEC')
+
+        image = draw_hotspot_cells(ax, cells, pyramid.cell_size(level))
+        if image is not None:
+            fig.colorbar(image, ax=ax, label='Total Observations')
+        if bounds is not None:
+            south, west, north, east = bounds
+            ax.set_xlim(west, east)
+            ax.set_ylim(south, north)
+
+        ax.set_xlabel('Longitude', fontsize=10)
+        ax.set_ylabel('Latitude', fontsize=10)
+        ax.set_title('Snowy Owl Observation Hotspots', fontsize=12)
+        ax.grid(True, linestyle='--', alpha=0.5)
+
+        return fig
+
+    except Exception as e:
+        print(f"Error while plotting hotspot map: {e}")
+        return None